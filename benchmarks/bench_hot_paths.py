@@ -0,0 +1,153 @@
+"""
+Micro-benchmarks of the CPU hot spots of payment handling, see README "Benchmarks" for the baseline workflow.
+
+    pytest benchmarks/
+"""
+import random
+from copy import deepcopy
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from benchmarks.conftest import FakeResponse, FakeSession
+from georgian_payments import fields
+from georgian_payments.bin_ranges import BinInfo, BinRange, BinTable, write_table
+from georgian_payments.choices import CardTypeChoices
+from georgian_payments.models import is_new_log_entry
+from georgian_payments.sdk.bog import BogPaySDK, BogInstallmentSDK
+from georgian_payments.sdk.credo import CredoInstallmentSDK
+from georgian_payments.sdk.georgian_card import GCBank
+from georgian_payments.sdk.space import SpaceInstallmentSDK
+from georgian_payments.sdk.tbc import TbcInstallmentSDK, TbcBNPLInstallmentSDK
+from georgian_payments.sdk.ufc import UfcSdk
+from georgian_payments.utils import requests_to_curl
+
+CART_SIZE = 500
+BIN_RANGES = 200_000
+
+
+@pytest.mark.parametrize('size', [10, 100, 1000])
+def bench_data_log_dedupe(benchmark, size):
+    data_log = [{'status': f'in_progress-{i}', 'order_id': 'trx-1042'} for i in range(size)]
+    assert benchmark(is_new_log_entry, data_log, {'status': 'success'}, 'status')
+
+
+@pytest.mark.parametrize('sdk_class', [
+    BogPaySDK, BogInstallmentSDK, CredoInstallmentSDK, TbcInstallmentSDK, TbcBNPLInstallmentSDK
+], ids=lambda c: c.__name__)
+def bench_product_data(benchmark, make_transaction, sdk_class):
+    sdk = sdk_class(make_transaction(products=CART_SIZE))
+    data = benchmark(sdk.product_data)
+    assert len(next(iter(data.values()))) == CART_SIZE
+
+
+def bench_credo_check_string(benchmark, make_transaction):
+    sdk = CredoInstallmentSDK(make_transaction(products=CART_SIZE))
+    products = sdk.product_data()['products']
+    assert len(benchmark(sdk.generate_check_string, products)) == 32
+
+
+def _answer(sdk, data):
+    sdk._request = lambda *_, **__: deepcopy(data) if isinstance(data, dict) else data  # SDKs may mutate it
+    return sdk
+
+
+STATUS_CASES = {
+    'bog': (lambda t: _answer(BogPaySDK(t), {'status': 'success', 'pan': '4***', 'order_id': t.trx}), 1),
+    'bog_installment': (lambda t: _answer(BogInstallmentSDK(t), {'status': 'in_progress'}), 0),
+    'credo': (lambda t: _answer(CredoInstallmentSDK(t), FakeResponse({'data': '12'})), 1),
+    'space': (lambda t: _answer(SpaceInstallmentSDK(t), {'data': {'status': 2, 'orderId': t.trx}}), 1),
+    'tbc': (lambda t: _answer(TbcInstallmentSDK(t), {'statusId': 8}), 1),
+    'tbc_bnpl': (lambda t: _answer(TbcBNPLInstallmentSDK(t), {'status': 'Failed'}), -1),
+}
+
+
+@pytest.mark.parametrize('case', STATUS_CASES)
+def bench_status_mapping(benchmark, make_transaction, case):
+    factory, expected = STATUS_CASES[case]
+    sdk = factory(make_transaction())
+    _, is_ok = benchmark(sdk.check_transaction_status)
+    assert is_ok == expected
+
+
+def bench_status_mapping_ufc(benchmark, make_transaction):
+    sdk = UfcSdk(make_transaction())
+    sdk.check_trans_status = lambda **_: {'RESULT': 'OK', 'RESULT_CODE': '000', 'CARD_NUMBER': '4***1111'}
+    _, is_ok = benchmark(sdk.check_transaction_status)
+    assert is_ok == 1
+
+
+def bench_status_mapping_gc(benchmark, make_transaction, monkeypatch):
+    session = FakeSession(FakeResponse({'state': 'result', 'result': {'status': 'SUCCESS'}, 'merchant': {}}))
+    monkeypatch.setattr(GCBank, 'http_session', property(lambda self: session))
+    _, is_ok = benchmark(GCBank(make_transaction()).check_transaction_status)
+    assert is_ok == 1
+
+
+def bench_ufc_failed_text_status(benchmark, make_transaction):
+    data_log = [{'RESULT': 'PENDING', 'RESULT_CODE': ''} for _ in range(50)]
+    data_log.append({'RESULT': 'DECLINED', 'RESULT_CODE': '116'})
+    sdk = UfcSdk(make_transaction(data_log=data_log))
+    assert benchmark(sdk.get_failed_text_status) == 'Insufficient Funds'
+
+
+def bench_gc_check_accept_xml(benchmark, make_transaction):
+    sdk = GCBank(make_transaction())
+    assert '<merchant-trx>trx-1042</merchant-trx>' in benchmark(lambda: sdk.get_check_accept_xml)
+
+
+def bench_gc_check_fail_xml(benchmark):
+    assert 'User Is Not Active' in benchmark(GCBank.get_check_fail_xml, 'User Is Not Active')
+
+
+def bench_requests_to_curl(benchmark):
+    request = requests.Request(
+        'POST', 'https://api.tbcbank.ge/v1/online-installments/applications',
+        json={'invoiceId': 1042, 'products': [{'name': f'Product {i}', 'price': 19.99} for i in range(50)]},
+        headers={'Authorization': 'Bearer token', 'Accept': 'application/json'},
+    ).prepare()
+    assert benchmark(requests_to_curl, SimpleNamespace(request=request)).startswith('curl -X POST')
+
+
+@pytest.fixture(scope='module')
+def bin_table(tmp_path_factory):
+    rng = random.Random(42)
+    starts = sorted(rng.sample(range(10 ** 7, 10 ** 8 - 100), BIN_RANGES))
+    path = str(tmp_path_factory.mktemp('bins') / 'bins.bin')
+    write_table((BinRange(start, start + rng.randint(0, 99), BinInfo(CardTypeChoices.VISA, f'Bank {i % 500}', 'GE'))
+                 for i, start in enumerate(starts)), path)
+    return BinTable(path), [str(start) + '12345678' for start in rng.sample(starts, 1000)]
+
+
+def bench_bin_lookup(benchmark, bin_table):
+    table, pans = bin_table
+    results = benchmark(lambda: [table.lookup(pan) for pan in pans])  # 1000 lookups a round
+    assert all(results)
+
+
+def bench_bin_lookup_masked(benchmark, bin_table):
+    table, pans = bin_table
+    masked = [pan[:6] + '******' + pan[-4:] for pan in pans]
+    benchmark(lambda: [table.lookup(pan) for pan in masked])
+
+
+COMPACT_CODECS = [
+    fields.JSON_ZLIB,
+    pytest.param(fields.MSGPACK_ZSTD, marks=pytest.mark.skipif(not fields.msgpack_available(), reason='[compact]')),
+]
+DATA_LOG = [
+    {'RESULT': 'OK', 'RESULT_CODE': '000', '3DSECURE': 'AUTHENTICATED', 'RRN': f'40{i:010}', 'APPROVAL_CODE': '0A1B2C',
+     'CARD_NUMBER': '5213**********1234', 'TRANSACTION_ID': f'tJfPqK{i:022}='}
+    for i in range(20)
+]
+
+
+@pytest.mark.parametrize('codec', COMPACT_CODECS)
+def bench_compact_json_encode(benchmark, codec):
+    assert benchmark(fields.encode, DATA_LOG, codec)[:1] == codec
+
+
+@pytest.mark.parametrize('codec', COMPACT_CODECS)
+def bench_compact_json_decode(benchmark, codec):
+    assert benchmark(fields.decode, fields.encode(DATA_LOG, codec)) == DATA_LOG
@@ -0,0 +1,96 @@
+"""
+Callback payload parsing: `georgian_payments.schemas` against the DRF serializer / dict munging it replaced.
+
+    python benchmarks/callback_schemas.py [--number 20000]
+
+Prints the mean time per payload of both paths for the Space, BOG and Georgian Card callbacks.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework', 'georgian_payments'],
+    SPACE_SETTINGS={'secret_key': 'secret'},
+)
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import QueryDict  # noqa: E402
+
+from georgian_payments.schemas import SpaceCallbackSchema, BogCallbackSchema, GCRegisterSchema  # noqa: E402
+from georgian_payments.serialaizers import SpaceCallbackSerializer  # noqa: E402
+from georgian_payments.utils import remove_lists_from_dict_values  # noqa: E402
+
+SPACE = {'OrderId': 'b7c1e5', 'Status': '2', 'Secret': 'secret', 'Description': '', 'ClientContributionAmount': '0'}
+BOG = QueryDict(
+    'order_id=1f0e2a&shop_order_id=1042&status=success&payment_method=BOG_CARD&card_type=Visa&pan=&'
+    'payment_hash=9c2f&ipay_payment_id=77&status_description=APPROVED&pre_auth=N&amount=12.50'
+)
+GC = QueryDict(
+    'o.transaction_id=1042&trx_id=7E1C0F&result_code=1&p.maskedPan=411111******1111&p.isFullyAuthenticated=Y&'
+    'card.registered=Y&card.recurrent=Y&card.id=A1B2&merch_id=M1&ts=20240101+10:00:00&p.cardholder=A+B'
+)
+
+
+def drf_space():
+    serializer = SpaceCallbackSerializer(data=SPACE)
+    serializer.is_valid()
+    return serializer.data['OrderId'], serializer.data.get('Status'), serializer.data
+
+
+def schema_space():
+    values, _ = SpaceCallbackSchema.parse(SPACE)
+    return values.OrderId, values.Status, values._asdict()
+
+
+def dict_bog():
+    data = remove_lists_from_dict_values(BOG)
+    return data.get('order_id', ''), data.get('status'), data.get('payment_method'), data.get('pan', '****'), data
+
+
+def schema_bog():
+    values, data = BogCallbackSchema.parse(BOG)
+    return values.order_id, values.status, values.payment_method, values.pan, data
+
+
+def dict_gc():
+    pk = GC.get('o.transaction_id', 0)
+    data = GC.dict()
+    return str(pk).isdigit(), GC.get('trx_id'), int(data.get('result_code', 2)), data.get('p.maskedPan', '****'), \
+        data.get('p.isFullyAuthenticated', 'N'), data.get('card.registered', 'N'), data.get('card.recurrent', 'N')
+
+
+def schema_gc():
+    values, _ = GCRegisterSchema.parse(GC)
+    return values.transaction_id, values.trx_id, values.result_code, values.masked_pan, \
+        values.fully_authenticated, values.card_registered, values.card_recurrent
+
+
+CASES = (
+    ('space', drf_space, schema_space),
+    ('bog', dict_bog, schema_bog),
+    ('gc register', dict_gc, schema_gc),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, before, after in CASES:
+        old = min(timeit.repeat(before, number=args.number, repeat=args.repeat)) / args.number
+        new = min(timeit.repeat(after, number=args.number, repeat=args.repeat)) / args.number
+        print(f'{name:<12} before {old * 1e6:8.2f} us   schema {new * 1e6:8.2f} us   x{old / new:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+`data_log` storage: plain JSON against the `CompactJSONField` codecs, on logs shaped like the banks' answers.
+
+    python benchmarks/compact_json.py [--entries 20] [--number 10]
+
+Prints the stored size and the mean encode / decode time per log of every codec installed. msgpack + zstd with a
+dictionary is trained on other logs than the ones measured, as `backfill_compact_json --train-dictionary` would.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings  # noqa: E402
+
+settings.configure(INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'georgian_payments'])
+import django  # noqa: E402
+
+django.setup()
+
+from georgian_payments import fields  # noqa: E402
+
+
+def entry(rng: random.Random) -> dict:
+    trans_id = ''.join(rng.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+/', k=28)) + '='
+    return rng.choice([
+        {'RESULT': rng.choice(['OK', 'PENDING', 'FAILED']), 'RESULT_CODE': rng.choice(['000', '116', '100']),
+         '3DSECURE': 'AUTHENTICATED', 'RRN': str(rng.randrange(10 ** 11, 10 ** 12)), 'APPROVAL_CODE': '0A1B2C',
+         'CARD_NUMBER': f'5213**********{rng.randrange(10 ** 4):04}', 'TRANSACTION_ID': trans_id},
+        {'order_id': trans_id, 'status': rng.choice(['success', 'in_progress', 'error']), 'payment_hash': trans_id,
+         'ipay_payment_id': str(rng.randrange(10 ** 6)), 'status_description': 'APPROVED', 'pan': '411111******1111',
+         'shop_order_id': str(rng.randrange(10 ** 5)), 'payment_method': 'BOG_CARD', 'card_type': 'Visa'},
+        {'Register Data': {'o.transaction_id': str(rng.randrange(10 ** 5)), 'trx_id': trans_id, 'result_code': '1',
+                           'p.maskedPan': '411111******1111', 'p.isFullyAuthenticated': 'Y', 'card.registered': 'N',
+                           'merch_id': 'B9D3A1F0E2C4', 'ts': '20240101 10:00:00'}},
+    ])
+
+
+def logs(seed: int, count: int, entries: int) -> list:
+    rng = random.Random(seed)
+    return [[entry(rng) for _ in range(rng.randint(1, entries))] for _ in range(count)]
+
+
+def codecs(training: list):
+    yield 'json', lambda v: json.dumps(v).encode(), json.loads
+    yield 'json + zlib', lambda v: fields.encode(v, fields.JSON_ZLIB), fields.decode
+    if not fields.msgpack_available():
+        print('msgpack + zstd: pip install georgian-django-payments[compact]')
+        return
+    yield 'msgpack + zstd', lambda v: fields.encode(v, fields.MSGPACK_ZSTD), fields.decode
+    import msgpack
+    import zstandard
+
+    dictionary = zstandard.ZstdCompressionDict(fields.train_dictionary(training, 16 * 1024))
+    compressor = zstandard.ZstdCompressor(level=3, dict_data=dictionary)
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    yield 'msgpack + zstd + dictionary', lambda v: compressor.compress(msgpack.packb(v, use_bin_type=True)), \
+        lambda d: msgpack.unpackb(decompressor.decompress(d), raw=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=20, help='Most entries of a log')
+    parser.add_argument('--logs', type=int, default=200)
+    parser.add_argument('--number', type=int, default=10, help='Passes over the logs')
+    args = parser.parse_args()
+
+    measured = logs(1, args.logs, args.entries)
+    for name, encode, decode in codecs(logs(2, 2000, args.entries)):
+        encoded = [encode(log) for log in measured]
+        assert [decode(data) for data in encoded] == measured
+        size = sum(map(len, encoded)) / len(encoded)
+        per_log = args.number * len(measured)
+        encode_time = min(timeit.repeat(lambda: list(map(encode, measured)), number=args.number, repeat=5)) / per_log
+        decode_time = min(timeit.repeat(lambda: list(map(decode, encoded)), number=args.number, repeat=5)) / per_log
+        print(f'{name:<28} {size:8.0f} bytes   encode {encode_time * 1e6:8.2f} us   decode {decode_time * 1e6:8.2f} us')
+
+
+if __name__ == '__main__':
+    main()
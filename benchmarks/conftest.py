@@ -0,0 +1,78 @@
+"""
+Django setup and fixtures of the micro-benchmarks, nothing here touches a database or a bank.
+"""
+import os
+import sys
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings  # noqa: E402
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework', 'georgian_payments'],
+        TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates', 'APP_DIRS': True}],
+        USE_TZ=True,
+        STAGE=False,
+        BASE_DIR='/tmp',
+        HOST_URL='https://example.com',
+        UFC_ERROR_MESSAGES={'116': 'Insufficient Funds', '3D': '3D Secure Failed'},
+    )
+    import django
+
+    django.setup()
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.content = b'{}'
+        self.text = '{}'
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Answers every request with the same response, for timing what SDKs do around the HTTP call."""
+
+    def __init__(self, response: FakeResponse):
+        self.response = response
+
+    def request(self, *_, **__):
+        return self.response
+
+    get = post = request
+
+
+def make_products(count: int):
+    return [
+        {'amount': 19.99 + i, 'headline': f'Product "{i}" headline', 'quantity': i % 3 + 1, 'product_id': 1000 + i}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def make_transaction():
+    """A stand-in transaction with what the SDKs read from it, `PaymentTransaction` is abstract."""
+    from django.utils import timezone
+
+    def factory(products: int = 0, data_log=None, **kwargs):
+        return SimpleNamespace(**{
+            'id': 1042, 'pk': 1042, 'trx': 'trx-1042', 'pay_id': 'pay-1042', 'merchant': '', 'amount': 120,
+            'transaction_type': 1, 'additional_data': {'installment_options': {'month': 12, 'discount_code': ''}},
+            'product_data': make_products(products), 'data_log': data_log or [],
+            'save_card': False, 'bank_card_id': None, 'card_hash': '', 'card_bin_hash': '',
+            'created': timezone.now() - timedelta(minutes=1),
+            'payment_method': SimpleNamespace(payment_type=1, bank_type=2),
+            'check_save_card': lambda pan: False,
+            **kwargs,
+        })
+
+    return factory
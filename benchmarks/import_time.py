@@ -0,0 +1,71 @@
+"""
+Import cost of `georgian_payments` on a bare Django start (e.g. a management command).
+
+    python benchmarks/import_time.py [--repeat 5]
+
+Runs `python -X importtime` in a fresh interpreter and reports the cumulative import
+time of `georgian_payments` modules and which heavy bank dependencies were loaded.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('geopayment', 'requests', 'loguru', 'georgian_payments.sdk.bog')
+
+SNIPPET = """
+from django.conf import settings
+settings.configure(INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'georgian_payments'])
+import django
+django.setup()
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Returns (cumulative us of everything imported on behalf of georgian_payments, loaded module names).
+    Lines are printed children first, so walking them backwards visits every parent before its children.
+    """
+    total, loaded, stack = 0, set(), []
+    for line in reversed(stderr.splitlines()):
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line.split(':', 1)[1].split('|')
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        loaded.add(name)
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        parent = stack[-1][1] if stack else ''
+        if name.startswith('georgian_payments') and not parent.startswith('georgian_payments'):
+            total += int(cumulative)
+        stack.append((depth, name))
+    return total, loaded
+
+
+def measure():
+    env = {**os.environ, 'PYTHONPATH': os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SNIPPET], env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    runs, loaded = [], set()
+    for _ in range(args.repeat):
+        total, loaded = measure()
+        runs.append(total)
+    print(f'georgian_payments cumulative import: median {statistics.median(runs) / 1000:.1f} ms '
+          f'(min {min(runs) / 1000:.1f} ms, {args.repeat} runs)')
+    for module in HEAVY_MODULES:
+        print(f'  {module:<30} {"loaded" if module in loaded else "not loaded"}')
+
+
+if __name__ == '__main__':
+    main()
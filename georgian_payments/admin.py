@@ -1,8 +1,13 @@
 from django.contrib import admin
 
-from georgian_payments.models import PaymentMethod
+from georgian_payments.models import PaymentMethod, TimeoutPolicy
 
 
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(TimeoutPolicy)
+class TimeoutPolicyAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'requires_confirmation', 'is_active')
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+from typing import Type
+
+from django.db import models, transaction as db_transaction
+from django.utils import timezone
+from loguru import logger
+
+from georgian_payments.choices import PTSChoices
+
+TERMINAL_STATUSES = (PTSChoices.SUCCESS, PTSChoices.FAILED, PTSChoices.TIMEOUT, PTSChoices.ERROR)
+
+
+def compact_data_log(data_log: list) -> list:
+    """Drops repeated payloads (e.g. the same callback delivered several times), keeping the first occurrence."""
+    seen, compacted = set(), []
+    for entry in data_log or []:
+        key = json.dumps(entry, sort_keys=True, default=str)
+        if key in seen:
+            continue
+        seen.add(key)
+        compacted.append(entry)
+    return compacted
+
+
+def archivable(queryset, before: datetime):
+    return queryset.filter(status__in=TERMINAL_STATUSES, updated__lt=before)
+
+
+def archive_chunk(queryset, archive_model: Type[models.Model], before: datetime, chunk_size: int = 500,
+                  compact: bool = False) -> int:
+    """
+    Moves one chunk of terminal transactions into `archive_model` in a single DB transaction,
+    so an interrupted run never leaves a row in both tables and can simply be started again.
+    """
+    archive_fields = {field.attname for field in archive_model._meta.concrete_fields}
+    copy_fields = [field.attname for field in queryset.model._meta.concrete_fields if field.attname in archive_fields]
+    now = timezone.now()
+    with db_transaction.atomic():
+        rows = list(
+            archivable(queryset, before).order_by('pk').select_for_update(skip_locked=True)[:chunk_size]
+        )
+        if not rows:
+            return 0
+        archived = []
+        for row in rows:
+            values = {name: getattr(row, name) for name in copy_fields}
+            if compact:
+                values['data_log'] = compact_data_log(values['data_log'])
+            archived.append(archive_model(archived=now, **values))
+        archive_model.objects.bulk_create(archived, ignore_conflicts=True)
+        queryset.model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+def archive_transactions(queryset, archive_model: Type[models.Model], before: datetime, chunk_size: int = 500,
+                         compact: bool = False, max_chunks: int = None) -> int:
+    total, chunks = 0, 0
+    while max_chunks is None or chunks < max_chunks:
+        moved = archive_chunk(queryset, archive_model, before, chunk_size=chunk_size, compact=compact)
+        if not moved:
+            break
+        total += moved
+        chunks += 1
+        logger.info(f'Archived {moved} Transactions | Total: {total}')
+    return total
+
+
+def find_transaction(model: Type[models.Model], archive_model: Type[models.Model], **lookup):
+    """Support lookup that falls back to the archive when the transaction left the hot table."""
+    return model.objects.filter(**lookup).first() or archive_model.objects.filter(**lookup).first()
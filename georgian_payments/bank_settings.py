@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
 import os
+from typing import List
 
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = os.path.dirname(os.path.realpath(__file__))
 
+DEFAULT_UFC_SETTINGS = {
+    'cert_file': '',  # <BASE_DIR>/order/banks/ufc_cert_in_pem/ufc_cert.pem when empty
+    'key_file': '',
+}
+
 DEFAULT_CREDO_SETTINGS = {
     'merchant_id': '',
     'secret_key': ''
@@ -31,6 +38,10 @@ DEFAULT_BOG_SETTINGS = {
     "installment_success_redirect_url": "",
     "installment_fail_redirect_url": "",
     "installment_reject_redirect_url": "",
+    'installment_cache_alias': 'default',
+    'installment_cache_ttl': 60 * 60,
+    'installment_stale_ttl': 24 * 60 * 60,
+    'installment_amount_bucket': 1,  # tetri
 }
 
 DEFAULT_TBC_SETTINGS = {
@@ -54,10 +65,123 @@ DEFAULT_GEORGIAN_CARD_SETTINGS = {
     'bank_user_password': "",
     'back_url_s': '',
     'back_url_f': '',
+    'session_ttl': 300,
+}
+
+DEFAULT_OUTBOX_SETTINGS = {
+    'enabled': False,
+    'sinks': ['georgian_payments.outbox.SignalSink'],
+    'webhook_url': '',
+    'webhook_timeout': 5,
 }
 
+DEFAULT_PROFILING_SETTINGS = {
+    'enabled': False,
+    'sample_rate': 1.0,
+    'server_timing': True,
+    'paths': ['/callback/'],
+}
+
+DEFAULT_LOOPBACK_SETTINGS = {
+    'enabled': False,
+    'engines': [],  # [(payment_type, bank_type), ...], all when empty
+    'approve_rate': 0.9,
+    'decline_rate': 0.08,  # the rest time out
+    'callbacks': True,
+    'callback_workers': 8,
+    'callback_host': 'localhost',
+    'callback_url_name': 'loopback_callback-callback',
+    'latency': {
+        'start_payment': {'type': 'lognormal', 'median': 0.2, 'sigma': 0.4},
+        'check_status': {'type': 'lognormal', 'median': 0.1, 'sigma': 0.4},
+        'refund': {'type': 'lognormal', 'median': 0.2, 'sigma': 0.4},
+        'callback': {'type': 'exponential', 'mean': 2},
+    },
+}
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    'enabled': False,
+    'backend': 'cache',  # shared by all processes through the Django cache, or 'local' for one process
+    'cache_alias': 'default',
+    # calls per second and burst, by bank ('TBC') or bank and operation ('TBC:check_status'), e.g.
+    # {'TBC': {'rate': 10, 'burst': 20}, 'BOG:check_status': {'rate': 5, 'burst': 5}}
+    'limits': {},
+    'low_priority_reserve': 0.25,  # share of a burst only user facing calls may use
+    'max_wait': {'high': 5, 'low': 60},  # seconds, RateLimited is raised after
+    'retries_on_429': 2,
+    'retry_after': 1,  # seconds, when a 429 has no Retry-After
+}
+
+DEFAULT_SINGLE_FLIGHT_SETTINGS = {
+    'enabled': False,
+    'backend': 'local',  # coalesce within the process, or 'cache' to coalesce across processes too
+    'cache_alias': 'default',
+    'ttl': 2,  # seconds a bank status answer is reused, 'cache' needs it to hand the answer over
+    'wait': 30,  # seconds to wait for the call in flight before querying the bank anyway
+    'poll_interval': 0.05,  # seconds, 'cache' only
+}
+
+DEFAULT_STATUS_NOTIFY_SETTINGS = {
+    'enabled': False,
+    'backend': 'cache',  # 'postgres' (LISTEN/NOTIFY), 'cache' or 'local' (one process)
+    'cache_alias': 'default',
+    'channel': 'georgian_payments_status',  # 'postgres' only
+    'database': 'default',  # 'postgres' only, connection the listener is opened with
+    'poll_interval': 0.5,  # seconds, 'cache' only
+    'terminal_ttl': 3600,  # seconds a terminal status is answered from the cache
+    'max_wait': 25,  # seconds a long poll is held at most
+    'stream_for': 300,  # seconds an event stream is kept open at most
+    'heartbeat': 15,  # seconds between event stream keep-alive comments
+}
+
+DEFAULT_COMPACT_JSON_SETTINGS = {
+    'codec': 'auto',  # 'msgpack' (msgpack + zstd), 'json' (json + zlib) or 'auto', msgpack if it is installed
+    'zstd_level': 3,
+    'zstd_dictionary': '',  # path of a dictionary trained by `backfill_compact_json --train-dictionary`
+    'zlib_level': 6,
+}
+
+DEFAULT_TRACING_SETTINGS = {
+    'enabled': False,  # needs opentelemetry-api, spans go to the tracer provider the project configures
+    'tracer_name': 'georgian_payments',
+}
+
+UFC_SETTINGS = getattr(settings, 'UFC_SETTINGS', DEFAULT_UFC_SETTINGS)
 TBC_SETTINGS = getattr(settings, 'TBC_SETTINGS', DEFAULT_TBC_SETTINGS)
 BOG_SETTINGS = getattr(settings, 'BOG_SETTINGS', DEFAULT_BOG_SETTINGS)
 GEORGIAN_CARD_SETTINGS = getattr(settings, 'GEORGIAN_CARD_SETTINGS', DEFAULT_GEORGIAN_CARD_SETTINGS)
 CREDO_SETTINGS = getattr(settings, 'CREDO_SETTINGS', DEFAULT_CREDO_SETTINGS)
 SPACE_SETTINGS = getattr(settings, 'SPACE_SETTINGS', DEFAULT_SPACE_SETTINGS)
+OUTBOX_SETTINGS = getattr(settings, 'OUTBOX_SETTINGS', DEFAULT_OUTBOX_SETTINGS)
+PROFILING_SETTINGS = getattr(settings, 'PROFILING_SETTINGS', DEFAULT_PROFILING_SETTINGS)
+LOOPBACK_SETTINGS = getattr(settings, 'LOOPBACK_SETTINGS', DEFAULT_LOOPBACK_SETTINGS)
+RATE_LIMIT_SETTINGS = getattr(settings, 'RATE_LIMIT_SETTINGS', DEFAULT_RATE_LIMIT_SETTINGS)
+SINGLE_FLIGHT_SETTINGS = getattr(settings, 'SINGLE_FLIGHT_SETTINGS', DEFAULT_SINGLE_FLIGHT_SETTINGS)
+STATUS_NOTIFY_SETTINGS = getattr(settings, 'STATUS_NOTIFY_SETTINGS', DEFAULT_STATUS_NOTIFY_SETTINGS)
+COMPACT_JSON_SETTINGS = getattr(settings, 'COMPACT_JSON_SETTINGS', DEFAULT_COMPACT_JSON_SETTINGS)
+TRACING_SETTINGS = getattr(settings, 'TRACING_SETTINGS', DEFAULT_TRACING_SETTINGS)
+
+WARM_UP = getattr(settings, 'GEORGIAN_PAYMENTS_WARM_UP', False)
+BIN_RANGES_PATH = getattr(settings, 'GEORGIAN_PAYMENTS_BIN_RANGES', '')  # compiled by load_bin_ranges
+
+# {'merchant': {'BOG_SETTINGS': {...}, 'TBC_SETTINGS': {...}}}, only the keys that differ from the global settings
+MERCHANTS = getattr(settings, 'GEORGIAN_PAYMENTS_MERCHANTS', {})
+
+_merchant_settings = {}
+
+
+def get_bank_settings(name: str, merchant: str = '') -> dict:
+    """`name` settings (e.g. 'BOG_SETTINGS') of a merchant, the default merchant ('') uses the global ones."""
+    base = globals()[name]
+    if not merchant:
+        return base
+    if merchant not in MERCHANTS:
+        raise ImproperlyConfigured(f'Unknown Merchant: {merchant}')
+    key = (name, merchant)
+    if key not in _merchant_settings:
+        _merchant_settings[key] = {**base, **MERCHANTS[merchant].get(name, {})}
+    return _merchant_settings[key]
+
+
+def get_merchants() -> List[str]:
+    return ['', *MERCHANTS]
@@ -0,0 +1,176 @@
+"""
+Card brand, issuer and country by BIN range, from a table compiled by `python manage.py load_bin_ranges`.
+
+The compiled file holds sorted arrays of range starts and ends (PAN prefixes padded to `DIGITS` digits) and is
+memory mapped, so workers share its pages. A lookup bisects the starts between the bounds of its first 4 digits:
+
+    card_fields('5213721234567890')  # {'card_type': MASTERCARD, 'issuer': 'TBC Bank', 'country': 'GE'}
+
+Without `GEORGIAN_PAYMENTS_BIN_RANGES` (or for PANs outside the table) the brand falls back to
+`CardTypeChoices.get_card_type()`. The file is read once per process, restart workers after reloading it.
+"""
+import csv
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from georgian_payments.bank_settings import BIN_RANGES_PATH
+from georgian_payments.choices import CardTypeChoices
+
+DIGITS = 8
+BUCKET = 10 ** 4  # keys per bucket of the index narrowing the bisect, 10 ** 4 buckets by the first 4 digits
+MAGIC = b'GPBIN\x01'
+HEADER = struct.Struct('<6s2sII')  # magic, byte order of the arrays, ranges, profile table bytes
+BYTE_ORDERS = {'little': b'LE', 'big': b'BE'}
+LEADING_DIGITS = re.compile(r'[0-9]*')
+
+BinInfo = namedtuple('BinInfo', ['card_type', 'issuer', 'country'])
+BinRange = namedtuple('BinRange', ['start', 'end', 'info'])
+
+
+def bin_key(pan: str) -> Optional[int]:
+    """The PAN's first `DIGITS` digits as a number; masked digits of a masked PAN count as zeros."""
+    prefix = LEADING_DIGITS.match(pan, 0, DIGITS).group()
+    if len(prefix) < 4:
+        return None
+    return int(prefix.ljust(DIGITS, '0'))
+
+
+def card_type_by_name(name: str) -> CardTypeChoices:
+    name = name.strip().upper().replace(' ', '_')
+    return CardTypeChoices[name] if name in CardTypeChoices.names else CardTypeChoices.UNKNOWN
+
+
+def read_csv(f) -> Iterator[BinRange]:
+    """Rows of `bin_start,bin_end,brand,issuer,country`, BINs of up to `DIGITS` digits, `bin_end` may be empty."""
+    for row in csv.DictReader(f):
+        start = row['bin_start'].strip()
+        end = (row.get('bin_end') or '').strip() or start
+        if not (start.isdigit() and end.isdigit()):
+            continue
+        info = BinInfo(card_type_by_name(row.get('brand') or ''), (row.get('issuer') or '').strip(),
+                       (row.get('country') or '').strip().upper()[:2])
+        yield BinRange(int(start[:DIGITS].ljust(DIGITS, '0')), int(end[:DIGITS].ljust(DIGITS, '9')), info)
+
+
+def flatten(ranges: Iterable[BinRange]) -> List[BinRange]:
+    """
+    Disjoint sorted ranges. Where ranges overlap the narrowest wins (a bank's own 8 digit BINs inside a
+    network's 6 digit block), on equal width the later one.
+    """
+    ranges = sorted(enumerate(ranges), key=lambda item: item[1].start)
+    points = sorted({r.start for _, r in ranges} | {r.end + 1 for _, r in ranges})
+    active, flat, index = [], [], 0
+    for point, next_point in zip(points, points[1:]):
+        while index < len(ranges) and ranges[index][1].start <= point:
+            order, r = ranges[index]
+            heapq.heappush(active, (r.end - r.start, -order, r.end, r.info))
+            index += 1
+        while active and active[0][2] < point:
+            heapq.heappop(active)
+        if not active:
+            continue
+        info = active[0][3]
+        if flat and flat[-1].end + 1 == point and flat[-1].info == info:
+            flat[-1] = flat[-1]._replace(end=next_point - 1)
+        else:
+            flat.append(BinRange(point, next_point - 1, info))
+    return flat
+
+
+def write_table(ranges: Iterable[BinRange], path: str) -> int:
+    """Compiles `ranges` into the file `BinTable` maps, replacing it atomically. Returns the range count."""
+    ranges = flatten(ranges)
+    profiles, profile_ids = {}, array('I')
+    for r in ranges:
+        profile_ids.append(profiles.setdefault(r.info, len(profiles)))
+    table = json.dumps([[int(i.card_type), i.issuer, i.country] for i in profiles], ensure_ascii=False).encode()
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, BYTE_ORDERS[sys.byteorder], len(ranges), len(table)))
+        f.write(array('I', (r.start for r in ranges)).tobytes())
+        f.write(array('I', (r.end for r in ranges)).tobytes())
+        f.write(profile_ids.tobytes())
+        f.write(table)
+    os.replace(tmp_path, path)
+    return len(ranges)
+
+
+class BinTable:
+    def __init__(self, path: str = None):
+        self.starts: memoryview = memoryview(array('I'))
+        self.ends: memoryview = memoryview(array('I'))
+        self.profile_ids: memoryview = memoryview(array('I'))
+        self.profiles: Tuple[BinInfo, ...] = ()
+        self.index = array('I', [0] * (10 ** DIGITS // BUCKET + 1))
+        self._mmap = None
+        if path:
+            self._load(path)
+
+    def _load(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byte_order, count, table_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or byte_order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f'{path} Is Not A BIN Range Table Of This Platform, Run load_bin_ranges')
+        view, size = memoryview(self._mmap), count * 4
+        offset = HEADER.size
+        self.starts = view[offset:offset + size].cast('I')
+        self.ends = view[offset + size:offset + 2 * size].cast('I')
+        self.profile_ids = view[offset + 2 * size:offset + 3 * size].cast('I')
+        table = json.loads(bytes(view[offset + 3 * size:offset + 3 * size + table_size]))
+        self.profiles = tuple(BinInfo(CardTypeChoices(t), issuer, country) for t, issuer, country in table)
+        self.index = array('I', (bisect_left(self.starts, bucket * BUCKET) for bucket in range(len(self.index))))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def lookup(self, pan: str) -> Optional[BinInfo]:
+        prefix = pan[:DIGITS]
+        if len(prefix) == DIGITS and prefix.isdigit():
+            key = int(prefix)
+        else:
+            key = bin_key(pan)
+            if key is None:
+                return None
+        bucket = key // BUCKET
+        # starts before the bucket are left of its bound, so the range found may still start in an earlier one
+        index = bisect_right(self.starts, key, self.index[bucket], self.index[bucket + 1]) - 1
+        if index >= 0 and key <= self.ends[index]:
+            return self.profiles[self.profile_ids[index]]
+        return None
+
+
+_table: Optional[BinTable] = None
+_lock = threading.Lock()
+
+
+def get_table() -> BinTable:
+    global _table
+    if _table is None:
+        with _lock:
+            if _table is None:
+                _table = BinTable(BIN_RANGES_PATH if BIN_RANGES_PATH and os.path.exists(BIN_RANGES_PATH) else None)
+    return _table
+
+
+def lookup(pan: str) -> Optional[BinInfo]:
+    return get_table().lookup(pan)
+
+
+def card_fields(pan: str) -> dict:
+    """`Card` fields derived from the PAN: `card_type`, `issuer` and `country`."""
+    info = lookup(pan)
+    if info is None:
+        return {'card_type': CardTypeChoices.get_card_type(pan), 'issuer': '', 'country': ''}
+    card_type = info.card_type if info.card_type != CardTypeChoices.UNKNOWN else CardTypeChoices.get_card_type(pan)
+    return {'card_type': card_type, 'issuer': info.issuer, 'country': info.country}
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Dict, Tuple, Optional
+
+from django.db import connections, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+from loguru import logger
+
+from georgian_payments.bank_settings import OUTBOX_SETTINGS
+from georgian_payments.choices import BulkActionChoices, BulkItemStatusChoices, PaymentEventTypeChoices
+from georgian_payments.models import BulkOperationItem, PaymentEvent
+from georgian_payments.ratelimit import operation, LOW
+
+
+def enqueue(batch: str, transaction_ids: Iterable, action: BulkActionChoices, amount: float = None,
+            amounts: Dict[str, float] = None) -> int:
+    """
+    Registers transactions for a bulk operation. Already registered (batch, transaction, action)
+    triples are ignored, so enqueueing the same ID file twice is harmless.
+    """
+    amounts = amounts or {}
+    items = [
+        BulkOperationItem(batch=batch, transaction_id=str(pk), action=action, amount=amounts.get(str(pk), amount))
+        for pk in transaction_ids
+    ]
+    BulkOperationItem.objects.bulk_create(items, ignore_conflicts=True, batch_size=1000)
+    return len(items)
+
+
+def execute(transaction, action: int, amount: Optional[float]) -> Tuple[bool, dict, float]:
+    engine = transaction.engine
+    amount = amount if amount is not None else round(transaction.amount - transaction.refunded, 2)
+    if action == BulkActionChoices.REFUND:
+        is_ok, data = engine.refund(amount)
+    elif action == BulkActionChoices.CANCEL:
+        is_ok, data = engine.cancel(amount)
+    elif action == BulkActionChoices.FINISH_PRE_AUTH:
+        if not hasattr(engine, 'finish_pre_auth'):
+            return False, {'message': f'{engine} Does Not Support Pre Auth'}, amount
+        from georgian_payments.sdk.bog import PreAuthChoices
+
+        status = PreAuthChoices.FULL_COMPLETE
+        if amount != transaction.amount:
+            status = PreAuthChoices.PARTIAL_COMPLETE
+        data = engine.finish_pre_auth(status, amount=amount if status == PreAuthChoices.PARTIAL_COMPLETE else None)
+        is_ok = isinstance(data, dict)
+        data = data if is_ok else {'HTTP_STATUS_CODE': data}
+    else:
+        return False, {'message': f'Unknown Action {action}'}, amount
+    return is_ok, data, amount
+
+
+class BulkOperationRunner:
+    def __init__(self, transaction_model, batch: str, workers: int = 8, chunk_size: int = 200,
+                 retry_processing: bool = False):
+        self.model = transaction_model
+        self.batch = batch
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.retry_processing = retry_processing
+
+    def pending_items(self):
+        statuses = [BulkItemStatusChoices.PENDING]
+        if self.retry_processing:
+            statuses.append(BulkItemStatusChoices.PROCESSING)
+        return BulkOperationItem.objects.filter(batch=self.batch, status__in=statuses).order_by('pk')
+
+    def _process(self, item: BulkOperationItem, transaction) -> BulkOperationItem:
+        try:
+            if transaction is None:
+                item.status, item.result = BulkItemStatusChoices.FAILED, {'message': 'Transaction Not Found'}
+                return item
+            with operation(BulkActionChoices(item.action).name.lower(), LOW):  # pool threads start without context
+                is_ok, data, amount = execute(transaction, item.action, item.amount)
+            item.status = BulkItemStatusChoices.SUCCESS if is_ok else BulkItemStatusChoices.FAILED
+            item.result = data
+            if is_ok:
+                item.amount = amount
+        except Exception as e:
+            logger.error(f'Bulk Operation | {self.batch} | Transaction ID: {item.transaction_id} | {e}')
+            item.status, item.result = BulkItemStatusChoices.FAILED, {'error': str(e)}
+        finally:
+            connections.close_all()
+        return item
+
+    def run_chunk(self, items) -> Dict[int, int]:
+        ids = [item.pk for item in items]
+        # Checkpoint before calling banks: a crash mid-chunk leaves PROCESSING items which are not
+        # retried blindly, so a rerun never refunds the same transaction twice.
+        BulkOperationItem.objects.filter(pk__in=ids).update(
+            status=BulkItemStatusChoices.PROCESSING, updated=timezone.now()
+        )
+        # data_log is not loaded up front: PostgreSQL appends to a jsonb one in SQL, elsewhere it is read at the
+        # append below, so entries logged by callbacks during the bank calls are kept
+        transactions = self.model.objects.select_related('payment_method').defer('data_log').in_bulk(
+            [item.transaction_id for item in items]
+        )
+        transactions = {str(pk): transaction for pk, transaction in transactions.items()}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            done = list(executor.map(lambda i: self._process(i, transactions.get(i.transaction_id)), items))
+
+        now = timezone.now()
+        for item in done:
+            item.updated = now
+        succeed = [item for item in done if item.status == BulkItemStatusChoices.SUCCESS]
+        events = []
+        with db_transaction.atomic():
+            BulkOperationItem.objects.bulk_update(done, ['status', 'result', 'amount', 'updated'])
+            # per row, so log entries and refunds written by callbacks meanwhile are kept
+            for item in succeed:
+                transaction = transactions[item.transaction_id]
+                transaction.append_data_log(item.result)
+                if item.action not in (BulkActionChoices.REFUND, BulkActionChoices.CANCEL):
+                    continue
+                self.model.objects.filter(pk=transaction.pk).update(refunded=F('refunded') + item.amount)
+                if OUTBOX_SETTINGS['enabled']:
+                    transaction.refresh_from_db(fields=['refunded'])
+                    events.append(PaymentEvent.build(transaction, PaymentEventTypeChoices.REFUNDED,
+                                                     refund_amount=item.amount))
+            PaymentEvent.objects.bulk_create(events)
+        stats = {}
+        for item in done:
+            stats[item.status] = stats.get(item.status, 0) + 1
+        return stats
+
+    def run(self) -> Dict[int, int]:
+        totals = {}
+        while True:
+            items = list(self.pending_items()[:self.chunk_size])
+            if not items:
+                break
+            for status, count in self.run_chunk(items).items():
+                totals[status] = totals.get(status, 0) + count
+            logger.info(f'Bulk Operation | {self.batch} | {totals}')
+        return totals
+
@@ -6,15 +6,24 @@ class CardTypeChoices(IntegerChoices):
     MASTERCARD = 2, "Mastercard"
     AMERICAN_EXPRESS = 3, "American Express"
     UNKNOWN = 4, 'Unknown'
+    MAESTRO = 5, 'Maestro'
+    UNIONPAY = 6, 'UnionPay'
 
     @classmethod
     def get_card_type(cls, pan: str):
-        if pan[0] == "4":
+        """Brand by the network's prefixes, `georgian_payments.bin_ranges` knows the exact ranges."""
+        if pan[0:1] == "4":
             return cls.VISA
-        if pan[0] == "5":
-            return cls.MASTERCARD
         if pan[0:2] in ("34", "37"):
             return cls.AMERICAN_EXPRESS
+        if "51" <= pan[0:2] <= "55" or (pan[0:4].isdigit() and "2221" <= pan[0:4] <= "2720"):
+            return cls.MASTERCARD
+        if pan[0:2] in ("62", "81"):
+            return cls.UNIONPAY
+        if pan[0:2] in ("50", "56", "57", "58", "63", "67"):
+            return cls.MAESTRO
+        if pan[0:1] == "5":
+            return cls.MASTERCARD
         return cls.UNKNOWN
 
 
@@ -55,3 +64,21 @@ class ManualActionChoices(IntegerChoices):
     REFUND_LOAN = 2, "გასაუქმებელია განვადება"
     CALL_FOR_LOAN_CANCEL = 3, "დასარეკია მომხმარებელთან განვადების გაუქმებაზე"
     TBC_LOAN_CONTRIBUTION = 4, "მომხმარებელს გადასახდელი აქვს თანამონაწილეობის თანხა"
+
+
+class BulkActionChoices(IntegerChoices):
+    REFUND = 1, 'Refund'
+    CANCEL = 2, 'Cancel'
+    FINISH_PRE_AUTH = 3, 'Finish Pre Auth'
+
+
+class BulkItemStatusChoices(IntegerChoices):
+    FAILED = -1, 'Failed'
+    PENDING = 0, 'Pending'
+    SUCCESS = 1, 'Success'
+    PROCESSING = 2, 'Processing'
+
+
+class PaymentEventTypeChoices(IntegerChoices):
+    STATUS_CHANGED = 1, 'Status Changed'
+    REFUNDED = 2, 'Refunded'
@@ -0,0 +1,135 @@
+import csv
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, Sequence, Dict, Any, IO, List
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = (
+    'id',
+    'trx',
+    'pay_id',
+    'amount',
+    'refunded',
+    'card_hash',
+    'status',
+    'transaction_type',
+    'payment_method__bank_type',
+    'payment_method__payment_type',
+    'user_id',
+    'created',
+    'updated',
+)
+DATA_LOG_PREFIX = 'data_log.'
+ARROW_NATIVE_TYPES = (str, int, float, bool, datetime)
+
+
+def filter_transactions(queryset, date_from: datetime = None, date_to: datetime = None, bank_type: int = None,
+                        status: int = None):
+    if date_from is not None:
+        queryset = queryset.filter(created__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(created__lt=date_to)
+    if bank_type is not None:
+        queryset = queryset.filter(payment_method__bank_type=bank_type)
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def flatten_data_log(data_log: list, keys: Sequence[str]) -> Dict[str, Any]:
+    """
+    Picks the latest value of every key from data_log. Entries wrapped by a label
+    (e.g. {'Register Data': {...}}) are searched one level deep.
+    """
+    flat = {f'{DATA_LOG_PREFIX}{key}': None for key in keys}
+    missing = set(keys)
+    for entry in reversed(data_log or []):
+        if not missing:
+            break
+        if not isinstance(entry, dict):
+            continue
+        for key in list(missing):
+            value = entry.get(key)
+            if value is None:
+                value = next((v.get(key) for v in entry.values() if isinstance(v, dict) and key in v), None)
+            if value is not None:
+                flat[f'{DATA_LOG_PREFIX}{key}'] = value
+                missing.discard(key)
+    return flat
+
+
+def export_columns(data_log_fields: Sequence[str] = ()) -> List[str]:
+    return [*EXPORT_FIELDS, *(f'{DATA_LOG_PREFIX}{key}' for key in data_log_fields)]
+
+
+def iter_transactions(queryset, data_log_fields: Sequence[str] = (), chunk_size: int = 2000) -> Iterator[dict]:
+    """
+    Streams transactions as flat dicts. `iterator()` keeps only one chunk in memory and
+    uses a server-side cursor on backends that support it.
+    """
+    fields = EXPORT_FIELDS + ('data_log',) if data_log_fields else EXPORT_FIELDS
+    for row in queryset.order_by().values(*fields).iterator(chunk_size=chunk_size):
+        if data_log_fields:
+            row.update(flatten_data_log(row.pop('data_log'), data_log_fields))
+        yield row
+
+
+def write_csv(rows: Iterable[dict], stream: IO, columns: Sequence[str]) -> int:
+    writer = csv.DictWriter(stream, fieldnames=columns)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows: Iterable[dict], stream: IO) -> int:
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def write_parquet(rows: Iterable[dict], path: str, batch_size: int = 2000) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Parquet export requires pyarrow: pip install pyarrow')
+
+    writer, schema, count = None, None, 0
+    batch = []
+
+    def flush():
+        nonlocal writer, schema
+        for row in batch:
+            for key, value in row.items():
+                if value is None:
+                    continue
+                if key.startswith(DATA_LOG_PREFIX) or not isinstance(value, ARROW_NATIVE_TYPES):
+                    row[key] = str(value)
+        if schema is None:
+            table = pa.Table.from_pylist(batch)
+            schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+            ])
+            writer = pq.ParquetWriter(path, schema)
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        batch.clear()
+
+    try:
+        for row in rows:
+            batch.append(row)
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
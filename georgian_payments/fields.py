@@ -0,0 +1,188 @@
+"""
+`CompactJSONField`, an opt-in compressed column for the bank payloads in `data_log` and `additional_data`.
+Configured by `COMPACT_JSON_SETTINGS`.
+
+Values are msgpack encoded and zstd compressed (with a shared dictionary trained on our payloads, if one is
+configured) when `pip install georgian-django-payments[compact]` is installed, JSON and zlib otherwise. The first
+byte of a value names its codec, so values written by either stay readable. The column cannot be queried in SQL,
+`summary_field` keeps the top level scalars of the payloads in a JSON column that can:
+
+    data_log = CompactJSONField(default=list, summary_field='data_log_summary')
+    data_log_summary = models.JSONField(default=dict)
+    ...filter(data_log_summary__RESULT_CODE='116')
+"""
+import json
+import threading
+import zlib
+from typing import Any, Iterable, Optional
+
+from django.db import models, transaction
+
+from georgian_payments.bank_settings import COMPACT_JSON_SETTINGS
+
+COMPACT_JSON = COMPACT_JSON_SETTINGS
+
+RAW_JSON, JSON_ZLIB, MSGPACK_ZSTD = b'\x00', b'\x01', b'\x02'
+SUMMARY_MAX_KEYS = 64
+SUMMARY_MAX_LENGTH = 64
+
+_zstd = threading.local()
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError('msgpack codec requires msgpack: pip install georgian-django-payments[compact]')
+    return msgpack
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('msgpack codec requires zstandard: pip install georgian-django-payments[compact]')
+    return zstandard
+
+
+def msgpack_available() -> bool:
+    try:
+        _msgpack(), _zstandard()
+    except ImportError:
+        return False
+    return True
+
+
+def default_codec() -> bytes:
+    codec = COMPACT_JSON.get('codec', 'auto')
+    if codec == 'auto':
+        return MSGPACK_ZSTD if msgpack_available() else JSON_ZLIB
+    return {'json': JSON_ZLIB, 'msgpack': MSGPACK_ZSTD}[codec]
+
+
+def _zstd_pair():
+    """Compressor and decompressor with the shared dictionary, if there is one. They are not thread safe, so
+    each thread builds its own."""
+    if not hasattr(_zstd, 'pair'):
+        zstandard = _zstandard()
+        path, level = COMPACT_JSON.get('zstd_dictionary', ''), COMPACT_JSON.get('zstd_level', 3)
+        if path:
+            with open(path, 'rb') as f:
+                dictionary = zstandard.ZstdCompressionDict(f.read())
+            _zstd.pair = (zstandard.ZstdCompressor(level=level, dict_data=dictionary),
+                          zstandard.ZstdDecompressor(dict_data=dictionary))
+        else:
+            _zstd.pair = (zstandard.ZstdCompressor(level=level), zstandard.ZstdDecompressor())
+    return _zstd.pair
+
+
+def encode(value, codec: bytes = None) -> bytes:
+    codec = codec or default_codec()
+    if codec == MSGPACK_ZSTD:
+        packed = _msgpack().packb(value, use_bin_type=True)
+        compressed = _zstd_pair()[0].compress(packed)
+    else:
+        packed = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode()
+        compressed = zlib.compress(packed, COMPACT_JSON.get('zlib_level', 6))
+    if len(compressed) >= len(packed) and codec != MSGPACK_ZSTD:
+        return RAW_JSON + packed  # too small to gain from compression
+    return codec + compressed
+
+
+def decode(data: bytes):
+    codec, payload = data[:1], data[1:]
+    if codec == RAW_JSON:
+        return json.loads(payload)
+    if codec == JSON_ZLIB:
+        return json.loads(zlib.decompress(payload))
+    if codec == MSGPACK_ZSTD:
+        return _msgpack().unpackb(_zstd_pair()[1].decompress(payload), raw=False, strict_map_key=False)
+    raise ValueError(f'Unknown Compact JSON Codec {codec!r}')
+
+
+def train_dictionary(values: Iterable[Any], size: int = 64 * 1024) -> bytes:
+    """zstd dictionary trained on msgpack encoded `values`, for `COMPACT_JSON_SETTINGS['zstd_dictionary']`."""
+    msgpack = _msgpack()
+    samples = [msgpack.packb(value, use_bin_type=True) for value in values]
+    return _zstandard().train_dictionary(size, samples).as_bytes()
+
+
+def summarize(value) -> dict:
+    """
+    Scalar values of the payload (of a list of payloads the latest one wins), labelled payloads like
+    {'Register Data': {...}} one level deep, for JSON lookups the compressed column cannot serve.
+    """
+    summary = {}
+    for entry in value if isinstance(value, list) else [value]:
+        if not isinstance(entry, dict):
+            continue
+        for key, item in entry.items():
+            items = item.items() if isinstance(item, dict) else ((key, item),)
+            for item_key, item_value in items:
+                if item_value is None or isinstance(item_value, (dict, list)):
+                    continue
+                if isinstance(item_value, str) and len(item_value) > SUMMARY_MAX_LENGTH:
+                    continue
+                if item_key in summary or len(summary) < SUMMARY_MAX_KEYS:
+                    summary[item_key] = item_value
+    return summary
+
+
+class CompactJSONField(models.BinaryField):
+    description = 'JSON stored compressed'
+
+    def __init__(self, *args, summary_field: Optional[str] = None, **kwargs):
+        self.summary_field = summary_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.summary_field:
+            kwargs['summary_field'] = self.summary_field
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else decode(bytes(value))
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decode(bytes(value))
+        if isinstance(value, str):
+            return json.loads(value)  # serialized by value_to_string()
+        return value
+
+    def get_prep_value(self, value):
+        return None if value is None else encode(value)
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj))
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if self.summary_field:
+            setattr(model_instance, self.summary_field, summarize(value))
+        return value
+
+
+def backfill(model, source: str, target: str, chunk_size: int = 500) -> int:
+    """
+    Copies `source` into `target` of every row, in chunks ordered by primary key, e.g. a `JSONField` into the
+    `CompactJSONField` replacing it, or back to roll that back. The summary of a compact `target` is written along.
+    """
+    summary_field = getattr(model._meta.get_field(target), 'summary_field', None)
+    fields = [target, summary_field] if summary_field else [target]
+    queryset, last_pk, total = model._base_manager.order_by('pk'), None, 0
+    while True:
+        rows = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(rows.values_list('pk', source)[:chunk_size])
+        if not rows:
+            return total
+        instances = []
+        for pk, value in rows:
+            instance = model(pk=pk, **{target: value})
+            if summary_field:
+                setattr(instance, summary_field, summarize(value))
+            instances.append(instance)
+        with transaction.atomic(using=queryset.db):
+            model._base_manager.using(queryset.db).bulk_update(instances, fields)
+        last_pk, total = rows[-1][0], total + len(rows)
@@ -0,0 +1,58 @@
+import os
+import socket
+from datetime import timedelta, datetime
+from typing import List, Iterator
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+DEFAULT_LEASE = timedelta(minutes=5)
+
+
+def default_owner() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(queryset, owner: str, since: datetime, limit: int = 50, lease_for: timedelta = DEFAULT_LEASE) -> List:
+    """
+    Leases up to `limit` rows of `queryset` to `owner`. Rows locked by another poller are skipped
+    (SKIP LOCKED), and rows whose lease ended after `since` were already handled during this run.
+    A crashed worker's rows become claimable again once their lease expires.
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        pks = list(
+            queryset.filter(Q(lease_expires__isnull=True) | Q(lease_expires__lt=min(since, now)))
+            .order_by('pk')
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('pk', flat=True)[:limit]
+        )
+        if pks:
+            queryset.model.objects.filter(pk__in=pks).update(lease_owner=owner, lease_expires=now + lease_for)
+    return pks
+
+
+def release(model, pks: List, owner: str):
+    model.objects.filter(pk__in=pks, lease_owner=owner).update(lease_owner='', lease_expires=timezone.now())
+
+
+def iter_claimed(queryset, owner: str = None, batch_size: int = 50, lease_for: timedelta = DEFAULT_LEASE,
+                 fetch=None) -> Iterator:
+    """
+    Yields transactions from `queryset` that no other poller process is working on, loaded through
+    `fetch` (e.g. `objects.for_status_sync()`) when given.
+    """
+    owner = owner or default_owner()
+    since = timezone.now()
+    model = queryset.model
+    fetch = model.objects.all() if fetch is None else fetch
+    while True:
+        pks = claim(queryset, owner, since, limit=batch_size, lease_for=lease_for)
+        if not pks:
+            return
+        try:
+            for transaction in fetch.filter(pk__in=pks).order_by('pk').iterator(chunk_size=batch_size):
+                yield transaction
+        finally:
+            release(model, pks, owner)
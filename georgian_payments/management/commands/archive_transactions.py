@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from georgian_payments.archive import archive_transactions
+from georgian_payments.models import PaymentTransaction, ArchivedPaymentTransaction
+
+
+class Command(BaseCommand):
+    help = "Move Terminal Transactions Older Than Retention Into Archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Retention horizon in days')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--max-chunks', type=int, default=None, help='Stop after N chunks, rerun to resume')
+        parser.add_argument('--compact-data-log', action='store_true', help='Drop duplicated data_log payloads')
+
+    def handle(self, *args, **options):
+        total = archive_transactions(
+            PaymentTransaction.objects.all(),
+            ArchivedPaymentTransaction,
+            before=timezone.now() - timedelta(days=options['days']),
+            chunk_size=options['chunk_size'],
+            compact=options['compact_data_log'],
+            max_chunks=options['max_chunks'],
+        )
+        self.stdout.write(f'Archived {total} Transactions')
@@ -0,0 +1,42 @@
+from django.apps import apps
+from django.core.management import BaseCommand, CommandError
+
+from georgian_payments.fields import backfill, train_dictionary
+
+
+class Command(BaseCommand):
+    help = "Copy A JSON Column Into A CompactJSONField Column (Or Back), Or Train Its zstd Dictionary"
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='app_label.ModelName')
+        parser.add_argument('source', help='Field copied from, e.g. data_log')
+        parser.add_argument('target', nargs='?', help='Field copied into, e.g. data_log_compact')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--train-dictionary', metavar='PATH',
+                            help='Write a zstd dictionary trained on the source values to PATH instead')
+        parser.add_argument('--samples', type=int, default=5000, help='Values the dictionary is trained on')
+        parser.add_argument('--dictionary-size', type=int, default=64 * 1024, help='Dictionary size in bytes')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(f'Unknown Model: {e}')
+        source = options['source']
+        if options['train_dictionary']:
+            values = model._base_manager.order_by('-pk').values_list(source, flat=True)[:options['samples']]
+            try:
+                dictionary = train_dictionary(values.iterator(), options['dictionary_size'])
+            except ImportError as e:
+                raise CommandError(str(e))
+            with open(options['train_dictionary'], 'wb') as f:
+                f.write(dictionary)
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(dictionary)} Byte Dictionary Written To {options["train_dictionary"]}, '
+                f'Set COMPACT_JSON_SETTINGS["zstd_dictionary"] Before Backfilling'
+            ))
+            return
+        if not options['target']:
+            raise CommandError('Pass The Target Field Or --train-dictionary')
+        total = backfill(model, source, options['target'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Copied {source} Into {options["target"]} For {total} Rows'))
@@ -0,0 +1,51 @@
+from django.core.management import BaseCommand
+
+from georgian_payments.bulk import enqueue, BulkOperationRunner
+from georgian_payments.choices import BulkActionChoices, BulkItemStatusChoices
+from georgian_payments.models import PaymentTransaction
+
+
+def read_ids_file(path):
+    """One transaction ID per line, optionally followed by a comma and an amount."""
+    ids, amounts = [], {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            pk, _, amount = line.partition(',')
+            pk = pk.strip()
+            ids.append(pk)
+            if amount.strip():
+                amounts[pk] = float(amount)
+    return ids, amounts
+
+
+class Command(BaseCommand):
+    help = "Bulk Refund / Cancel / Finish Pre Auth With Checkpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', required=True, help='Batch name, rerun with the same name to resume')
+        parser.add_argument('--action', choices=[c.lower() for c in BulkActionChoices.names], required=True)
+        parser.add_argument('--ids-file', help='Transaction IDs to enqueue into the batch')
+        parser.add_argument('--amount', type=float, default=None,
+                            help='Amount for every transaction, defaults to the not refunded amount')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--chunk-size', type=int, default=200)
+        parser.add_argument('--retry-processing', action='store_true',
+                            help='Also retry items interrupted in the middle of a bank call')
+
+    def handle(self, *args, **options):
+        action = BulkActionChoices[options['action'].upper()]
+        if options['ids_file']:
+            ids, amounts = read_ids_file(options['ids_file'])
+            enqueue(options['batch'], ids, action, amount=options['amount'], amounts=amounts)
+        totals = BulkOperationRunner(
+            PaymentTransaction,
+            options['batch'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            retry_processing=options['retry_processing'],
+        ).run()
+        for status, count in totals.items():
+            self.stdout.write(f'{BulkItemStatusChoices(status).label}: {count}')
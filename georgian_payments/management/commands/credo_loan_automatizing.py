@@ -5,20 +5,30 @@ from django.utils import timezone
 from django.utils.timezone import localtime
 
 from georgian_payments.choices import BankTypeChoices, PaymentTypeChoices, PTTChoices, PTSChoices
+from georgian_payments.leases import iter_claimed
 from georgian_payments.models import PaymentTransaction
+from georgian_payments.ratelimit import operation, LOW
 
 
 class Command(BaseCommand):
     help = "Register Order Automation With Credo"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--lease-seconds', type=int, default=300)
+
     def handle(self, *args, **options):
         queryset = PaymentTransaction.objects.filter(
             status=PTSChoices.PENDING,
             payment_method__bank_type=BankTypeChoices.CREDO,
-            payment_method__payment_method=PaymentTypeChoices.LOAN,
+            payment_method__payment_type=PaymentTypeChoices.LOAN,
             trx__isnull=False,
             updated__gte=localtime(timezone.now()) - timedelta(days=3),
             transaction_type=PTTChoices.PAY
-        ).exclude(trx='').order_by('-pk').distinct()
-        for transaction in queryset:  # type: PaymentTransaction
-            transaction.sync_status()
+        ).exclude(trx='')
+        fetch = PaymentTransaction.objects.for_status_sync()
+        for transaction in iter_claimed(queryset, batch_size=options['batch_size'],
+                                        lease_for=timedelta(seconds=options['lease_seconds']),
+                                        fetch=fetch):  # type: PaymentTransaction
+            with operation('poll', LOW):
+                transaction.sync_status()
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management import BaseCommand
+
+from georgian_payments.outbox import dispatch, get_sinks
+
+
+class Command(BaseCommand):
+    help = "Deliver Payment Status Events From Outbox To Configured Sinks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep dispatching instead of draining once')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when outbox is empty')
+
+    def handle(self, *args, **options):
+        sinks = get_sinks()
+        total = 0
+        while True:
+            delivered = dispatch(options['batch_size'], sinks)
+            total += delivered
+            if delivered:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Delivered {total} Events')
@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from georgian_payments.choices import PaymentTypeChoices, BankTypeChoices
+from georgian_payments.models import PaymentTransaction
+from georgian_payments.timeouts import get_policies, sweep
+
+
+class Command(BaseCommand):
+    help = "Expire Stale Pending Transactions By Timeout Policies"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--no-confirm', action='store_true',
+                            help='Expire without asking banks whose policy requires confirmation')
+
+    def handle(self, *args, **options):
+        for policy in get_policies().values():
+            stats = sweep(PaymentTransaction.objects.all(), policy, options['chunk_size'],
+                          confirm=not options['no_confirm'])
+            self.stdout.write(
+                f'{BankTypeChoices(policy.bank_type).label} - {PaymentTypeChoices(policy.payment_type).label} | {stats}'
+            )
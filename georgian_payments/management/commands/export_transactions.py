@@ -0,0 +1,62 @@
+import sys
+from datetime import datetime
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from georgian_payments.choices import BankTypeChoices, PTSChoices
+from georgian_payments.export import filter_transactions, iter_transactions, export_columns, write_csv, \
+    write_jsonl, write_parquet
+from georgian_payments.models import PaymentTransaction
+
+
+def parse_date(value: str) -> datetime:
+    date = datetime.fromisoformat(value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Command(BaseCommand):
+    help = "Stream Payment Transactions To CSV, JSONL Or Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl', 'parquet'], default='csv')
+        parser.add_argument('--output', default='-', help="File path, '-' writes csv/jsonl to stdout")
+        parser.add_argument('--from', dest='date_from', type=parse_date, help='Created at or after (ISO date)')
+        parser.add_argument('--to', dest='date_to', type=parse_date, help='Created before (ISO date)')
+        parser.add_argument('--bank', choices=BankTypeChoices.names)
+        parser.add_argument('--status', choices=PTSChoices.names)
+        parser.add_argument('--data-log-field', dest='data_log_fields', action='append', default=[],
+                            help='data_log key to flatten into its own column, can be repeated')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = filter_transactions(
+            PaymentTransaction.objects.all(),
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            bank_type=BankTypeChoices[options['bank']] if options['bank'] else None,
+            status=PTSChoices[options['status']] if options['status'] else None,
+        )
+        rows = iter_transactions(queryset, options['data_log_fields'], chunk_size=options['chunk_size'])
+        output, export_format = options['output'], options['format']
+
+        if export_format == 'parquet':
+            if output == '-':
+                raise CommandError('Parquet Export Needs --output File')
+            try:
+                count = write_parquet(rows, output, batch_size=options['chunk_size'])
+            except ImportError as e:
+                raise CommandError(str(e))
+        else:
+            stream = sys.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+            try:
+                if export_format == 'csv':
+                    count = write_csv(rows, stream, export_columns(options['data_log_fields']))
+                else:
+                    count = write_jsonl(rows, stream)
+            finally:
+                if stream is not sys.stdout:
+                    stream.close()
+        self.stderr.write(f'Exported {count} Transactions')
@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand, CommandError
+
+from georgian_payments.bank_settings import BIN_RANGES_PATH
+from georgian_payments.bin_ranges import read_csv, write_table, BinTable
+
+
+class Command(BaseCommand):
+    help = "Compile A BIN Range CSV Into The Table Card Brand, Issuer And Country Are Looked Up In"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help='Rows of bin_start,bin_end,brand,issuer,country with a header')
+        parser.add_argument('--output', default=BIN_RANGES_PATH,
+                            help='Compiled table, GEORGIAN_PAYMENTS_BIN_RANGES by default')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if not output:
+            raise CommandError('Set GEORGIAN_PAYMENTS_BIN_RANGES Or Pass --output')
+        try:
+            with open(options['csv'], newline='', encoding='utf-8') as f:
+                count = write_table(read_csv(f), output)
+        except (OSError, KeyError) as e:
+            raise CommandError(f'BIN Ranges Could Not Be Loaded: {e!r}')
+        BinTable(output)  # fails here, not in the workers, if the file is unreadable
+        self.stdout.write(self.style.SUCCESS(f'{count} BIN Ranges Written To {output}, Restart The Workers'))
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from georgian_payments.choices import BankTypeChoices
+from georgian_payments.models import PaymentTransaction
+from georgian_payments.replay import extract, dump, load, plan, CallbackReplayer
+
+
+class Command(BaseCommand):
+    help = "Replay Recorded Bank Callbacks From Data Log For Load Testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', action='append', default=[], help='BOG, GC, SPACE or TBC, can be repeated')
+        parser.add_argument('--days', type=int, default=7, help='Take payloads of transactions from last N days')
+        parser.add_argument('--limit', type=int, help='Max transactions to extract payloads from')
+        parser.add_argument('--dump', help='Write anonymized payloads to a JSONL file and exit')
+        parser.add_argument('--load', help='Replay payloads from a JSONL file written by --dump')
+        parser.add_argument('--rate', type=float, help='Requests per second, unlimited by default')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duplicates', type=float, default=0.0, help='Share of callbacks delivered twice')
+        parser.add_argument('--shuffle', action='store_true', help='Deliver callbacks out of order')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--base-url', help='Send over HTTP to a running server instead of in-process')
+        parser.add_argument('--basic-auth', help='user:password for Georgian Card callbacks')
+        parser.add_argument('--host', help='Host header for in-process requests')
+        parser.add_argument('--url-namespace', help='Namespace the callback URLs are included under')
+
+    def handle(self, *args, **options):
+        if options['load']:
+            requests = load(options['load'])
+        else:
+            queryset = PaymentTransaction.objects.filter(
+                created__gte=timezone.now() - timedelta(days=options['days'])
+            )
+            if options['bank']:
+                banks = [BankTypeChoices[bank.upper()] for bank in options['bank']]
+                queryset = queryset.filter(payment_method__bank_type__in=banks)
+            if options['limit']:
+                queryset = queryset.order_by('-pk')[:options['limit']]
+            if options['dump']:
+                count = dump(extract(queryset), options['dump'])
+                self.stdout.write(f'Dumped {count} Callbacks To {options["dump"]}')
+                return
+            requests = list(extract(queryset))
+        if not requests:
+            raise CommandError('No Callbacks To Replay')
+
+        requests = plan(requests, options['duplicates'], options['shuffle'], options['seed'])
+        replayer = CallbackReplayer(
+            base_url=options['base_url'], basic_auth=options['basic_auth'], host=options['host'],
+            url_namespace=options['url_namespace'], concurrency=options['concurrency'], rate=options['rate'],
+        )
+        report = replayer.run(requests)
+        for key, value in report.summary().items():
+            self.stdout.write(f'{key}: {value}')
+        for result in report.results:
+            if result.error:
+                self.stderr.write(f'{result.kind}: {result.error}')
@@ -1,9 +1,13 @@
+from typing import List
+
 from django.core.management import BaseCommand
 
 from loguru import logger
 
+from georgian_payments.bank_settings import get_merchants
 from georgian_payments.choices import ManualActionChoices
 from georgian_payments.models import PaymentTransaction
+from georgian_payments.ratelimit import operation, LOW
 from georgian_payments.sdk.tbc import TbcInstallmentSDK
 
 
@@ -11,16 +15,31 @@ class Command(BaseCommand):
     help = "TBC Loan Automation"
 
     def handle(self, *args, **options):
-        tbc = TbcInstallmentSDK()
+        # Merchants sharing TBC credentials share one status change feed
+        feeds = {}
+        for merchant in get_merchants():
+            feeds.setdefault(TbcInstallmentSDK(merchant=merchant).merchant_key, []).append(merchant)
+        with operation('poll', LOW):
+            for merchants in feeds.values():
+                self.sync_merchants(merchants)
+
+    def sync_merchants(self, merchants: List[str]):
+        merchant = merchants[0]
+        tbc = TbcInstallmentSDK(merchant=merchant)
         data = tbc.status_changes()
         logger.info(data)
         if not data or data.get("status") == 500:
             return
         request_id = data['synchronizationRequestId']
+        transactions = {
+            t.trx: t for t in PaymentTransaction.objects.for_status_sync().filter(
+                trx__in=[change['sessionId'] for change in data['statusChanges']], merchant__in=merchants
+            ).order_by('-pk')  # the first transaction of a session wins, like .first() did
+        }
         for change in data['statusChanges']:
             session_id = change['sessionId']
             status_id = change['statusId']
-            transaction: PaymentTransaction = PaymentTransaction.objects.filter(trx=session_id).first()
+            transaction: PaymentTransaction = transactions.get(session_id)
             if transaction is None:
                 continue
             is_ok = 0
@@ -44,5 +63,5 @@ class Command(BaseCommand):
                     'TBC Loan Status Sync Error: '
                     f'Transaction ID: {transaction.id}, NewStatus: {status_id}, SessionId: {session_id}'
                 )
-        tbc = TbcInstallmentSDK()
+        tbc = TbcInstallmentSDK(merchant=merchant)
         tbc.status_changes_sync(request_id)
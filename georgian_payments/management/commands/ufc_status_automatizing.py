@@ -5,20 +5,33 @@ from django.db.models import Q
 from django.utils import timezone
 
 from georgian_payments.choices import BankTypeChoices, PaymentTypeChoices, PTSChoices, PTTChoices
+from georgian_payments.leases import iter_claimed
 from georgian_payments.models import PaymentTransaction
+from georgian_payments.ratelimit import operation, LOW
+from georgian_payments.timeouts import get_policy
 
 
 class Command(BaseCommand):
     help = "Register Transaction Automation With UFC"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--lease-seconds', type=int, default=300)
+
     def handle(self, *args, **options):
+        # Polled until the timeout policy expires them, the sweeper takes over from there
+        policy = get_policy(PaymentTypeChoices.CARD, BankTypeChoices.UFC)
+        window = policy.timeout if policy else timedelta(minutes=40)
         payment_transactions = PaymentTransaction.objects.filter(
             Q(status=PTSChoices.PENDING),
             payment_method__bank_type=BankTypeChoices.UFC,
-            payment_method__payment_method=PaymentTypeChoices.CARD,
+            payment_method__payment_type=PaymentTypeChoices.CARD,
             trx__isnull=False,
-            created__gte=timezone.now() - timedelta(minutes=40),
+            created__gte=timezone.now() - window,
             transaction_type__in=[PTTChoices.PAY, PTTChoices.CONTRIBUTION]
-        ).exclude(trx='').order_by('pk').distinct()
-        for transaction in payment_transactions:
-            transaction.sync_status()
+        ).exclude(trx='')
+        for transaction in iter_claimed(payment_transactions, batch_size=options['batch_size'],
+                                        lease_for=timedelta(seconds=options['lease_seconds']),
+                                        fetch=PaymentTransaction.objects.for_status_sync()):
+            with operation('poll', LOW):
+                transaction.sync_status()
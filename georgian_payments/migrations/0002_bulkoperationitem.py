@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('georgian_payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkOperationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch', models.CharField(max_length=100)),
+                ('transaction_id', models.CharField(max_length=64)),
+                ('action', models.PositiveSmallIntegerField(choices=[(1, 'Refund'), (2, 'Cancel'), (3, 'Finish Pre Auth')])),
+                ('amount', models.FloatField(blank=True, null=True)),
+                ('status', models.SmallIntegerField(choices=[(-1, 'Failed'), (0, 'Pending'), (1, 'Success'), (2, 'Processing')], default=0)),
+                ('result', models.JSONField(default=dict)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Bulk Operation Item',
+                'verbose_name_plural': 'Bulk Operation Items',
+                'indexes': [models.Index(fields=['batch', 'status'], name='georgian_pa_batch_da2925_idx')],
+                'unique_together': {('batch', 'transaction_id', 'action')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('georgian_payments', '0002_bulkoperationitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.CharField(db_index=True, max_length=64)),
+                ('event_type', models.PositiveSmallIntegerField(choices=[(1, 'Status Changed'), (2, 'Refunded')])),
+                ('status', models.SmallIntegerField(choices=[(-3, 'Error'), (-2, 'Timeout'), (-1, 'Failed'), (0, 'Pending'), (1, 'Success')])),
+                ('previous_status', models.SmallIntegerField(blank=True, choices=[(-3, 'Error'), (-2, 'Timeout'), (-1, 'Failed'), (0, 'Pending'), (1, 'Success')], null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('delivered', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Payment Event',
+                'verbose_name_plural': 'Payment Events',
+                'indexes': [models.Index(condition=models.Q(('delivered__isnull', True)), fields=['id'], name='gp_event_undelivered_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('georgian_payments', '0003_paymentevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeoutPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_type', models.PositiveSmallIntegerField(choices=[(0, 'None'), (1, 'Card'), (2, 'Installment'), (3, 'Apple Pay'), (4, 'Google Pay')], default=1)),
+                ('bank_type', models.PositiveSmallIntegerField(choices=[(1, 'UFC'), (2, 'Bank Of Georgia'), (3, 'TBC'), (4, 'Credo'), (5, 'Space'), (6, 'Georgian Card')], default=3, verbose_name='Bank')),
+                ('timeout_minutes', models.PositiveIntegerField(verbose_name='Timeout Minutes')),
+                ('requires_confirmation', models.BooleanField(default=False, help_text='Check status with the bank once before expiring', verbose_name='Requires Confirmation')),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Timeout Policy',
+                'verbose_name_plural': 'Timeout Policies',
+                'unique_together': {('payment_type', 'bank_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('georgian_payments', '0004_timeoutpolicy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='country',
+            field=models.CharField(blank=True, default='', help_text='ISO 3166-1 alpha-2', max_length=2, verbose_name='Country'),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='issuer',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Issuer'),
+        ),
+        migrations.AlterField(
+            model_name='card',
+            name='card_type',
+            field=models.CharField(choices=[(1, 'Visa'), (2, 'Mastercard'), (3, 'American Express'), (4, 'Unknown'), (5, 'Maestro'), (6, 'UnionPay')], default=1, max_length=255),
+        ),
+    ]
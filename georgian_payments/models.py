@@ -1,14 +1,70 @@
+import json
 import uuid
-from typing import Union
+from contextlib import contextmanager
+from copy import copy
+from typing import Union, TYPE_CHECKING, Iterable, List
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction as db_transaction, connections, NotSupportedError
+from django.db.models import DEFERRED
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from georgian_payments.sdk import UfcSdk, SpaceInstallmentSDK, BogPaySDK, GCBank, TbcInstallmentSDK, BogInstallmentSDK, \
-    CredoInstallmentSDK
+from georgian_payments.bank_settings import OUTBOX_SETTINGS
+from georgian_payments.fields import summarize
+from georgian_payments.notify import publish
+from georgian_payments.profiling import profiled
+from georgian_payments.ratelimit import operation
+from georgian_payments.singleflight import single_flight
+from georgian_payments.tracing import traced, record_checkout
+from georgian_payments.sdk import get_engine_class
 from georgian_payments.choices import PTSChoices, PTTChoices, PaymentTypeChoices, BankTypeChoices, CardTypeChoices, \
-    ManualActionChoices
+    ManualActionChoices, BulkActionChoices, BulkItemStatusChoices, PaymentEventTypeChoices
+
+if TYPE_CHECKING:
+    from georgian_payments.sdk.base import AbstractBankSDK
+
+
+def is_new_log_entry(data_log: list, data: dict, unique_by_key: str) -> bool:
+    """Whether no `data_log` entry has the `unique_by_key` value of `data` yet, i.e. the bank reports a new state."""
+    value = data.get(unique_by_key, '')
+    return not any(entry.get(unique_by_key, '') == value for entry in data_log)
+
+
+def appends_in_db(model, using: str) -> bool:
+    """Whether `data_log` of `model` is appended to in SQL: a jsonb column, not a `CompactJSONField` one."""
+    return connections[using].vendor == 'postgresql' and isinstance(model._meta.get_field('data_log'), models.JSONField)
+
+
+class JSONBAppend(models.Func):
+    """`field || entries` in PostgreSQL, so a JSON list grows without being read."""
+    output_field = models.JSONField()
+
+    def __init__(self, field: str, entries: list, encoder=None):
+        super().__init__(models.F(field), models.Value(json.dumps(entries, cls=encoder)))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError('JSONBAppend is only supported on PostgreSQL.')
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        (field, field_params), (entries, entries_params) = (compiler.compile(e) for e in self.get_source_expressions())
+        return f'({field} || {entries}::jsonb)', [*field_params, *entries_params]
+
+
+class PaymentTransactionQuerySet(models.QuerySet):
+    HEAVY_FIELDS = ('data_log', 'additional_data')
+
+    def lean(self):
+        """Without the ever-growing JSON columns, for paths that read neither of them."""
+        return self.defer(*self.HEAVY_FIELDS)
+
+    def for_status_sync(self):
+        """
+        What `sync_status()` needs. On PostgreSQL a jsonb `data_log` is appended to in the database and never
+        loaded, elsewhere it is read for the dedupe anyway. Engines may read `additional_data`.
+        """
+        queryset = self.select_related('payment_method', 'user')  # engines, check_save_card() and card saving
+        return queryset.defer('data_log') if appends_in_db(self.model, self.db) else queryset
 
 
 class Card(models.Model):
@@ -19,6 +75,8 @@ class Card(models.Model):
     record_date = models.DateTimeField(auto_now_add=True)
     is_primary = models.BooleanField(default=False)
     card_type = models.CharField(max_length=255, choices=CardTypeChoices.choices, default=CardTypeChoices.VISA)
+    issuer = models.CharField(_('Issuer'), max_length=255, default='', blank=True)
+    country = models.CharField(_('Country'), max_length=2, default='', blank=True, help_text=_('ISO 3166-1 alpha-2'))
     bank_type = models.PositiveSmallIntegerField(verbose_name="Bank",
                                                  choices=BankTypeChoices.choices,
                                                  default=BankTypeChoices.UFC)
@@ -51,25 +109,33 @@ class PaymentMethod(models.Model):
 
     @property
     def engine_class(self):
-        payment_mapper = {
-            (PaymentTypeChoices.CARD.value, BankTypeChoices.UFC.value): UfcSdk,
-            (PaymentTypeChoices.LOAN.value, BankTypeChoices.SPACE.value): SpaceInstallmentSDK,
-            (PaymentTypeChoices.CARD.value, BankTypeChoices.BOG.value): BogPaySDK,
-            (PaymentTypeChoices.CARD.value, BankTypeChoices.UFC.value): UfcSdk,
-            (PaymentTypeChoices.APPLE_PAY.value, BankTypeChoices.GC.value): GCBank,
-            (PaymentTypeChoices.LOAN.value, BankTypeChoices.TBC.value): TbcInstallmentSDK,
-            (PaymentTypeChoices.LOAN.value, BankTypeChoices.BOG.value): BogInstallmentSDK,
-            (PaymentTypeChoices.LOAN.value, BankTypeChoices.SPACE.value): SpaceInstallmentSDK,
-            (PaymentTypeChoices.LOAN.value, BankTypeChoices.CREDO.value): CredoInstallmentSDK,
-            # (PaymentTypeChoices.CARD.value, BankTypeChoices.TBC.value): TbcECommerceSDK,
-        }
-        return payment_mapper[(self.payment_type, self.bank_type)]
+        return get_engine_class(self.payment_type, self.bank_type)
 
     @property
     def is_installment(self):
         return self.payment_type in (PaymentTypeChoices.LOAN,)
 
 
+class TimeoutPolicy(models.Model):
+    """Overrides `georgian_payments.timeouts.DEFAULT_TIMEOUT_POLICIES` for one payment method."""
+    payment_type = models.PositiveSmallIntegerField(choices=PaymentTypeChoices.choices, default=PaymentTypeChoices.CARD)
+    bank_type = models.PositiveSmallIntegerField(verbose_name="Bank", choices=BankTypeChoices.choices,
+                                                 default=BankTypeChoices.TBC)
+    timeout_minutes = models.PositiveIntegerField(_('Timeout Minutes'))
+    requires_confirmation = models.BooleanField(
+        _('Requires Confirmation'), default=False, help_text=_('Check status with the bank once before expiring')
+    )
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = _('Timeout Policy')
+        verbose_name_plural = _('Timeout Policies')
+        unique_together = ('payment_type', 'bank_type')
+
+    def __str__(self):
+        return f'{self.get_bank_type_display()} - {self.get_payment_type_display()} | {self.timeout_minutes} min'
+
+
 class PaymentTransaction(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name='User', related_name='payment_transactions',
                              on_delete=models.PROTECT)
@@ -83,6 +149,8 @@ class PaymentTransaction(models.Model):
     transaction_type = models.SmallIntegerField(choices=PTTChoices.choices, default=PTTChoices.PAY)
     data_log = models.JSONField(default=list)
     additional_data = models.JSONField(default=dict)
+    merchant = models.CharField(_('Merchant'), max_length=50, default='', blank=True, db_index=True,
+                                help_text=_('Key of GEORGIAN_PAYMENTS_MERCHANTS, empty for the default merchant'))
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
@@ -100,14 +168,116 @@ class PaymentTransaction(models.Model):
         verbose_name=_("მანუალური მოქმედება"), choices=ManualActionChoices.choices,
         null=True, blank=True
     )
+    lease_owner = models.CharField(max_length=100, default='', blank=True)
+    lease_expires = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    is_archived = False
+
+    objects = PaymentTransactionQuerySet.as_manager()
 
     class Meta:
         verbose_name = _('Payment Transaction')
         verbose_name_plural = _('Payment Transactions')
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember(field_names)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._remember([self._meta.get_field(name).attname for name in fields] if fields else
+                       [f.attname for f in self._meta.concrete_fields])
+
+    def _remember(self, attnames: Iterable[str]):
+        # JSON values are copied one level deep, so appends and key changes show, nested changes do not
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            value = self.__dict__.get(attname, DEFERRED)
+            if value is not DEFERRED:
+                loaded[attname] = copy(value) if isinstance(value, (list, dict)) else value
+
+    def get_dirty_fields(self, fields: Iterable[str] = None) -> List[str]:
+        """
+        Loaded fields (of `fields` if given) changed since they were loaded or saved. Changes nested in a JSON
+        value are not seen, `mark_dirty()` the field after them.
+        """
+        if fields is None:
+            attnames = [f.attname for f in self._meta.concrete_fields if not f.primary_key]
+        else:
+            attnames = [self._meta.get_field(name).attname for name in fields]
+        loaded, deferred = self.__dict__.get('_loaded_values'), self.get_deferred_fields()
+        if loaded is None:
+            return [attname for attname in attnames if attname not in deferred]
+        missing = object()
+        return [attname for attname in attnames
+                if attname not in deferred and loaded.get(attname, missing) != getattr(self, attname)]
+
+    def mark_dirty(self, *fields: str):
+        loaded = self.__dict__.get('_loaded_values', {})
+        for name in fields:
+            loaded.pop(self._meta.get_field(name).attname, None)
+
+    def save(self, *args, **kwargs):
+        unit = self.__dict__.get('_unit_of_work')
+        if unit is not None and not self._state.adding and not kwargs.get('force_insert'):
+            fields = kwargs.get('update_fields')
+            unit.update(fields if fields is not None else self.get_dirty_fields())
+            return
+        fields = kwargs.get('update_fields')
+        if fields is not None:
+            kwargs['update_fields'] = fields = self._with_summary_fields(fields)
+        else:
+            deferred = self.get_deferred_fields()
+            self._with_summary_fields(f.name for f in self._meta.concrete_fields if f.attname not in deferred)
+        super().save(*args, **kwargs)
+        self._remember([self._meta.get_field(name).attname for name in fields] if fields is not None else
+                       [f.attname for f in self._meta.concrete_fields])
+
+    def _with_summary_fields(self, fields: Iterable[str]) -> List[str]:
+        # summaries of `CompactJSONField`s are saved along, set here as Django may read a summary column before
+        # the compact field's pre_save() set it
+        fields = list(fields)
+        for name in list(fields):
+            field = self._meta.get_field(name)
+            summary_field = getattr(field, 'summary_field', None)
+            if summary_field:
+                setattr(self, summary_field, summarize(getattr(self, field.attname)))
+                if summary_field not in fields:
+                    fields.append(summary_field)
+        return fields
+
+    def save_dirty(self, fields: Iterable[str] = None) -> List[str]:
+        """Saves the dirty fields (of `fields` if given) and `updated` in one UPDATE, none when nothing changed."""
+        dirty = self.get_dirty_fields(fields)
+        if dirty:
+            if 'updated' not in dirty:
+                dirty.append('updated')
+            self.save(update_fields=dirty)
+        return dirty
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Coalesces the transaction's saves inside into one `save_dirty()` of the fields they name on exit,
+        committed in one DB transaction with the rest done inside. Nothing is saved if the block raises.
+        """
+        if self.__dict__.get('_unit_of_work') is not None:
+            yield  # the outer unit flushes
+            return
+        self._unit_of_work = set()
+        try:
+            with db_transaction.atomic(using=self._state.db):
+                yield
+                fields, self._unit_of_work = self._unit_of_work, None
+                self.save_dirty(fields)
+        finally:
+            self._unit_of_work = None
+
     @property
-    def engine(self) -> Union[UfcSdk]:
+    def engine(self) -> 'AbstractBankSDK':
         return self.payment_method.engine_class(self)
 
     @property
@@ -123,9 +293,22 @@ class PaymentTransaction(models.Model):
         if commit:
             self.save(update_fields=['manual_action'])
 
-    def sync_status(self, data=None, is_ok=None, succeed_amount=None, save_data=True):
+    @profiled('PaymentTransaction.sync_status')
+    @traced('PaymentTransaction.sync_status', 'sync_status')
+    def sync_status(self, data=None, is_ok=None, succeed_amount=None, save_data=True, fresh=False):
+        """
+        Applies the bank's answer, `data` and `is_ok` if given, asked for otherwise. Callbacks pass `fresh`, so a
+        recent answer of another caller is not taken for the status change the bank just pushed.
+        """
+        previous_status = self.status
+        engine = self.engine
+        shared = False
         if not (data and is_ok):
-            data, is_ok = self.engine.check_transaction_status()
+            with operation('check_status'):
+                (data, is_ok, self.card_hash, self.card_bin_hash), shared = single_flight.do(
+                    f'{self._meta.label_lower}:{self.pk}:status', lambda: self._check_bank_status(engine), fresh
+                )
+            save_data = save_data and not shared  # logged by the call that asked the bank
         if is_ok == 1:
             self.status = PTSChoices.SUCCESS
             if succeed_amount:
@@ -134,30 +317,84 @@ class PaymentTransaction(models.Model):
             self.status = PTSChoices.FAILED
         if is_ok == -2:
             self.status = PTSChoices.TIMEOUT
-        unique_by_key = self.engine.unique_by_key
-        save = not (any(filter(lambda x: x.get(unique_by_key, '') == data.get(unique_by_key, ''), self.data_log)))
-        if save_data and (save or data.get(unique_by_key) is None) and data:
+        unique_by_key = engine.unique_by_key
+        if data.get(unique_by_key) is None:
+            unique_by_key = None  # logged even if an earlier entry has no value either
+        append_in_db = bool(save_data and data) and self._can_append_in_db()
+        if save_data and data and not append_in_db and (
+                unique_by_key is None or is_new_log_entry(self.data_log, data, unique_by_key)
+        ):
             self.data_log.append(data)
-        self.save(update_fields=['status', 'data_log', 'amount', 'card_hash', 'updated', 'card_bin_hash'])
+        update_fields = ['status', 'amount', 'card_hash', 'card_bin_hash']
+        if 'data_log' not in self.get_deferred_fields() and not shared:
+            update_fields.append('data_log')
+        if not self.get_dirty_fields(update_fields):
+            if append_in_db:
+                self.append_data_log(data, unique_by_key)  # one statement, a logged entry matches no row
+            return  # the bank reported nothing new
+        with db_transaction.atomic():
+            self.save_dirty(update_fields)
+            if append_in_db:
+                self.append_data_log(data, unique_by_key)
+            if self.status != previous_status:
+                PaymentEvent.record(self, PaymentEventTypeChoices.STATUS_CHANGED, previous_status)
+                publish(self)
+
+    def _check_bank_status(self, engine) -> tuple:
+        # engines set the card fields while mapping the answer, callers sharing it need them too
+        data, is_ok = engine.check_transaction_status()
+        return data, is_ok, self.card_hash, self.card_bin_hash
+
+    def _can_append_in_db(self) -> bool:
+        return 'data_log' in self.get_deferred_fields() and appends_in_db(self, self._state.db or 'default')
+
+    def append_data_log(self, entry: dict, unique_by_key: str = None) -> bool:
+        """
+        Appends `entry`, unless `unique_by_key` is given and an entry with the same value is logged already.
+        If `data_log` was deferred (PostgreSQL only) this is a single UPDATE and the column is never loaded; the
+        uniqueness check is part of its WHERE, so the row is not rewritten for a logged entry. True if appended.
+        """
+        if not self._can_append_in_db():
+            if unique_by_key is not None and not is_new_log_entry(self.data_log, entry, unique_by_key):
+                return False
+            self.data_log.append(entry)
+            self.save(update_fields=['data_log'])
+            return True
+        rows = type(self)._base_manager.filter(pk=self.pk)
+        if unique_by_key is not None:
+            rows = rows.exclude(data_log__contains=[{unique_by_key: entry.get(unique_by_key, '')}])
+        encoder = self._meta.get_field('data_log').encoder
+        return bool(rows.update(data_log=JSONBAppend('data_log', [entry], encoder=encoder)))
 
     def check_save_card(self, pan):
         return self.save_card and (not self.bank_card_id) and not (self.user.cards.filter(number=pan).exists())
 
     def _initial_payment(self) -> dict:
-        data = self.engine.start_payment()
+        with operation('start_payment'):
+            data = self.engine.start_payment()
         trx, pay_id = data.pop('trx_id', ''), data.pop('payment_hash', '')
         self.trx = trx if trx else ''
         self.pay_id = pay_id if pay_id else ''
         self.status = PTSChoices.PENDING if data.get('status') else PTSChoices.ERROR
-        self.save(update_fields=['trx', 'pay_id', 'status'])
+        update_fields = ['trx', 'pay_id', 'status']
+        if record_checkout(self):  # callbacks link their spans to this one
+            update_fields.append('additional_data')
+        self.save(update_fields=update_fields)
         return data
 
     def register_as_paid(self, commit=True):
+        previous_status = self.status
         self.status = PTSChoices.SUCCESS
 
         if commit:
-            self.save(update_fields=['status'])
+            with db_transaction.atomic():
+                self.save(update_fields=['status'])
+                if previous_status != self.status:
+                    PaymentEvent.record(self, PaymentEventTypeChoices.STATUS_CHANGED, previous_status)
+                    publish(self)
 
+    @profiled('PaymentTransaction.run')
+    @traced('PaymentTransaction.run', 'checkout')
     def run(self) -> Union[PTSChoices, dict]:
         if self.transaction_type in [PTTChoices.PAY, PTTChoices.CONTRIBUTION]:
             return self._initial_payment()
@@ -175,3 +412,113 @@ class PaymentTransaction(models.Model):
         if self.status == PTSChoices.ERROR:
             return "Error With Initial (Maybe Bank Was In Down)"
         return "Unknown"
+
+
+class ArchivedPaymentTransaction(PaymentTransaction):
+    """
+    Terminal transactions moved out of the hot table by `archive_transactions`.
+    Rows keep their original primary key and the whole PaymentTransaction API.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name='User',
+                             related_name='archived_payment_transactions', on_delete=models.PROTECT)
+    bank_card = models.ForeignKey(
+        'georgian_payments.Card', verbose_name='Card', related_name='archived_payment_transactions',
+        on_delete=models.SET_NULL, null=True, blank=True
+    )
+    payment_method = models.ForeignKey(
+        'georgian_payments.PaymentMethod', verbose_name='Payment Method',
+        related_name='archived_payment_transactions', on_delete=models.PROTECT
+    )
+    created = models.DateTimeField(db_index=True)
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(default=timezone.now)
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = _('Archived Payment Transaction')
+        verbose_name_plural = _('Archived Payment Transactions')
+        abstract = True
+
+
+class BulkOperationItem(models.Model):
+    batch = models.CharField(max_length=100)
+    transaction_id = models.CharField(max_length=64)
+    action = models.PositiveSmallIntegerField(choices=BulkActionChoices.choices)
+    amount = models.FloatField(null=True, blank=True)
+    status = models.SmallIntegerField(choices=BulkItemStatusChoices.choices, default=BulkItemStatusChoices.PENDING)
+    result = models.JSONField(default=dict)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Bulk Operation Item')
+        verbose_name_plural = _('Bulk Operation Items')
+        unique_together = ('batch', 'transaction_id', 'action')
+        indexes = [models.Index(fields=['batch', 'status'])]
+
+    def __str__(self):
+        return f'{self.batch} | {self.get_action_display()} | {self.transaction_id}'
+
+
+class PaymentEvent(models.Model):
+    """Outbox row, written in the same DB transaction as the change it describes."""
+    transaction_id = models.CharField(max_length=64, db_index=True)
+    event_type = models.PositiveSmallIntegerField(choices=PaymentEventTypeChoices.choices)
+    status = models.SmallIntegerField(choices=PTSChoices.choices)
+    previous_status = models.SmallIntegerField(choices=PTSChoices.choices, null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    created = models.DateTimeField(auto_now_add=True)
+    delivered = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(default='', blank=True)
+
+    class Meta:
+        verbose_name = _('Payment Event')
+        verbose_name_plural = _('Payment Events')
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(delivered__isnull=True), name='gp_event_undelivered_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.transaction_id} | {self.get_event_type_display()} | {self.get_status_display()}'
+
+    @classmethod
+    def build(cls, transaction: 'PaymentTransaction', event_type, previous_status=None, **payload):
+        """
+        Unsaved event of the transaction. `payload` cannot override the transaction's own keys (`amount`, `refunded`,
+        ...), REFUNDED events name the sum they refunded `refund_amount`.
+        """
+        return cls(
+            transaction_id=str(transaction.pk),
+            event_type=event_type,
+            status=transaction.status,
+            previous_status=previous_status,
+            payload={
+                **payload,
+                'trx': transaction.trx,
+                'amount': transaction.amount,
+                'refunded': transaction.refunded,
+                'transaction_type': transaction.transaction_type,
+                'payment_method_id': transaction.payment_method_id,
+            }
+        )
+
+    @classmethod
+    def record(cls, transaction: 'PaymentTransaction', event_type, previous_status=None, **payload):
+        if not OUTBOX_SETTINGS['enabled']:
+            return None
+        event = cls.build(transaction, event_type, previous_status, **payload)
+        event.save()
+        return event
+
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'transaction_id': self.transaction_id,
+            'event_type': self.get_event_type_display(),
+            'status': self.status,
+            'previous_status': self.previous_status,
+            'payload': self.payload,
+            'created': self.created.isoformat(),
+        }
@@ -0,0 +1,226 @@
+"""
+Per-transaction status notifications, for clients waiting on a payment's outcome instead of polling it.
+Configured by `STATUS_NOTIFY_SETTINGS`.
+
+    publish(transaction)  # in the DB transaction of the change
+    with subscribe(pk) as subscription:
+        status = subscription.wait(timeout=25)  # None when nothing was published in time
+
+Backends: 'postgres' sends `NOTIFY` with the change, so it is delivered on commit, and one `LISTEN` connection
+per process hands it to the waiting threads. 'cache' hands the status over through the Django cache, which
+waiters poll every `poll_interval`. 'local' delivers within the process only. Terminal statuses are cached for
+`terminal_ttl` seconds with every backend, see `cached_status()`.
+"""
+import queue
+import select
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Set
+
+from django.db import connections, transaction as db_transaction
+
+from georgian_payments.bank_settings import STATUS_NOTIFY_SETTINGS
+from georgian_payments.choices import PTSChoices
+
+STATUS_NOTIFY = STATUS_NOTIFY_SETTINGS
+
+PREFIX = 'georgian_payments:status'
+RECONNECT_DELAY = 5
+
+
+def _cache():
+    from django.core.cache import caches
+
+    return caches[STATUS_NOTIFY.get('cache_alias', 'default')]
+
+
+def is_terminal(status: int) -> bool:
+    return status != PTSChoices.PENDING
+
+
+def cached_status(transaction_id, user_id) -> Optional[int]:
+    """The terminal status of the user's transaction if it was published lately, without touching the database."""
+    return _cache().get(f'{PREFIX}:{user_id}:{transaction_id}:terminal')
+
+
+class _Broker:
+    """Fans statuses out to the subscriptions of this process."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[queue.Queue]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, transaction_id: str) -> queue.Queue:
+        inbox = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(transaction_id, set()).add(inbox)
+        return inbox
+
+    def unsubscribe(self, transaction_id: str, inbox: queue.Queue):
+        with self._lock:
+            inboxes = self._subscribers.get(transaction_id, set())
+            inboxes.discard(inbox)
+            if not inboxes:
+                self._subscribers.pop(transaction_id, None)
+
+    def dispatch(self, transaction_id: str, status: int):
+        with self._lock:
+            inboxes = list(self._subscribers.get(transaction_id, ()))
+        for inbox in inboxes:
+            inbox.put(status)
+
+
+class QueueSubscription:
+    def __init__(self, inbox: queue.Queue):
+        self.inbox = inbox
+
+    def wait(self, timeout: float) -> Optional[int]:
+        try:
+            return self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class CacheSubscription:
+    def __init__(self, transaction_id: str):
+        self.key = f'{PREFIX}:{transaction_id}:latest'
+        self.seen = _cache().get(self.key)
+
+    def wait(self, timeout: float) -> Optional[int]:
+        cache, interval = _cache(), STATUS_NOTIFY.get('poll_interval', 0.5)
+        deadline = time.monotonic() + timeout
+        while True:
+            latest = cache.get(self.key)
+            if latest is not None and latest != self.seen:
+                self.seen = latest
+                return latest[1]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+
+
+class LocalBackend:
+    def __init__(self):
+        self.broker = _Broker()
+
+    def publish(self, transaction_id: str, status: int, using: str):
+        db_transaction.on_commit(lambda: self.broker.dispatch(transaction_id, status), using=using)
+
+    @contextmanager
+    def subscribe(self, transaction_id: str):
+        inbox = self.broker.subscribe(transaction_id)
+        try:
+            yield QueueSubscription(inbox)
+        finally:
+            self.broker.unsubscribe(transaction_id, inbox)
+
+
+class CacheBackend:
+    def publish(self, transaction_id: str, status: int, using: str):
+        def store():  # the publish time tells waiters apart two changes to the same status
+            _cache().set(f'{PREFIX}:{transaction_id}:latest', (time.time_ns(), status),
+                         timeout=STATUS_NOTIFY.get('max_wait', 25) * 2)
+
+        db_transaction.on_commit(store, using=using)
+
+    @contextmanager
+    def subscribe(self, transaction_id: str):
+        yield CacheSubscription(transaction_id)
+
+
+class PostgresBackend(LocalBackend):
+    """`NOTIFY` is transactional, so rolled back changes are never announced."""
+
+    def __init__(self):
+        super().__init__()
+        self.channel = STATUS_NOTIFY.get('channel', 'georgian_payments_status')
+        self.alias = STATUS_NOTIFY.get('database', 'default')
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def publish(self, transaction_id: str, status: int, using: str):
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, f'{transaction_id}:{status}'])
+
+    @contextmanager
+    def subscribe(self, transaction_id: str):
+        self._ensure_listener()
+        with super().subscribe(transaction_id) as subscription:
+            yield subscription
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='georgian-payments-listen', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            connection = connections.create_connection(self.alias)
+            try:
+                connection.ensure_connection()
+                raw = connection.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                while True:
+                    for payload in self._receive(raw):
+                        transaction_id, _, status = payload.rpartition(':')
+                        self.broker.dispatch(transaction_id, int(status))
+            except Exception as e:
+                from loguru import logger
+
+                logger.error(f'Status Notify | Listener | {e}')
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                connection.close()
+
+    @staticmethod
+    def _receive(raw, timeout: float = 5):
+        if hasattr(raw, 'poll'):  # psycopg2
+            if select.select([raw], [], [], timeout)[0]:
+                raw.poll()
+                while raw.notifies:
+                    yield raw.notifies.pop(0).payload
+        else:  # psycopg 3.2+
+            for notify in raw.notifies(timeout=timeout):
+                yield notify.payload
+
+
+BACKENDS = {'local': LocalBackend, 'cache': CacheBackend, 'postgres': PostgresBackend}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = BACKENDS[STATUS_NOTIFY.get('backend', 'cache')]()
+    return _backend
+
+
+def publish(transaction, status: int = None):
+    """
+    Announces a status change of `transaction`, `status` when it was changed in bulk. Call it in the DB
+    transaction of the change, waiters hear of it on commit.
+    """
+    if not STATUS_NOTIFY.get('enabled', False):
+        return
+    using, transaction_id = transaction._state.db or 'default', str(transaction.pk)
+    status = transaction.status if status is None else status
+    get_backend().publish(transaction_id, status, using)
+    if is_terminal(status):
+        key = f'{PREFIX}:{transaction.user_id}:{transaction_id}:terminal'
+        db_transaction.on_commit(
+            lambda: _cache().set(key, status, timeout=STATUS_NOTIFY.get('terminal_ttl', 3600)), using=using
+        )
+
+
+@contextmanager
+def subscribe(transaction_id):
+    with get_backend().subscribe(str(transaction_id)) as subscription:
+        yield subscription
@@ -0,0 +1,104 @@
+import json
+import queue
+from itertools import groupby
+from typing import List, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from loguru import logger
+
+from georgian_payments.bank_settings import OUTBOX_SETTINGS
+from georgian_payments.models import PaymentEvent
+from georgian_payments.sdk.http import get_session
+
+OUTBOX = OUTBOX_SETTINGS
+
+payment_status_changed = Signal()  # kwargs: event
+
+
+class BaseSink:
+    def send(self, events: Sequence[PaymentEvent]):
+        """Delivers events of one transaction in order, raises on failure."""
+        raise NotImplementedError
+
+
+class SignalSink(BaseSink):
+    def send(self, events: Sequence[PaymentEvent]):
+        for event in events:
+            payment_status_changed.send(sender=PaymentEvent, event=event)
+
+
+class WebhookSink(BaseSink):
+    def send(self, events: Sequence[PaymentEvent]):
+        response = get_session('OUTBOX').post(
+            OUTBOX['webhook_url'],
+            data=json.dumps({'events': [event.as_dict() for event in events]}, cls=DjangoJSONEncoder),
+            headers={'Content-Type': 'application/json'},
+            timeout=OUTBOX.get('webhook_timeout', 5),
+        )
+        response.raise_for_status()
+
+
+class LocalBrokerSink(BaseSink):
+    """In-process stand-in for a message broker, for development and tests."""
+    queue = queue.Queue()
+
+    def send(self, events: Sequence[PaymentEvent]):
+        for event in events:
+            self.queue.put(event.as_dict())
+
+
+def get_sinks() -> List[BaseSink]:
+    return [import_string(path)() for path in OUTBOX['sinks']]
+
+
+def dispatch(batch_size: int = 100, sinks: Sequence[BaseSink] = None) -> int:
+    """
+    Delivers one batch of undelivered events, at least once and in order per transaction.
+    Rows are locked with SKIP LOCKED so several dispatchers can run side by side. Failed events are
+    retried after fresh ones, and a transaction whose older event is still pending (locked elsewhere
+    or failed) is held back until that event is delivered.
+    """
+    sinks = get_sinks() if sinks is None else sinks
+    delivered = 0
+    with db_transaction.atomic():
+        events = list(
+            PaymentEvent.objects.filter(delivered__isnull=True)
+            .order_by('attempts', 'pk')
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not events:
+            return 0
+        first_pk = {}
+        for event in events:
+            first_pk[event.transaction_id] = min(event.pk, first_pk.get(event.transaction_id, event.pk))
+        older = Q()
+        for transaction_id, pk in first_pk.items():
+            older |= Q(transaction_id=transaction_id, pk__lt=pk)
+        blocked = set(
+            PaymentEvent.objects.filter(older, delivered__isnull=True).values_list('transaction_id', flat=True)
+        )
+        now = timezone.now()
+        events.sort(key=lambda e: (e.transaction_id, e.pk))
+        for transaction_id, group in groupby(events, key=lambda e: e.transaction_id):
+            group = list(group)
+            if transaction_id in blocked:
+                continue
+            try:
+                for sink in sinks:
+                    sink.send(group)
+            except Exception as e:
+                logger.error(f'Outbox | Transaction ID: {transaction_id} | Delivery Failed | {e}')
+                for event in group:
+                    event.attempts += 1
+                    event.last_error = str(e)
+                continue
+            for event in group:
+                event.delivered = now
+            delivered += len(group)
+        PaymentEvent.objects.bulk_update(events, ['delivered', 'attempts', 'last_error'])
+    return delivered
@@ -0,0 +1,147 @@
+"""
+Opt-in latency breakdown of payment requests: DB, bank HTTP (per bank), rendering and the rest (Python).
+Add `georgian_payments.profiling.ProfilingMiddleware` to MIDDLEWARE and enable `PROFILING_SETTINGS`.
+"""
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager, ExitStack
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional, Dict
+
+from django.db import connections
+
+from georgian_payments.bank_settings import PROFILING_SETTINGS
+
+PROFILING = PROFILING_SETTINGS
+
+_current: ContextVar[Optional['Profile']] = ContextVar('georgian_payments_profile', default=None)
+
+
+class Profile:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._open: Optional[str] = None
+
+    def add(self, category: str, duration: float):
+        self.durations[category] += duration
+        self.counts[category] += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        self.durations['python'] = max(self.total - sum(v for k, v in self.durations.items() if k != 'python'), 0)
+
+    def as_dict(self) -> dict:
+        data = {'name': self.name, 'total_ms': round(self.total * 1000, 2)}
+        for category, duration in sorted(self.durations.items()):
+            data[f'{category}_ms'] = round(duration * 1000, 2)
+            if category != 'python':
+                data[f'{category}_count'] = self.counts[category]
+        return data
+
+    def server_timing(self) -> str:
+        metrics = []
+        for category, duration in sorted(self.durations.items()):
+            metric = f'{re.sub(r"[^A-Za-z0-9_-]", "-", category)};dur={duration * 1000:.2f}'
+            if category != 'python':
+                metric += f';desc="{self.counts[category]} calls"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def log(self):
+        from loguru import logger  # models import this module, keep loguru off the import path
+
+        summary = ' '.join(f'{k}={v}' for k, v in self.as_dict().items() if k != 'name')
+        logger.bind(profile=self.as_dict()).info(f'Profile | {self.name} | {summary}')
+
+
+@contextmanager
+def span(category: str):
+    """Attributes the enclosed wall time to `category` of the active profile, if any. Nested spans are not counted
+    twice, the outermost one wins (e.g. DB queries run while rendering stay rendering)."""
+    profile = _current.get()
+    if profile is None or profile._open is not None:
+        yield
+        return
+    profile._open = category
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile._open = None
+        profile.add(category, time.perf_counter() - started)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    with span('db'):
+        return execute(sql, params, many, context)
+
+
+def should_sample() -> bool:
+    return PROFILING.get('enabled', False) and random.random() < PROFILING.get('sample_rate', 1.0)
+
+
+@contextmanager
+def profile(name: str):
+    """Starts a profile unless one is active already, in which case the caller simply runs inside it."""
+    if _current.get() is not None or not should_sample():
+        yield _current.get()
+        return
+    current = Profile(name)
+    token = _current.set(current)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_db_wrapper))
+            yield current
+    finally:
+        _current.reset(token)
+        current.finish()
+        current.log()
+
+
+def profiled(name: str = None):
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        paths = PROFILING.get('paths')
+        if paths and not any(p in request.path for p in paths):
+            return self.get_response(request)
+        with profile(f'{request.method} {request.path}') as current:
+            response = self.get_response(request)
+        if current is not None and PROFILING.get('server_timing', True):
+            response['Server-Timing'] = current.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        """DRF responses are serialized in `render()`, which runs after the view returns."""
+        render = response.render
+
+        def profiled_render():
+            with span('render'):
+                return render()
+
+        response.render = profiled_render
+        return response
@@ -0,0 +1,188 @@
+"""
+Token buckets for outbound bank calls, shared by pollers, checkout workers and bulk operations on every node
+through the Django cache (or per process with the 'local' backend). Configured by `RATE_LIMIT_SETTINGS`.
+
+Calls are attributed to an operation with `operation()`. Background entry points (pollers, sweeps, bulk refunds)
+run with LOW priority and cannot use the share of a burst reserved for user facing calls like `start_payment`.
+"""
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from georgian_payments.bank_settings import RATE_LIMIT_SETTINGS
+
+RATE_LIMIT = RATE_LIMIT_SETTINGS
+
+HIGH, LOW = 'high', 'low'
+DEFAULT_MAX_WAIT = {HIGH: 5, LOW: 60}
+
+_operation: ContextVar[Optional[Tuple[str, str]]] = ContextVar('georgian_payments_operation', default=None)
+
+
+class RateLimited(Exception):
+    """No token became available within the operation's `max_wait`."""
+
+
+@contextmanager
+def operation(name: str, priority: str = None):
+    """Without `priority` the enclosing operation's is kept, HIGH outside of any."""
+    token = _operation.set((name, priority or current_operation()[1]))
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def current_operation() -> Tuple[str, str]:
+    return _operation.get() or ('default', HIGH)
+
+
+class LocalBucketStore:
+    """Exact token buckets, for a single process (or tests)."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._blocked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, floor: float) -> float:
+        """Takes a token unless fewer than `floor` would remain, otherwise returns the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens - 1 >= floor:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (floor + 1 - tokens) / rate
+
+    def block(self, key: str, seconds: float):
+        with self._lock:
+            self._blocked[key] = max(self._blocked.get(key, 0), time.monotonic() + seconds)
+
+    def blocked_for(self, key: str) -> float:
+        return max(self._blocked.get(key, 0) - time.monotonic(), 0)
+
+
+class CacheBucketStore:
+    """
+    The bucket refills in whole windows of `burst / rate` seconds, counted with atomic `incr`, so every
+    process sharing the cache sees one budget: at most `burst` calls per window, `rate` per second on average.
+    """
+    PREFIX = 'georgian_payments:ratelimit'
+
+    def __init__(self, alias: str = 'default'):
+        from django.core.cache import caches
+
+        self.cache = caches[alias]
+
+    def take(self, key: str, rate: float, burst: int, floor: float) -> float:
+        window = burst / rate
+        now = time.time()
+        index = int(now // window)
+        cache_key = f'{self.PREFIX}:{key}:{index}'
+        self.cache.add(cache_key, 0, timeout=math.ceil(window) + 1)
+        try:
+            count = self.cache.incr(cache_key)
+        except ValueError:  # evicted between add and incr
+            self.cache.set(cache_key, 1, timeout=math.ceil(window) + 1)
+            count = 1
+        if count <= burst - floor:
+            return 0
+        try:
+            self.cache.decr(cache_key)  # rejected calls do not count against the window
+        except ValueError:
+            pass
+        return (index + 1) * window - now
+
+    def block(self, key: str, seconds: float):
+        self.cache.set(f'{self.PREFIX}:{key}:blocked', time.time() + seconds, timeout=math.ceil(seconds) + 1)
+
+    def blocked_for(self, key: str) -> float:
+        until = self.cache.get(f'{self.PREFIX}:{key}:blocked')
+        return max(until - time.time(), 0) if until else 0
+
+
+def retry_after(response, default: float) -> float:
+    value = response.headers.get('Retry-After', '')
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    def __init__(self, config: dict = None):
+        self.config = RATE_LIMIT if config is None else config
+        self._store = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.get('enabled', False) and bool(self.config.get('limits'))
+
+    @property
+    def store(self):
+        if self._store is None:
+            if self.config.get('backend', 'cache') == 'local':
+                self._store = LocalBucketStore()
+            else:
+                self._store = CacheBucketStore(self.config.get('cache_alias', 'default'))
+        return self._store
+
+    def bucket(self, session_name: str) -> Optional[Tuple[str, dict]]:
+        """
+        (bucket key, limit) of a call through the session of `session_name` ('TBC' or 'TBC:merchant') in the
+        current operation. Operation limits win over the bank's, merchants get their own buckets.
+        """
+        bank, _, merchant = session_name.partition(':')
+        name, _ = current_operation()
+        limits = self.config.get('limits', {})
+        for limit_name in (f'{bank}:{name}', bank):
+            if limit_name in limits:
+                return f'{limit_name}:{merchant}' if merchant else limit_name, limits[limit_name]
+        return None
+
+    def acquire(self, session_name: str):
+        if not self.enabled:
+            return
+        bucket = self.bucket(session_name)
+        if bucket is None:
+            return
+        key, limit = bucket
+        _, priority = current_operation()
+        rate, burst = float(limit['rate']), int(limit.get('burst', max(limit['rate'], 1)))
+        floor = burst * self.config.get('low_priority_reserve', 0.25) if priority == LOW else 0
+        max_wait = {**DEFAULT_MAX_WAIT, **self.config.get('max_wait', {})}[priority]
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.store.blocked_for(key) or self.store.take(key, rate, burst, floor)
+            if not wait:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimited(f'Rate Limit | {key} | No Token Within {max_wait}s')
+            time.sleep(wait + random.uniform(0, 0.05))  # jitter, so waiting processes do not wake together
+
+    def throttled(self, session_name: str, response) -> bool:
+        """Backs the bucket off for the 429's Retry-After. False when the call should not be retried."""
+        if not self.enabled:
+            return False
+        bucket = self.bucket(session_name)
+        if bucket is None:
+            return False
+        self.store.block(bucket[0], retry_after(response, self.config.get('retry_after', 1)))
+        return True
+
+    @property
+    def retries(self) -> int:
+        return self.config.get('retries_on_429', 2)
+
+
+limiter = RateLimiter()
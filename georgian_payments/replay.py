@@ -0,0 +1,236 @@
+"""
+Replays callback payloads recorded in `data_log` against the callback ViewSets, for load testing
+callback handling on staging. Replayed callbacks change transactions and the TBC callback queries
+the bank, so never point it at production.
+"""
+import hashlib
+import itertools
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from base64 import b64encode
+from dataclasses import dataclass, field, asdict
+from typing import Iterator, List, Optional, Sequence, Dict
+
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from georgian_payments.bank_settings import get_bank_settings
+from georgian_payments.choices import BankTypeChoices
+from georgian_payments.sdk.http import get_session
+
+CALLBACK_URL_NAMES = {
+    'bog': 'bog_callback-change-transaction-status',
+    'gc_check': 'gc_callback-check',
+    'gc_register': 'gc_callback-register',
+    'space': 'space_callback-callback',
+    'tbc': 'tbc_callback-callback',
+}
+SENSITIVE_KEYS = {
+    'p.cardholder', 'card.id', 'RECC_PMNT_ID', 'payer_identifier', 'email', 'phone', 'BIN_HASH', 'ip', 'client_ip',
+}
+FORM_KINDS = {'bog'}  # BOG posts form data, the other banks JSON
+PAN_RE = re.compile(r'\d{6}[\dx*X]{2,9}\d{4}')
+
+
+@dataclass
+class ReplayRequest:
+    kind: str
+    method: str
+    data: dict
+    transaction_id: str = ''
+    merchant: str = ''
+
+
+@dataclass
+class ReplayResult:
+    kind: str
+    status_code: int
+    latency: float
+    queries: Optional[int] = None
+    error: str = ''
+
+
+@dataclass
+class ReplayReport:
+    results: List[ReplayResult] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        latencies = sorted(r.latency * 1000 for r in self.results)
+        queries = [r.queries for r in self.results if r.queries is not None]
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0
+
+        return {
+            'requests': len(self.results),
+            'errors': sum(1 for r in self.results if r.error or r.status_code >= 500),
+            'client_errors': sum(1 for r in self.results if 400 <= r.status_code < 500),
+            'p50_ms': round(percentile(0.50), 2),
+            'p90_ms': round(percentile(0.90), 2),
+            'p99_ms': round(percentile(0.99), 2),
+            'max_ms': round(latencies[-1], 2) if latencies else 0,
+            'queries_mean': round(statistics.mean(queries), 2) if queries else None,
+            'queries_max': max(queries) if queries else None,
+        }
+
+
+def anonymize(value, key: str = ''):
+    if isinstance(value, dict):
+        return {k: anonymize(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [anonymize(v, key) for v in value]
+    if isinstance(value, str):
+        if key in SENSITIVE_KEYS and value:
+            return hashlib.sha256(value.encode()).hexdigest()[:16]
+        return PAN_RE.sub(lambda m: m.group()[:6] + '*' * (len(m.group()) - 10) + m.group()[-4:], value)
+    return value
+
+
+def extract_requests(transaction: dict) -> Iterator[ReplayRequest]:
+    """`transaction` is a `.values('pk', 'trx', 'merchant', 'payment_method__bank_type', 'data_log')` row."""
+    bank_type, pk, merchant = transaction['payment_method__bank_type'], str(transaction['pk']), transaction['merchant']
+    if bank_type == BankTypeChoices.TBC and transaction['trx']:
+        yield ReplayRequest('tbc', 'POST', {'PaymentId': transaction['trx']}, pk, merchant)
+    for entry in transaction['data_log'] or []:
+        if not isinstance(entry, dict):
+            continue
+        if bank_type == BankTypeChoices.GC:
+            if 'Check Data' in entry:
+                yield ReplayRequest('gc_check', 'GET', anonymize(entry['Check Data']), pk, merchant)
+            if 'Register Data' in entry:
+                yield ReplayRequest('gc_register', 'GET', anonymize(entry['Register Data']), pk, merchant)
+        elif bank_type == BankTypeChoices.BOG and 'order_id' in entry and 'status' in entry:
+            yield ReplayRequest('bog', 'POST', anonymize(entry), pk, merchant)
+        elif bank_type == BankTypeChoices.SPACE and 'OrderId' in entry and 'Status' in entry:
+            data = anonymize(entry)
+            data.pop('Secret', None)  # injected from settings when sent, never written to dumps
+            yield ReplayRequest('space', 'POST', data, pk, merchant)
+
+
+def extract(queryset, chunk_size: int = 500) -> Iterator[ReplayRequest]:
+    rows = queryset.order_by().values('pk', 'trx', 'merchant', 'payment_method__bank_type', 'data_log')
+    for transaction in rows.iterator(chunk_size=chunk_size):
+        yield from extract_requests(transaction)
+
+
+def dump(requests: Iterator[ReplayRequest], path: str) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for request in requests:
+            f.write(json.dumps(asdict(request), ensure_ascii=False, default=str))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def load(path: str) -> List[ReplayRequest]:
+    with open(path, encoding='utf-8') as f:
+        return [ReplayRequest(**json.loads(line)) for line in f if line.strip()]
+
+
+def plan(requests: Sequence[ReplayRequest], duplicates: float = 0.0, shuffle: bool = False,
+         seed: int = None) -> List[ReplayRequest]:
+    """Adds re-deliveries of a `duplicates` share of callbacks and optionally breaks delivery order."""
+    rnd = random.Random(seed)
+    planned = list(requests)
+    planned += rnd.sample(planned, int(len(planned) * duplicates)) if planned else []
+    if shuffle:
+        rnd.shuffle(planned)
+    elif duplicates:
+        planned.sort(key=lambda r: r.transaction_id)
+    return planned
+
+
+class CallbackReplayer:
+    def __init__(self, base_url: str = None, basic_auth: str = None, host: str = None, url_namespace: str = None,
+                 concurrency: int = 8, rate: float = None):
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.basic_auth = basic_auth
+        self.host = host
+        self.url_namespace = url_namespace
+        self.concurrency = concurrency
+        self.rate = rate
+        self._local = threading.local()
+
+    def path(self, kind: str) -> str:
+        name = CALLBACK_URL_NAMES[kind]
+        return reverse(f'{self.url_namespace}:{name}' if self.url_namespace else name)
+
+    def headers(self, kind: str) -> Dict[str, str]:
+        if self.basic_auth and kind.startswith('gc_'):
+            return {'Authorization': f'Basic {b64encode(self.basic_auth.encode()).decode()}'}
+        return {}
+
+    @staticmethod
+    def payload(request: ReplayRequest) -> dict:
+        if request.kind == 'space':
+            return {**request.data, 'Secret': get_bank_settings('SPACE_SETTINGS', request.merchant)['secret_key']}
+        return request.data
+
+    def _send_http(self, request: ReplayRequest) -> ReplayResult:
+        url, session = f'{self.base_url}{self.path(request.kind)}', get_session('REPLAY')
+        headers, data = self.headers(request.kind), self.payload(request)
+        started = time.perf_counter()
+        if request.method == 'GET':
+            response = session.get(url, params=data, headers=headers)
+        elif request.kind in FORM_KINDS:
+            response = session.post(url, data=data, headers=headers)
+        else:
+            response = session.post(url, json=data, headers=headers)
+        return ReplayResult(request.kind, response.status_code, time.perf_counter() - started)
+
+    def _send_local(self, request: ReplayRequest) -> ReplayResult:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            extra = {'HTTP_HOST': self.host} if self.host else {}
+            client = self._local.client = Client(**extra)
+        extra = {f'HTTP_{k.upper()}': v for k, v in self.headers(request.kind).items()}
+        path, data = self.path(request.kind), self.payload(request)
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            if request.method == 'GET':
+                response = client.get(path, data, **extra)
+            elif request.kind in FORM_KINDS:
+                response = client.post(path, data, **extra)
+            else:
+                response = client.post(path, data, content_type='application/json', **extra)
+        return ReplayResult(request.kind, response.status_code, time.perf_counter() - started, len(queries))
+
+    def send(self, request: ReplayRequest) -> ReplayResult:
+        try:
+            return self._send_http(request) if self.base_url else self._send_local(request)
+        except Exception as e:
+            return ReplayResult(request.kind, 0, 0, error=str(e))
+
+    def run(self, requests: Sequence[ReplayRequest]) -> ReplayReport:
+        """Each request is started at `index / rate` seconds, by whichever of the workers is free."""
+        results: List[Optional[ReplayResult]] = [None] * len(requests)
+        counter = itertools.count()
+        started = time.monotonic()
+
+        def worker():
+            try:
+                for index in iter(lambda: next(counter), None):
+                    if index >= len(requests):
+                        break
+                    if self.rate:
+                        delay = started + index / self.rate - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                    results[index] = self.send(requests[index])
+            finally:
+                if not self.base_url:
+                    connections.close_all()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return ReplayReport(results)
@@ -0,0 +1,152 @@
+"""
+Callback payload schemas. Fields are declared per bank and compiled once into a lookup table and a
+namedtuple, so parsing a payload is a single pass over its items without DRF serializer machinery.
+
+    values, data = BogCallbackSchema.parse(request.data)
+
+`values` holds the coerced declared fields (defaults for the missing ones), `data` the whole payload
+flattened the way it is stored in `data_log`. Invalid payloads raise `SchemaError`.
+"""
+import hmac
+from collections import namedtuple
+from typing import Callable, Dict, List, Tuple, Any
+
+from django.utils.datastructures import MultiValueDict
+
+from georgian_payments.bank_settings import get_bank_settings, get_merchants
+
+_MISSING = object()
+REQUIRED_MESSAGE = 'This field is required.'
+BLANK_MESSAGE = 'This field may not be blank.'
+INVALID_MESSAGE = 'A valid value is required.'
+
+
+class SchemaError(ValueError):
+    def __init__(self, errors: Dict[str, List[str]]):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class Field:
+    __slots__ = ('source', 'coerce', 'required', 'default', 'allow_blank', 'validate')
+
+    def __init__(self, source: str = None, coerce: Callable[[Any], Any] = str, required: bool = False,
+                 default: Any = '', allow_blank: bool = True, validate: Callable[[Any], None] = None):
+        """`validate` raises ValueError with the error message for a coerced value it does not accept."""
+        self.source = source
+        self.coerce = coerce
+        self.required = required
+        self.default = default
+        self.allow_blank = allow_blank
+        self.validate = validate
+
+
+class Schema:
+    Values = None
+    _lookup: Dict[str, tuple] = {}
+    _defaults: tuple = ()
+    _required: tuple = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            fields.update((name, value) for name, value in vars(klass).items() if isinstance(value, Field))
+        cls.Values = namedtuple(f'{cls.__name__}Values', fields)
+        cls._lookup = {
+            f.source or name: (index, f.coerce, f.allow_blank, f.validate)
+            for index, (name, f) in enumerate(fields.items())
+        }
+        cls._defaults = tuple(_MISSING if f.required else f.default for f in fields.values())
+        cls._required = tuple((index, f.source or name) for index, (name, f) in enumerate(fields.items())
+                              if f.required)
+
+    @classmethod
+    def parse(cls, payload) -> Tuple[tuple, dict]:
+        """`payload` is a QueryDict (last value of a key wins, like `.dict()`) or a parsed JSON body
+        (lists are reduced to their first item)."""
+        lookup, values, data, errors = cls._lookup, list(cls._defaults), {}, {}
+        last = isinstance(payload, MultiValueDict)
+        for key, value in dict.items(payload) if isinstance(payload, dict) else payload.items():
+            if type(value) is list or type(value) is tuple:
+                value = (value[-1] if last else value[0]) if value else ''
+            data[key] = value
+            spec = lookup.get(key)
+            if spec is None:
+                continue
+            index, coerce, allow_blank, validate = spec
+            if value is None or value == '':
+                if not allow_blank:
+                    errors[key] = [BLANK_MESSAGE]
+                    continue
+                if value is None or coerce is not str:
+                    continue  # null or blank optional value keeps its default
+            try:
+                value = coerce(value)
+                if validate is not None:
+                    validate(value)
+            except (TypeError, ValueError) as e:
+                errors[key] = [str(e) if validate is not None and str(e) else INVALID_MESSAGE]
+                continue
+            values[index] = value
+        for index, source in cls._required:
+            if values[index] is _MISSING and source not in errors:
+                errors[source] = [REQUIRED_MESSAGE]
+        if errors:
+            raise SchemaError(errors)
+        return cls.Values._make(values), data
+
+
+def secret_matches(secret: str, expected: str) -> bool:
+    return hmac.compare_digest(secret.encode(), str(expected).encode())
+
+
+def validate_space_secret(secret: str):
+    # Any merchant's secret passes here, the view checks it against the transaction's own merchant.
+    # Every secret is compared so the time taken does not tell which merchant matched.
+    matches = [secret_matches(secret, get_bank_settings('SPACE_SETTINGS', m)['secret_key']) for m in get_merchants()]
+    if not any(matches):
+        raise ValueError('Secret Key is not Valid.')
+
+
+class BogCallbackSchema(Schema):
+    order_id = Field()
+    shop_order_id = Field()
+    status = Field()
+    payment_method = Field()
+    card_type = Field()
+    pan = Field()
+
+
+class GCCheckSchema(Schema):
+    transaction_id = Field(source='o.transaction_id', coerce=int, default=0)
+    trx_id = Field()
+    merch_id = Field()
+
+
+class GCRegisterSchema(Schema):
+    transaction_id = Field(source='o.transaction_id', coerce=int, required=True)
+    trx_id = Field(default=None)
+    result_code = Field(coerce=int, default=2)
+    masked_pan = Field(source='p.maskedPan')
+    fully_authenticated = Field(source='p.isFullyAuthenticated', default='N')
+    card_registered = Field(source='card.registered', default='N')
+    card_recurrent = Field(source='card.recurrent', default='N')
+    card_id = Field(source='card.id', default=None)
+
+
+class SpaceCallbackSchema(Schema):
+    OrderId = Field(required=True, allow_blank=False)
+    Status = Field(required=True, allow_blank=False)
+    Secret = Field(required=True, allow_blank=False, validate=validate_space_secret)
+    Description = Field(required=True)
+    ClientContributionAmount = Field(required=True)
+
+
+class TbcCallbackSchema(Schema):
+    PaymentId = Field(required=True, allow_blank=False)
+
+
+class LoopbackCallbackSchema(Schema):
+    transaction_id = Field(required=True, allow_blank=False)
+    trx = Field(required=True, allow_blank=False)
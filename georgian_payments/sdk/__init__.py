@@ -1,7 +1,59 @@
-from .tbc import *
-from .bog import *
-from .credo import  *
-from .georgian_card import *
-from .space import *
-from .tbc import *
-from .ufc import *
\ No newline at end of file
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from georgian_payments.bank_settings import LOOPBACK_SETTINGS
+from georgian_payments.choices import PaymentTypeChoices, BankTypeChoices
+
+SDK_CLASSES = {
+    'AbstractBankSDK': 'georgian_payments.sdk.base.AbstractBankSDK',
+    'BogPaySDK': 'georgian_payments.sdk.bog.BogPaySDK',
+    'BogInstallmentSDK': 'georgian_payments.sdk.bog.BogInstallmentSDK',
+    'CredoInstallmentSDK': 'georgian_payments.sdk.credo.CredoInstallmentSDK',
+    'GCBank': 'georgian_payments.sdk.georgian_card.GCBank',
+    'LoopbackBankSDK': 'georgian_payments.sdk.loopback.LoopbackBankSDK',
+    'SpaceInstallmentSDK': 'georgian_payments.sdk.space.SpaceInstallmentSDK',
+    'TbcInstallmentSDK': 'georgian_payments.sdk.tbc.TbcInstallmentSDK',
+    'TbcBNPLInstallmentSDK': 'georgian_payments.sdk.tbc.TbcBNPLInstallmentSDK',
+    'UfcSdk': 'georgian_payments.sdk.ufc.UfcSdk',
+}
+
+ENGINE_CLASSES = {
+    (PaymentTypeChoices.CARD.value, BankTypeChoices.UFC.value): SDK_CLASSES['UfcSdk'],
+    (PaymentTypeChoices.CARD.value, BankTypeChoices.BOG.value): SDK_CLASSES['BogPaySDK'],
+    (PaymentTypeChoices.APPLE_PAY.value, BankTypeChoices.GC.value): SDK_CLASSES['GCBank'],
+    (PaymentTypeChoices.LOAN.value, BankTypeChoices.TBC.value): SDK_CLASSES['TbcInstallmentSDK'],
+    (PaymentTypeChoices.LOAN.value, BankTypeChoices.BOG.value): SDK_CLASSES['BogInstallmentSDK'],
+    (PaymentTypeChoices.LOAN.value, BankTypeChoices.SPACE.value): SDK_CLASSES['SpaceInstallmentSDK'],
+    (PaymentTypeChoices.LOAN.value, BankTypeChoices.CREDO.value): SDK_CLASSES['CredoInstallmentSDK'],
+    # (PaymentTypeChoices.CARD.value, BankTypeChoices.TBC.value): TbcECommerceSDK,
+}
+
+__all__ = ['ENGINE_CLASSES', 'SDK_CLASSES', 'get_sdk_class', 'get_engine_class', 'is_loopback', *SDK_CLASSES]
+
+
+@lru_cache(maxsize=None)
+def get_sdk_class(path: str):
+    """SDK modules (and geopayment, requests, loguru behind them) are imported on first use only."""
+    return import_string(path)
+
+
+def is_loopback(payment_type: int, bank_type: int) -> bool:
+    """Loopback sandbox replaces real engines only outside production (DEBUG or STAGE)."""
+    if not LOOPBACK_SETTINGS.get('enabled') or not (settings.DEBUG or getattr(settings, 'STAGE', False)):
+        return False
+    engines = LOOPBACK_SETTINGS.get('engines')
+    return not engines or [payment_type, bank_type] in [list(engine) for engine in engines]
+
+
+def get_engine_class(payment_type: int, bank_type: int):
+    if is_loopback(payment_type, bank_type):
+        return get_sdk_class(SDK_CLASSES['LoopbackBankSDK'])
+    return get_sdk_class(ENGINE_CLASSES[(payment_type, bank_type)])
+
+
+def __getattr__(name):
+    if name in SDK_CLASSES:
+        return get_sdk_class(SDK_CLASSES[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,25 +1,44 @@
 from typing import TYPE_CHECKING, Dict, Tuple
 
+import requests
 from django.templatetags.static import static
 
+from georgian_payments.bank_settings import get_bank_settings
+from georgian_payments.choices import BankTypeChoices
+from georgian_payments.sdk.http import get_session
+
 if TYPE_CHECKING:
     from georgian_payments.models import PaymentTransaction
 
 
 class AbstractBankSDK:
     _NAME = None
+    bank_type = None
+    settings_name = None  # e.g. 'BOG_SETTINGS', resolved per merchant into `self.config`
     unique_by_key = None
     pan_key = None
     image_path = None
     _PAY_URL = '%s'
 
-    def __init__(self, transaction: 'PaymentTransaction', **kwargs):
+    def __init__(self, transaction: 'PaymentTransaction', merchant: str = None, **kwargs):
         self.transaction: PaymentTransaction = transaction
+        self.merchant = (getattr(transaction, 'merchant', '') or '') if merchant is None else merchant
+        self.config = get_bank_settings(self.settings_name, self.merchant) if self.settings_name else {}
 
     def __str__(self):
         assert self._NAME is not None, "Field: _NAME Must Be Implemented"
         return self._NAME
 
+    @property
+    def session_name(self) -> str:
+        """Connection pools are kept per bank and merchant."""
+        name = BankTypeChoices(self.bank_type).name
+        return f'{name}:{self.merchant}' if self.merchant else name
+
+    @property
+    def http_session(self) -> requests.Session:
+        return get_session(self.session_name)
+
     @classmethod
     def display(cls):
         return cls._NAME
@@ -1,24 +1,30 @@
 import json
+import threading
+import time
 from abc import ABC
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Dict, Union, Tuple, TYPE_CHECKING
+from typing import Dict, Union, Tuple, TYPE_CHECKING, Iterable, List
 
-import requests
+from django.core.cache import caches
 from django.utils import timezone
 from django.utils.timezone import localtime
 from loguru import logger
 from requests.auth import HTTPBasicAuth
 
-from georgian_payments.bank_settings import BOG_SETTINGS
-from georgian_payments.choices import PTTChoices, ManualActionChoices
+from georgian_payments.choices import PTTChoices, ManualActionChoices, BankTypeChoices
 from georgian_payments.sdk.base import AbstractBankSDK
+from georgian_payments.sdk.http import tokens
+from georgian_payments.timeouts import is_timed_out
+from georgian_payments.tracing import token_refresh
 from georgian_payments.utils import requests_to_curl, BearerAuth
 
 if TYPE_CHECKING:
     from georgian_payments.models import PaymentTransaction
 
-BOG = BOG_SETTINGS
+INSTALLMENT_CACHE_TTL = 60 * 60
+INSTALLMENT_STALE_TTL = 24 * 60 * 60
+INSTALLMENT_FETCH_WORKERS = 4
 
 
 class PreAuthChoices(Enum):
@@ -28,6 +34,8 @@ class PreAuthChoices(Enum):
 
 
 class AbstractBogSDK(AbstractBankSDK, ABC):
+    bank_type = BankTypeChoices.BOG
+    settings_name = 'BOG_SETTINGS'
     unique_by_key = 'status'
     __BASE_URL = 'https://ipay.ge/opay/api/v1'
     __TOKEN_URL = f'{__BASE_URL}/oauth2/token'
@@ -36,21 +44,30 @@ class AbstractBogSDK(AbstractBankSDK, ABC):
         super().__init__(transaction, **kwargs)
         self.app_id = None
         self.token_expires_in = None
-        self.merchant_id = BOG['merchant_id']
-        self.client_id = BOG['client_id']
-        self.secret_key = BOG['secret_key']
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.client_id, self.secret_key)
+        self.merchant_id = self.config['merchant_id']
+        self.client_id = self.config['client_id']
+        self.secret_key = self.config['secret_key']
+        self.session = self.http_session
+        self.auth = HTTPBasicAuth(self.client_id, self.secret_key)
         self.is_generated_token = False
 
+    @property
+    def token_cache_key(self):
+        return f'BOG:{self.client_id}'
+
     def _generate_jwt_auth(self):
         self.is_generated_token = True
-        response = self._request(self.__TOKEN_URL, data={
-            'grant_type': 'client_credentials'
-        }, is_urlencoded=True)
-        self.session.auth = BearerAuth(response['access_token'])
-        self.app_id = response['app_id']
-        self.token_expires_in = response['expires_in']
+        access_token = tokens.get(self.token_cache_key)
+        if access_token is None:
+            with token_refresh(self.session_name):
+                response = self._request(self.__TOKEN_URL, data={
+                    'grant_type': 'client_credentials'
+                }, is_urlencoded=True)
+            access_token = response['access_token']
+            self.app_id = response['app_id']
+            self.token_expires_in = response['expires_in']
+            tokens.set(self.token_cache_key, access_token, self.token_expires_in)
+        self.auth = BearerAuth(access_token)
 
     def _request(self, url, method='POST', data=None, is_urlencoded=False) -> Union[int, dict]:
         if not self.is_generated_token:
@@ -58,9 +75,11 @@ class AbstractBogSDK(AbstractBankSDK, ABC):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded' if is_urlencoded else 'application/json'
         }
-        response = self.session.request(method, url, data=data, headers=headers)
+        response = self.session.request(method, url, data=data, headers=headers, auth=self.auth)
         if url != self.__TOKEN_URL:
             logger.info(requests_to_curl(response))
+        if response.status_code == 401:
+            tokens.delete(self.token_cache_key)
         if response.status_code != 200:
             logger.error(f'Bog Bank Is Not Available | {url} | {response.text} | {response.status_code}')
         if response.content and response.status_code == 200:
@@ -82,11 +101,11 @@ class BogPaySDK(AbstractBogSDK):
     def pay_with_new_card(self) -> Dict:
         request_data = {
             'shop_order_id': self.transaction.id,
-            'intent': BOG['intent'],
+            'intent': self.config['intent'],
             'locale': "ka",
-            'redirect_url': BOG['redirect_url'] % self.transaction.id,
-            'show_shop_order_id_on_extract': BOG['show_shop_order_id_on_extract'],
-            'capture_method': BOG['capture_method'],
+            'redirect_url': self.config['redirect_url'] % self.transaction.id,
+            'show_shop_order_id_on_extract': self.config['show_shop_order_id_on_extract'],
+            'capture_method': self.config['capture_method'],
             'purchase_units': [
                 {
                     "amount": {
@@ -136,7 +155,7 @@ class BogPaySDK(AbstractBogSDK):
         if data.get('status') in ['in_progress', 'success']:
             status = True
         trx_id = data.get('order_id', '')
-        redirect_url = BOG['redirect_url'] % trx_id if status else BOG['redirect_fail_url']
+        redirect_url = self.config['redirect_url'] % trx_id if status else self.config['redirect_fail_url']
         return {
             'status': status,
             'redirect_url': redirect_url,
@@ -153,7 +172,7 @@ class BogPaySDK(AbstractBogSDK):
         data = self._request(self.__CHECK_ORDER_STATUS_URL % self.transaction.trx, method='GET')
         self.transaction.card_hash = data.get('pan', '****') or "****"
         is_ok = status_mapper.get(data.get('status', ''), -1)
-        if is_ok == -1 and self.transaction.created + timedelta(minutes=15) < timezone.now():
+        if is_ok == -1 and is_timed_out(self.transaction):
             is_ok = -2
         return data, is_ok
 
@@ -191,7 +210,7 @@ class BogPaySDK(AbstractBogSDK):
         return status_code == 200, data
 
     def start_payment(self) -> Dict:
-        if self.transaction.bank_card:
+        if self.transaction.bank_card_id:
             return self.pay_with_saved_card()
         return self.pay_with_new_card()
 
@@ -205,18 +224,97 @@ class BogInstallmentSDK(AbstractBogSDK):
     image_path = 'admin/img/bank/bog.jpeg'
     _PAY_URL = "https://installment.bog.ge/?order_id=%s&locale=ka"
 
-    def __init__(self, transaction: 'PaymentTransaction'):
-        super().__init__(transaction)
-        self.installment_options = transaction.additional_data.get('installment_options', {})
-        if transaction.transaction_type == PTTChoices.PAY:
+    def __init__(self, transaction: 'PaymentTransaction' = None, **kwargs):
+        super().__init__(transaction, **kwargs)
+        self.installment_options = transaction.additional_data.get('installment_options', {}) if transaction else {}
+        if transaction and transaction.transaction_type == PTTChoices.PAY:
             assert self.installment_options, 'Bog Installment Need Installment Options'
 
-    def calculate_installment(self):
+    def installment_bucket(self, amount) -> int:
+        """Amount in tetri, rounded to `installment_amount_bucket` (1 tetri by default, i.e. exact)."""
+        bucket = self.config.get('installment_amount_bucket', 1)
+        return int(round(float(amount) * 100 / bucket)) * bucket
+
+    def installment_cache_key(self, bucket: int) -> str:
+        return f'georgian_payments:bog_installment:{self.client_id}:{bucket}'
+
+    @property
+    def installment_cache(self):
+        return caches[self.config.get('installment_cache_alias', 'default')]
+
+    def _calculate_installment(self, bucket: int) -> Union[int, dict]:
         return self._request(self.__CALCULATE_INSTALLMENT_URL, method='POST', data=json.dumps({
-            'amount': self.transaction.amount,
+            'amount': bucket / 100,
             'client_id': self.client_id
         }))
 
+    def _fetch_installments(self, buckets: List[int]) -> Dict[int, Union[int, dict]]:
+        if len(buckets) == 1:
+            return {buckets[0]: self._calculate_installment(buckets[0])}
+        if not self.is_generated_token:
+            self._generate_jwt_auth()  # once, before the workers share `self.auth`
+        with ThreadPoolExecutor(max_workers=INSTALLMENT_FETCH_WORKERS) as executor:
+            return dict(zip(buckets, executor.map(self._calculate_installment, buckets)))
+
+    def _store_installments(self, calculations: Dict[int, Union[int, dict]]):
+        ttl = self.config.get('installment_cache_ttl', INSTALLMENT_CACHE_TTL)
+        fresh_until = time.time() + ttl
+        self.installment_cache.set_many({
+            self.installment_cache_key(bucket): {'data': data, 'fresh_until': fresh_until}
+            for bucket, data in calculations.items() if isinstance(data, dict)  # bank errors are not cached
+        }, timeout=ttl + self.config.get('installment_stale_ttl', INSTALLMENT_STALE_TTL))
+
+    def _revalidate_installments(self, buckets: List[int]):
+        cache = self.installment_cache
+        locks = [f'{self.installment_cache_key(bucket)}:refresh' for bucket in buckets]
+        buckets = [bucket for bucket, lock in zip(buckets, locks) if cache.add(lock, 1, timeout=60)]
+        if not buckets:
+            return
+
+        def refresh():
+            try:
+                self._store_installments(self._fetch_installments(buckets))
+            except Exception as e:
+                logger.error(f'Bog Installment | Calculation Refresh Failed | {e}')
+            finally:
+                cache.delete_many([f'{self.installment_cache_key(bucket)}:refresh' for bucket in buckets])
+
+        if not self.is_generated_token:
+            self._generate_jwt_auth()
+        threading.Thread(target=refresh, name='bog-installment-refresh', daemon=True).start()
+
+    def calculate_installments(self, amounts: Iterable) -> Dict:
+        """
+        Calculations for many amounts (e.g. a catalogue page) with one cache round trip. Missing ones are
+        fetched from the bank, expired ones are returned stale and refreshed in the background.
+        """
+        buckets = {amount: self.installment_bucket(amount) for amount in amounts}
+        keys = {bucket: self.installment_cache_key(bucket) for bucket in set(buckets.values())}
+        cached = self.installment_cache.get_many(list(keys.values()))
+        now, results, missing, stale = time.time(), {}, [], []
+        for bucket, key in keys.items():
+            entry = cached.get(key)
+            if entry is None:
+                missing.append(bucket)
+                continue
+            results[bucket] = entry['data']
+            if entry['fresh_until'] <= now:
+                stale.append(bucket)
+        if missing:
+            fetched = self._fetch_installments(missing)
+            self._store_installments(fetched)
+            results.update(fetched)
+        if stale:
+            self._revalidate_installments(stale)
+        return {amount: results[bucket] for amount, bucket in buckets.items()}
+
+    def calculate_installment(self, amount=None):
+        amount = self.transaction.amount if amount is None else amount
+        return self.calculate_installments([amount])[amount]
+
+    def precompute_installments(self, amounts: Iterable) -> int:
+        return len(self.calculate_installments(amounts))
+
     def product_data(self):
         products_information = self.transaction.product_data
 
@@ -236,9 +334,9 @@ class BogInstallmentSDK(AbstractBogSDK):
             "intent": "LOAN",
             "installment_month": self.installment_options['month'],
             "installment_type": self.installment_options["discount_code"],
-            "success_redirect_url": BOG["installment_success_redirect_url"] % self.transaction.id,
-            "fail_redirect_url": BOG["installment_fail_redirect_url"] % self.transaction.id,
-            "reject_redirect_url": BOG["installment_reject_redirect_url"] % self.transaction.id,
+            "success_redirect_url": self.config["installment_success_redirect_url"] % self.transaction.id,
+            "fail_redirect_url": self.config["installment_fail_redirect_url"] % self.transaction.id,
+            "reject_redirect_url": self.config["installment_reject_redirect_url"] % self.transaction.id,
             "validate_items": False,
             "purchase_units": [
                 {
@@ -268,7 +366,7 @@ class BogInstallmentSDK(AbstractBogSDK):
             'in_progress': 0
         }
         is_ok = status_mapper.get(data.get('status', ''), -1)
-        if is_ok == -1 and self.transaction.created + timedelta(minutes=50) < timezone.now():
+        if is_ok == -1 and is_timed_out(self.transaction):
             is_ok = -2
         return data, is_ok
 
@@ -1,43 +1,37 @@
 import hashlib
-from datetime import timedelta
 from typing import Dict, Tuple
 
-import requests
 from django.conf import settings
-from django.utils import timezone
-from django.utils.timezone import localtime
 from rest_framework.exceptions import ValidationError
 
-from georgian_payments.bank_settings import CREDO_SETTINGS
-from georgian_payments.choices import ManualActionChoices
+from georgian_payments.choices import ManualActionChoices, BankTypeChoices
 from georgian_payments.sdk.base import AbstractBankSDK
-
-CREDO = CREDO_SETTINGS
+from georgian_payments.timeouts import is_timed_out
 
 
 class CredoInstallmentSDK(AbstractBankSDK):
     _NAME = 'CREDO_INSTALLMENT'
+    bank_type = BankTypeChoices.CREDO
+    settings_name = 'CREDO_SETTINGS'
     unique_by_key = 'data'
 
     __BASE_URL = 'https://ganvadeba.credo.ge'
     __INITIAL_LOAN = f'{__BASE_URL}/widget_api/index.php/'
     __STATUS_LOAN = f'{__BASE_URL}/widget/api.php?merchantId=%s&orderCode=%s'
 
-    merchant_id = CREDO['merchant_id']
-    secret_key = CREDO['secret_key']
-
     image_path = 'admin/img/bank/credo.svg'
     _PAY_URL = 'https://ganvadeba.credo.ge/installment/?OrderHash=%s'
 
     def __init__(self, transaction: 'PaymentTransaction', **kwargs):
         super().__init__(transaction, **kwargs)
+        self.merchant_id = self.config['merchant_id']
+        self.secret_key = self.config['secret_key']
 
-    @staticmethod
-    def _request(url, method='POST', data=None, is_urlencoded=False):
+    def _request(self, url, method='POST', data=None, is_urlencoded=False):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded' if is_urlencoded else 'application/json'
         }
-        response = requests.request(method, url, data=data, headers=headers)
+        response = self.http_session.request(method, url, data=data, headers=headers)
         return response
 
     def get_failed_text_status(self):
@@ -95,7 +89,7 @@ class CredoInstallmentSDK(AbstractBankSDK):
             method='GET',
         )
         if response.status_code == 404:
-            if self.transaction.updated > localtime(timezone.now()) - timedelta(hours=1):
+            if is_timed_out(self.transaction):
                 status = -2
             return {}, status
         data = response.json()
@@ -1,20 +1,23 @@
 import json
 from typing import Union, Dict, Tuple
 
-import requests
 from django.template.loader import render_to_string
 from django.utils import timezone
 from django.utils.timezone import localtime
 from loguru import logger
 
-from georgian_payments.bank_settings import GEORGIAN_CARD_SETTINGS
-from georgian_payments.choices import PaymentTypeChoices
+from georgian_payments.choices import PaymentTypeChoices, BankTypeChoices
+from georgian_payments.profiling import span
 from georgian_payments.sdk.base import AbstractBankSDK
+from georgian_payments.sdk.http import tokens
+from georgian_payments.tracing import token_refresh
 
-GEORGIAN_CARD = GEORGIAN_CARD_SETTINGS
+SESSION_TTL = 300  # seconds
 
 
 class GCBank(AbstractBankSDK):
+    bank_type = BankTypeChoices.GC
+    settings_name = 'GEORGIAN_CARD_SETTINGS'
     unique_by_key = 'state'
     # PORTAL = '66EF9A2E6D429D8F0C767574F9353E8B'
     APP_PORTAL = 'B017853764E36EB69E831F9B46880E61'
@@ -28,29 +31,39 @@ class GCBank(AbstractBankSDK):
                           f'?identifier=FIDS9ECTGA6Q7API&password=V9ZGM0CTE8J63HR4ONI7'
     __CHECK_STATUS_URL = f'{__BASE_URL}/open/api/v4/{APP_PORTAL}/merchant/history/trx/%s'
     __REFUND_URL = f'{__BASE_URL}/open/api/v4/{APP_PORTAL}/merchant/history/trx/%s/refund/?currency=GEL&amount=%s'
-    _PAY_URL = f"{__REQUEST_TRANSACTION_URL}?merch_id={GEORGIAN_CARD['merchant_id']}" \
-               f"&back_url_s={GEORGIAN_CARD['back_url_s']}&back_url_f={GEORGIAN_CARD['back_url_f']}" \
-               f"&o.transaction_id=%s&lang_code=%s"
     __APPLE_ACCEPT_URL = f'{__BASE_URL}/open/api/v4/{APP_PORTAL}/payment/%s/applepay/accept'
     __APPLE_CHECK_TRANS_URL = f'{__BASE_URL}/open/api/v4/{APP_PORTAL}/payment/%s'
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.lang = 'ka'
+        self._PAY_URL = f"{self.__REQUEST_TRANSACTION_URL}?merch_id={self.config['merchant_id']}" \
+                        f"&back_url_s={self.config['back_url_s']}&back_url_f={self.config['back_url_f']}" \
+                        f"&o.transaction_id=%s&lang_code=%s"
 
-    @classmethod
-    def pay_url(cls, pk):
-        lang = 'ka'
-        return cls._PAY_URL % (lang, pk, lang, pk, pk, lang)
+    @property
+    def session_cache_key(self):
+        return f'{self._NAME}:{self.merchant}' if self.merchant else self._NAME
+
+    def pay_url(self, pk, lang: str = None):
+        """Payment page of the merchant's terminal, its back URLs take the language and the transaction too."""
+        lang = lang or self.lang
+        return self._PAY_URL % (lang, pk, lang, pk, pk, lang)
 
     def start_session(self) -> Union[str, None]:
-        r = requests.post(self.__START_SESSION_URL)
+        session_id = tokens.get(self.session_cache_key)
+        if session_id is not None:
+            return session_id
+        with token_refresh(self.session_name):
+            r = self.http_session.post(self.__START_SESSION_URL)
         if r.status_code == 200:
-            return r.json()['sessionId']
+            session_id = r.json()['sessionId']
+            tokens.set(self.session_cache_key, session_id, self.config.get('session_ttl', SESSION_TTL))
+            return session_id
         return None
 
     def get_token(self) -> Union[None, str]:
-        r = requests.post(self.__TOKEN_URL)
+        r = self.http_session.post(self.__TOKEN_URL)
         if r.status_code != 200:
             logger.error('GC Token Is Not Available')
             return None
@@ -58,12 +71,10 @@ class GCBank(AbstractBankSDK):
 
     @property
     def redirect_url(self):
-        url = self._PAY_URL
-        pk = self.transaction.id
-        return url % (self.lang, pk, self.lang, pk, pk, self.lang)
+        return self.pay_url(self.transaction.id)
 
     def start_payment(self) -> Dict:
-        if self.transaction.bank_card or \
+        if self.transaction.bank_card_id or \
                 self.transaction.payment_method.payment_type == PaymentTypeChoices.APPLE_PAY:
             return self.pay_with_saved_card()
         return self.pay_with_new_card()
@@ -78,11 +89,11 @@ class GCBank(AbstractBankSDK):
 
     def pay_with_saved_card(self):
         token = self.get_token()
-        r = requests.post(
+        r = self.http_session.post(
             self.__REQUEST_TRANSACTION_SUBSCRIPTION % token,
             data={
-                'merchantId': GEORGIAN_CARD['merchant_id'],
-                'returnUrl': GEORGIAN_CARD['back_url_s'] % (self.lang, self.transaction.id),
+                'merchantId': self.config['merchant_id'],
+                'returnUrl': self.config['back_url_s'] % (self.lang, self.transaction.id),
                 'lang': 'ka',
                 'params.transaction_id': self.transaction.id
             },
@@ -94,47 +105,51 @@ class GCBank(AbstractBankSDK):
         logger.info(f'GC : {data}')
         return {
             'status': True,
-            'redirect_url': GEORGIAN_CARD['back_url_s'] % (self.lang, self.transaction.id),
+            'redirect_url': self.config['back_url_s'] % (self.lang, self.transaction.id),
             'trx_id': token,
             'payment_hash': token
         }
 
     @property
     def get_check_accept_xml(self) -> str:
-        return render_to_string('payment/check_response.xml', context={
-            "result": {
-                "code": 1,
-                "desc": "Successful"
-            },
-            "merchant_trx": self.transaction.trx,
-            "short_desc": f'ID: {self.transaction.id}',
-            "long_desc": f'graey/{self.transaction.id}',
-            "account_id": GEORGIAN_CARD['account_id'],
-            "amount": int(self.transaction.amount * 100),
-            "save_card": False,  # self.transaction.save_card,
-            "card_id": None,  # self.transaction.bank_card.rec_id if self.transaction.bank_card_id else None,
-            "is_withdrawal": False  # For Future
-        })
+        with span('render'):
+            return render_to_string('payment/check_response.xml', context={
+                "result": {
+                    "code": 1,
+                    "desc": "Successful"
+                },
+                "merchant_trx": self.transaction.trx,
+                "short_desc": f'ID: {self.transaction.id}',
+                "long_desc": f'graey/{self.transaction.id}',
+                "account_id": self.config['account_id'],
+                "amount": int(self.transaction.amount * 100),
+                "save_card": False,  # self.transaction.save_card,
+                "card_id": None,  # self.transaction.bank_card.rec_id if self.transaction.bank_card_id else None,
+                "is_withdrawal": False  # For Future
+            })
 
     @staticmethod
     def get_check_fail_xml(message) -> str:
-        return render_to_string('payment/check_response.xml', context={
-            "accept": False,
-            "result": {
-                "code": 2,
-                "desc": message
-            }
-        })
+        with span('render'):
+            return render_to_string('payment/check_response.xml', context={
+                "accept": False,
+                "result": {
+                    "code": 2,
+                    "desc": message
+                }
+            })
 
     def _check_transaction_status(self) -> Tuple[dict, int]:
         session_id = self.start_session()
-        r = requests.get(
+        r = self.http_session.get(
             self.__CHECK_STATUS_URL % self.transaction.trx,
             headers={
                 'X-IV-Authorization': f'Session {session_id}'
             }
         )
         if r.status_code != 200:
+            if r.status_code == 401:
+                tokens.delete(self.session_cache_key)
             return {self.unique_by_key: 'Unknown'}, 0
         logger.info(r.json())
         return r.json(), 0
@@ -144,7 +159,7 @@ class GCBank(AbstractBankSDK):
 
     def refund(self, amount) -> Tuple[bool, Dict]:
         session_id = self.start_session()
-        r = requests.post(self.__REFUND_URL % (self.transaction.trx, int(amount * 100)), headers={
+        r = self.http_session.post(self.__REFUND_URL % (self.transaction.trx, int(amount * 100)), headers={
             'X-IV-Authorization': f'Session {session_id}'
         })
         try:
@@ -154,6 +169,8 @@ class GCBank(AbstractBankSDK):
         data['time'] = localtime(timezone.now()).isoformat()
         logger.info(data)
         if r.status_code != 200:
+            if r.status_code == 401:
+                tokens.delete(self.session_cache_key)
             return False, data
         return True, data
 
@@ -161,7 +178,7 @@ class GCBank(AbstractBankSDK):
         return self.refund(amount)
 
     def apple_pay_accept(self):
-        r = requests.post(
+        r = self.http_session.post(
             self.__APPLE_ACCEPT_URL % self.transaction.pay_id,
             data=json.dumps(
                 {"token": self.transaction.additional_data['apple_data']}
@@ -173,7 +190,7 @@ class GCBank(AbstractBankSDK):
         return r.status_code, r.json()
 
     def check_apple_pay_transaction(self) -> Tuple[dict, int]:
-        r = requests.post(
+        r = self.http_session.post(
             self.__APPLE_CHECK_TRANS_URL % self.transaction.pay_id
         )
         data = r.json()
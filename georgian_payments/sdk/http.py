@@ -0,0 +1,134 @@
+import os
+import ssl
+import threading
+import time
+from typing import Dict, Tuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from georgian_payments import tracing
+from georgian_payments.profiling import span
+from georgian_payments.ratelimit import limiter, current_operation
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+TOKEN_EXPIRY_MARGIN = 60  # seconds
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_pid = os.getpid()
+_lock = threading.Lock()
+
+
+class SSLContextAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools reuse one prepared SSLContext (e.g. with a client certificate already loaded)."""
+
+    def __init__(self, ssl_context: ssl.SSLContext, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().proxy_manager_for(*args, **kwargs)
+
+
+class BankSession(requests.Session):
+    """
+    Session that takes a token of the bank's rate limit before every call, retries calls the bank
+    throttled with 429 once the bucket is free again, and attributes its calls to the bank in the
+    active request profile and a trace span.
+    """
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self._span = f'http.{name}'
+
+    def request(self, method, url, *args, **kwargs):
+        with span(self._span), tracing.bank_call(self.name, current_operation()[0], method, url) as current:
+            attempt = 0
+            while True:
+                limiter.acquire(self.name)
+                response = super().request(method, url, *args, **kwargs)
+                if response.status_code != 429 or attempt >= limiter.retries or \
+                        not limiter.throttled(self.name, response):
+                    current.set_attributes({'http.response.status_code': response.status_code,
+                                            'http.request.resend_count': attempt,
+                                            'payment.outcome': 'ok' if response.status_code < 400 else 'error'})
+                    return response
+                attempt += 1
+
+
+def client_cert_context(cert: Tuple[str, str], verify: bool = True) -> ssl.SSLContext:
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    context.load_cert_chain(*cert)
+    return context
+
+
+def get_session(name: str, cert: Optional[Tuple[str, str]] = None, verify: bool = True) -> requests.Session:
+    """
+    Process wide keep-alive session per bank. Sessions are created lazily and
+    dropped after a fork, so workers never share the parent's sockets.
+    """
+    global _sessions_pid
+    if _sessions_pid != os.getpid():
+        with _lock:
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+    session = _sessions.get(name)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = BankSession(name)
+            session.verify = verify
+            if cert:
+                adapter = SSLContextAdapter(
+                    client_cert_context(cert, verify), pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+                )
+            else:
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE))
+            _sessions[name] = session
+    return session
+
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+class TokenCache:
+    """Process wide cache of bank access tokens, expired a little before the bank does."""
+
+    def __init__(self):
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        token, expires_at = self._tokens.get(key, (None, 0))
+        if expires_at <= time.monotonic():
+            return None
+        return token
+
+    def set(self, key: str, token: str, expires_in: float):
+        with self._lock:
+            self._tokens[key] = (token, time.monotonic() + max(float(expires_in or 0) - TOKEN_EXPIRY_MARGIN, 0))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._tokens.pop(key, None)
+
+
+tokens = TokenCache()
@@ -0,0 +1,170 @@
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple, Optional
+
+from django.db import close_old_connections
+from loguru import logger
+
+from georgian_payments.bank_settings import LOOPBACK_SETTINGS
+from georgian_payments.sdk.base import AbstractBankSDK
+
+LOOPBACK = LOOPBACK_SETTINGS
+
+APPROVED, DECLINED, TIMEOUT = 'approved', 'declined', 'timeout'
+
+
+def sample_latency(distribution: Optional[dict], rnd: random.Random) -> float:
+    """
+    {'type': 'fixed', 'value': 0.05}, {'type': 'uniform', 'min': 0.01, 'max': 0.1},
+    {'type': 'lognormal', 'median': 0.05, 'sigma': 0.5} or {'type': 'exponential', 'mean': 0.05}, in seconds.
+    """
+    if not distribution:
+        return 0.0
+    kind = distribution.get('type', 'fixed')
+    if kind == 'uniform':
+        return rnd.uniform(distribution['min'], distribution['max'])
+    if kind == 'lognormal':
+        return rnd.lognormvariate(math.log(distribution['median']), distribution.get('sigma', 0.5))
+    if kind == 'exponential':
+        return rnd.expovariate(1 / distribution['mean'])
+    return distribution.get('value', 0.0)
+
+
+class CallbackScheduler:
+    """
+    One timer thread keeps due callbacks in a heap and hands them to a small pool which posts them
+    to the loopback callback view in-process. Callbacks the view is not ready for (409) are retried.
+    """
+
+    def __init__(self, workers: int = 8, retries: int = 20, retry_delay: float = 0.05):
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._heap = []
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='loopback-callback')
+        self._local = threading.local()
+        threading.Thread(target=self._loop, name='loopback-scheduler', daemon=True).start()
+
+    def schedule(self, delay: float, payload: dict, attempt: int = 0):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), payload, attempt))
+            self._condition.notify()
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, payload, attempt = heapq.heappop(self._heap)
+            self._pool.submit(self._deliver, payload, attempt)
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            from django.test import Client
+
+            client = self._local.client = Client(HTTP_HOST=LOOPBACK.get('callback_host', 'localhost'))
+        return client
+
+    def _deliver(self, payload: dict, attempt: int):
+        from django.urls import reverse
+
+        try:
+            response = self._client().post(
+                reverse(LOOPBACK.get('callback_url_name', 'loopback_callback-callback')), payload,
+                content_type='application/json'
+            )
+            if response.status_code == 409 and attempt < self.retries:
+                self.schedule(self.retry_delay, payload, attempt + 1)
+            elif response.status_code >= 400:
+                logger.error(f'Loopback | Transaction ID: {payload["transaction_id"]} | {response.status_code}')
+        except Exception as e:
+            logger.error(f'Loopback | Transaction ID: {payload["transaction_id"]} | {e}')
+        finally:
+            close_old_connections()  # the test client skips this, pool threads reuse their connection
+
+
+_scheduler: Optional[CallbackScheduler] = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> CallbackScheduler:
+    global _scheduler, _scheduler_pid
+    if _scheduler is None or _scheduler_pid != os.getpid():
+        with _scheduler_lock:
+            if _scheduler is None or _scheduler_pid != os.getpid():
+                _scheduler = CallbackScheduler(LOOPBACK.get('callback_workers', 8))
+                _scheduler_pid = os.getpid()
+    return _scheduler
+
+
+class LoopbackBankSDK(AbstractBankSDK):
+    """
+    In-process sandbox bank for load testing. The outcome of a payment is derived from its trx, so a
+    replayed run gives the same approvals, declines and timeouts. Mapped in place of real engines by
+    `LOOPBACK_SETTINGS`, only with DEBUG or STAGE on.
+    """
+    _NAME = 'LOOPBACK'
+    unique_by_key = 'status'
+
+    _PAY_URL = 'https://loopback.invalid/%s'
+
+    def __init__(self, transaction: 'PaymentTransaction', **kwargs):
+        super().__init__(transaction, **kwargs)
+        self.random = random.Random()
+
+    def _sleep(self, name: str):
+        latency = sample_latency(LOOPBACK.get('latency', {}).get(name), self.random)
+        if latency > 0:
+            time.sleep(latency)
+
+    @staticmethod
+    def outcome(trx: str) -> str:
+        point = int(hashlib.md5(trx.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        if point < LOOPBACK.get('approve_rate', 0.9):
+            return APPROVED
+        if point < LOOPBACK.get('approve_rate', 0.9) + LOOPBACK.get('decline_rate', 0.08):
+            return DECLINED
+        return TIMEOUT
+
+    def result(self, trx: str) -> Tuple[dict, int]:
+        outcome = self.outcome(trx)
+        is_ok = {APPROVED: 1, DECLINED: -1, TIMEOUT: -2}[outcome]
+        return {'trx': trx, 'status': outcome, 'amount': self.transaction.amount}, is_ok
+
+    def start_payment(self) -> Dict:
+        self._sleep('start_payment')
+        trx = f'LB-{uuid.uuid4().hex}'
+        if self.outcome(trx) != TIMEOUT and LOOPBACK.get('callbacks', True):
+            get_scheduler().schedule(
+                sample_latency(LOOPBACK.get('latency', {}).get('callback'), self.random),
+                {'transaction_id': str(self.transaction.pk), 'trx': trx},
+            )
+        return {
+            'status': True,
+            'redirect_url': self.pay_url(trx),
+            'trx_id': trx,
+            'payment_hash': trx,
+        }
+
+    def check_transaction_status(self) -> Tuple[dict, int]:
+        self._sleep('check_status')
+        return self.result(self.transaction.trx)
+
+    def refund(self, amount) -> Tuple[bool, Dict]:
+        self._sleep('refund')
+        return True, {'trx': self.transaction.trx, 'status': 'refunded', 'amount': amount}
+
+    def cancel(self, amount) -> Tuple[bool, Dict]:
+        self._sleep('refund')
+        return True, {'trx': self.transaction.trx, 'status': 'canceled', 'amount': amount}
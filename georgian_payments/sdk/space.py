@@ -1,28 +1,20 @@
 import json
 from typing import Dict, Tuple
 
-import requests
 from django.conf import settings
 from rest_framework.exceptions import ValidationError
 
-from georgian_payments.bank_settings import SPACE_SETTINGS
-from georgian_payments.choices import ManualActionChoices
+from georgian_payments.choices import ManualActionChoices, BankTypeChoices
 from georgian_payments.sdk.base import AbstractBankSDK
 
-SPACE = SPACE_SETTINGS
-
 
 class SpaceInstallmentSDK(AbstractBankSDK):
     _NAME = 'SPACE_INSTALLMENT'
+    bank_type = BankTypeChoices.SPACE
+    settings_name = 'SPACE_SETTINGS'
     unique_by_key = 'Status'
 
-    __BASE_URL = SPACE['base_url']
     __API_VERSION = 'v1'
-    __CREATE_QR = f'{__BASE_URL}{__API_VERSION}/qr/create'
-    __STATUS_LOAN = f'{__BASE_URL}{__API_VERSION}/loans/checkstatus?merchantname=%s&orderId=%s&secret=%s'
-
-    merchant_name = SPACE['merchant_name']
-    secret_key = SPACE['secret_key']
 
     image_path = 'admin/img/bank/space.svg'
 
@@ -30,13 +22,17 @@ class SpaceInstallmentSDK(AbstractBankSDK):
 
     def __init__(self, transaction: 'PaymentTransaction', **kwargs):
         super().__init__(transaction, **kwargs)
+        base_url = self.config['base_url']
+        self.__CREATE_QR = f'{base_url}{self.__API_VERSION}/qr/create'
+        self.__STATUS_LOAN = f'{base_url}{self.__API_VERSION}/loans/checkstatus?merchantname=%s&orderId=%s&secret=%s'
+        self.merchant_name = self.config['merchant_name']
+        self.secret_key = self.config['secret_key']
 
-    @staticmethod
-    def _request(url, method='POST', data=None, is_urlencoded=False):
+    def _request(self, url, method='POST', data=None, is_urlencoded=False):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded' if is_urlencoded else 'application/json'
         }
-        response = requests.request(method, url, data=data, headers=headers)
+        response = self.http_session.request(method, url, data=data, headers=headers)
         if response.status_code > 201 or not response.json()['data']:
             raise ValidationError(f'Space Bank Is Not Available | {url} {response.text}')
         if response.content:
@@ -1,25 +1,25 @@
 import json
 from typing import Dict, Tuple, TYPE_CHECKING
 
-import requests
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from loguru import logger
 from requests.auth import HTTPBasicAuth
 
-from georgian_payments.bank_settings import TBC_SETTINGS
-from georgian_payments.choices import ManualActionChoices
+from georgian_payments.choices import ManualActionChoices, BankTypeChoices
 from georgian_payments.sdk.base import AbstractBankSDK
+from georgian_payments.sdk.http import tokens
+from georgian_payments.tracing import token_refresh
 from georgian_payments.utils import BearerAuth
 
 if TYPE_CHECKING:
     from georgian_payments.models import PaymentTransaction
 
-TBC = TBC_SETTINGS
-
 
 class TbcInstallmentSDK(AbstractBankSDK):
     _NAME = 'TBC_LOAN'
+    bank_type = BankTypeChoices.TBC
+    settings_name = 'TBC_SETTINGS'
     unique_by_key = 'statusId'
     __BASE_URL = 'https://api.tbcbank.ge/'
     __TOKEN_URL = f'{__BASE_URL}oauth/token'
@@ -31,31 +31,37 @@ class TbcInstallmentSDK(AbstractBankSDK):
     __STATUS_CHANGES = f'{__BASE_URL}{__API_VERSION}/online-installments/merchant/applications/status-changes'
     __STATUS_CHANGES_SYNC = f'{__BASE_URL}{__API_VERSION}/online-installments/merchant/applications/status-changes-sync'
 
-    client_id = TBC['client_id']
-    secret_key = TBC['secret_key']
-    merchant_key = TBC['merchant_key']
-    campaign_id = TBC['campaign_id']
-
     image_path = 'admin/img/bank/tbc.png'
     _PAY_URL = "https://tbcinstallment.tbcbank.ge/Installment/InitializeNewLoan?sessionId=%s"
 
     def __init__(self, transaction: 'PaymentTransaction' = None, **kwargs):
         super().__init__(transaction, **kwargs)
+        self.client_id = self.config['client_id']
+        self.secret_key = self.config['secret_key']
+        self.merchant_key = self.config['merchant_key']
+        self.campaign_id = self.config['campaign_id']
         self.token_expires_in = None
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(self.client_id, self.secret_key)
+        self.session = self.http_session
+        self.auth = HTTPBasicAuth(self.client_id, self.secret_key)
         self.is_generated_token = False
 
+    @property
+    def token_cache_key(self):
+        return f'TBC:{self.client_id}'
+
     def _generate_jwt_auth(self):
         self.is_generated_token = True
-        response = self._request(self.__TOKEN_URL, data={
-            'grant_type': 'client_credentials',
-            'scope': 'online_installments'
-        }, is_urlencoded=True)
-        self.session.auth = BearerAuth(response['access_token'])
-        self.token_expires_in = response['expires_in']
-        # print(int(round(datetime.now().timestamp() * 1000)))
-        # print(self.token_expires_in)
+        access_token = tokens.get(self.token_cache_key)
+        if access_token is None:
+            with token_refresh(self.session_name):
+                response = self._request(self.__TOKEN_URL, data={
+                    'grant_type': 'client_credentials',
+                    'scope': 'online_installments'
+                }, is_urlencoded=True)
+            access_token = response['access_token']
+            self.token_expires_in = response['expires_in']
+            tokens.set(self.token_cache_key, access_token, self.token_expires_in)
+        self.auth = BearerAuth(access_token)
 
     def _request(self, url, method='POST', data=None, is_urlencoded=False):
         if not self.is_generated_token:
@@ -63,7 +69,9 @@ class TbcInstallmentSDK(AbstractBankSDK):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded' if is_urlencoded else 'application/json'
         }
-        response = self.session.request(method, url, data=data, headers=headers)
+        response = self.session.request(method, url, data=data, headers=headers, auth=self.auth)
+        if response.status_code == 401:
+            tokens.delete(self.token_cache_key)
         if response.status_code > 201:
             logger.error(f'Tbc Bank Is Not Available | {url} {response.text}')
         if response.content:
@@ -170,6 +178,8 @@ class TbcInstallmentSDK(AbstractBankSDK):
 
 class TbcBNPLInstallmentSDK(AbstractBankSDK):
     _NAME = 'TBC_BNPL_LOAN'
+    bank_type = BankTypeChoices.TBC
+    settings_name = 'TBC_SETTINGS'
     unique_by_key = 'status'
 
     __BASE_URL = 'https://api.tbcbank.ge/'
@@ -179,29 +189,34 @@ class TbcBNPLInstallmentSDK(AbstractBankSDK):
     __GENERATE_TOKEN = f'{__BASE_URL}{__API_VERSION}/tpay/access-token'
     __STATUS_LOAN = f'{__BASE_URL}{__API_VERSION}/tpay/payments/%s'
 
-    client_id = TBC['bnpl_client_id']
-    client_secret = TBC['bnpl_client_secret']
-
     image_path = 'admin/img/bank/tbc.png'
     _PAY_URL = 'https://ecom.tbcpayments.ge/Pay/choose/=%s?lang=en'
 
     def __init__(self, transaction: 'PaymentTransaction' = None, **kwargs):
         super().__init__(transaction, **kwargs)
+        self.client_id = self.config['bnpl_client_id']
+        self.client_secret = self.config['bnpl_client_secret']
 
     def _generate_jwt_token(self):
-        data = {'client_id': self.client_id, 'client_secret': self.client_secret}
-        response = self._request(url=self.__GENERATE_TOKEN, data=data, is_urlencoded=True)
-        return response['access_token']
+        token_cache_key = f'TBC_BNPL:{self.client_id}'
+        access_token = tokens.get(token_cache_key)
+        if access_token is None:
+            data = {'client_id': self.client_id, 'client_secret': self.client_secret}
+            with token_refresh(self.session_name):
+                response = self._request(url=self.__GENERATE_TOKEN, data=data, is_urlencoded=True)
+            access_token = response['access_token']
+            tokens.set(token_cache_key, access_token, response.get('expires_in', 0))
+        return access_token
 
     def _request(self, url, method='POST', data=None, is_urlencoded=False):
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded' if is_urlencoded else 'application/json',
-            "apikey": TBC['bnpl_api_key'],
+            "apikey": self.config['bnpl_api_key'],
             "accept": "text/plain",
         }
         if url != self.__GENERATE_TOKEN:
             headers['Authorization'] = f'Bearer {self._generate_jwt_token()}'
-        response = requests.request(method, url, data=data, headers=headers)
+        response = self.http_session.request(method, url, data=data, headers=headers)
         if response.status_code > 201:
             raise ValidationError(f'TBC Bank Is Not Available | {url} {response.text}')
         return response.json()
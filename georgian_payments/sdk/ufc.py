@@ -1,21 +1,55 @@
 import random
 import string
-from typing import Dict, Tuple
+from functools import wraps
+from typing import Dict, Tuple, Any, Optional
 
+import requests
 from django.conf import settings
 from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 from django.utils.timezone import localtime
 from geopayment import TBCProvider
+from geopayment.providers.utils import tbc_params, perform_http_response
 from loguru import logger
 
-from georgian_payments.choices import BankTypeChoices, CardTypeChoices
+from georgian_payments.bin_ranges import card_fields
+from georgian_payments.choices import BankTypeChoices
+from georgian_payments.ratelimit import RateLimited
 from georgian_payments.sdk.base import AbstractBankSDK
+from georgian_payments.sdk.http import get_session
+
+
+def ufc_request(timeout=(3, 10)):
+    """
+    Same contract as geopayment's `_request`, but posts through the pooled UFC session,
+    so the client certificate is loaded once and TLS connections are kept alive.
+    """
+
+    def wrapper(f):
+        @wraps(f)
+        def wrapped(self, **kwargs):
+            payload = kwargs.pop('payload')
+            try:
+                response = self.http_session.post(
+                    self.service_url, timeout=kwargs.get('timeout', timeout), verify=False, **payload
+                )
+                kwargs['HTTP_STATUS_CODE'] = response.status_code
+                result = perform_http_response(response)
+            except (requests.exceptions.RequestException, RateLimited) as e:
+                result = {'ERROR': str(e)}
+                kwargs['HTTP_STATUS_CODE'] = 'N/A'
+            return f(self, result=result, **kwargs)
+
+        return wrapped
+
+    return wrapper
 
 
 class UfcSdk(AbstractBankSDK, TBCProvider):
     _NAME = 'UFC_CARD'
+    bank_type = BankTypeChoices.UFC
+    settings_name = 'UFC_SETTINGS'
     unique_by_key = 'RESULT'
     pan_key = 'CARD_NUMBER'
     _PAY_URL = 'https://ecommerce.ufc.ge/ecomm2/ClientHandler?trans_id=%s'
@@ -35,12 +69,46 @@ class UfcSdk(AbstractBankSDK, TBCProvider):
 
     @property
     def cert(self):
-        # @TODO UFC Certificate
         return (
-            f'{settings.BASE_DIR}/order/banks/ufc_cert_in_pem/ufc_cert.pem',
-            f'{settings.BASE_DIR}/order/banks/ufc_cert_in_pem/ufc_cert-key.pem'
+            self.config.get('cert_file') or f'{settings.BASE_DIR}/order/banks/ufc_cert_in_pem/ufc_cert.pem',
+            self.config.get('key_file') or f'{settings.BASE_DIR}/order/banks/ufc_cert_in_pem/ufc_cert-key.pem'
         )
 
+    @property
+    def http_session(self) -> requests.Session:
+        return get_session(self.session_name, cert=self.cert, verify=False)
+
+    @tbc_params('amount', 'currency', 'client_ip_addr', 'description', command='v', language='ka', msg_type='SMS')
+    @ufc_request()
+    def get_trans_id(self, **kwargs: Optional[Any]) -> Dict[str, str]:
+        return kwargs['result']
+
+    @tbc_params('trans_id', 'client_ip_addr', command='c')
+    @ufc_request()
+    def check_trans_status(self, **kwargs: Optional[Any]) -> Dict[str, str]:
+        return kwargs['result']
+
+    @tbc_params('trans_id', 'amount', command='r')
+    @ufc_request()
+    def reversal_trans(self, **kwargs: Optional[Any]) -> Dict[str, str]:
+        return kwargs['result']
+
+    @tbc_params('trans_id', 'amount', command='k')
+    @ufc_request()
+    def refund_trans(self, **kwargs: Optional[Any]) -> Dict[str, str]:
+        return kwargs['result']
+
+    @tbc_params('amount', 'currency', 'client_ip_addr', 'description', 'biller_client_id', 'expiry',
+                'perspayee_expiry', 'perspayee_gen', command='z', language='ka', msg_type='SMS')
+    @ufc_request()
+    def card_register_with_deduction(self, **kwargs: Optional[Any]) -> Dict[str, str]:
+        return kwargs['result']
+
+    @tbc_params('amount', 'currency', 'client_ip_addr', 'description', 'biller_client_id', command='e', language='ka')
+    @ufc_request()
+    def recurring_payment(self, **kwargs: Optional[Any]) -> Dict[str, str]:
+        return kwargs['result']
+
     @property
     def status_mapper(self) -> dict:
         return {
@@ -113,7 +181,7 @@ class UfcSdk(AbstractBankSDK, TBCProvider):
                 number=data['CARD_NUMBER'],
                 rec_id=data['RECC_PMNT_ID'][:-3],
                 expiry_date=data['RECC_PMNT_EXPIRY'],
-                card_type=CardTypeChoices.get_card_type(data['CARD_NUMBER']),
+                **card_fields(data['CARD_NUMBER']),
                 bank_type=BankTypeChoices.UFC,
                 is_primary=not (user.cards.filter(is_primary=True).exists())
             )
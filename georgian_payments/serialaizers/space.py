@@ -2,9 +2,7 @@ from django.conf import settings
 from rest_framework.exceptions import ValidationError
 from rest_framework.serializers import Serializer, CharField
 
-from georgian_payments.bank_settings import SPACE_SETTINGS
-
-SPACE = SPACE_SETTINGS
+from georgian_payments.schemas import validate_space_secret
 
 
 class SpaceCallbackSerializer(Serializer):
@@ -16,6 +14,9 @@ class SpaceCallbackSerializer(Serializer):
 
     @staticmethod
     def validate_Secret(secret: str):
-        if secret != SPACE['secret_key']:
-            raise ValidationError("Secret Key is not Valid.")
+        # The view checks it against the transaction's own merchant
+        try:
+            validate_space_secret(secret)
+        except ValueError as e:
+            raise ValidationError(str(e))
         return secret
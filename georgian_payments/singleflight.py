@@ -0,0 +1,129 @@
+"""
+Coalesces concurrent calls for the same key into one: the callback, the poller and a refreshing success page
+asking the bank for the same transaction's status share a single bank call. Configured by `SINGLE_FLIGHT_SETTINGS`.
+
+The answer is reused for `ttl` seconds, which also absorbs bursts of sequential checks. With the 'cache' backend
+the call in flight is claimed with `cache.add`, so callers in other processes wait for its answer too. Bank callbacks
+ask `fresh`: they join a call in flight but never take a finished answer, which may predate what the bank pushed.
+"""
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from georgian_payments.bank_settings import SINGLE_FLIGHT_SETTINGS
+
+SINGLE_FLIGHT = SINGLE_FLIGHT_SETTINGS
+
+MAX_LOCAL_RESULTS = 1000
+_MISSING = object()
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    PREFIX = 'georgian_payments:singleflight'
+
+    def __init__(self, config: dict = None):
+        self.config = SINGLE_FLIGHT if config is None else config
+        self._calls: Dict[str, _Call] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._cache = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.get('enabled', False)
+
+    @property
+    def shared_across_processes(self) -> bool:
+        return self.config.get('backend', 'local') == 'cache'
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from django.core.cache import caches
+
+            self._cache = caches[self.config.get('cache_alias', 'default')]
+        return self._cache
+
+    def do(self, key: str, fn: Callable[[], Any], fresh: bool = False) -> Tuple[Any, bool]:
+        """
+        Result of `fn()` and whether it was shared, i.e. answered by a concurrent or recent (`ttl`) call, only by
+        a concurrent one if `fresh`. Concurrent callers get the exception of a failed call, callers in other
+        processes make their own.
+        """
+        if not self.enabled:
+            return fn(), False
+        with self._lock:
+            expires, result = self._results.get(key, (0, None))
+            if expires > time.monotonic() and not fresh:
+                return result, True
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(self.config.get('wait', 30)):
+                return fn(), False  # the call in flight hangs, do not queue up behind it
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result, shared = self._lead(key, fn, fresh)
+            return call.result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                ttl = self.config.get('ttl', 2)
+                if call.error is None and ttl and not self.shared_across_processes:
+                    self._remember(key, call.result, ttl)
+                del self._calls[key]
+            call.done.set()
+
+    def _remember(self, key: str, result, ttl: float):
+        now = time.monotonic()
+        if len(self._results) >= MAX_LOCAL_RESULTS:
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+        self._results[key] = (now + ttl, result)
+
+    def _lead(self, key: str, fn: Callable[[], Any], fresh: bool = False) -> Tuple[Any, bool]:
+        if not self.shared_across_processes:
+            return fn(), False
+        cache, wait = self.cache, self.config.get('wait', 30)
+        result_key, lock_key = f'{self.PREFIX}:{key}:result', f'{self.PREFIX}:{key}:lock'
+        # answers are stored with the time they were, a fresh caller only takes one that arrived while it waited
+        since = time.time() if fresh else 0
+        _, result = cache.get(result_key, (0, _MISSING))
+        if result is not _MISSING and not fresh:
+            return result, True
+        if cache.add(lock_key, 1, timeout=math.ceil(wait)):
+            try:
+                result = fn()
+                ttl = self.config.get('ttl', 2)
+                if ttl:
+                    cache.set(result_key, (time.time(), result), timeout=math.ceil(ttl))
+                return result, False
+            finally:
+                cache.delete(lock_key)
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(self.config.get('poll_interval', 0.05))
+            stored_at, result = cache.get(result_key, (0, _MISSING))
+            if result is not _MISSING and stored_at >= since:
+                return result, True
+            if not cache.get(lock_key):
+                break  # the other process failed, or has no ttl to hand its answer over
+        return fn(), False
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,138 @@
+import time
+from collections import namedtuple
+from datetime import timedelta, datetime
+from typing import Dict, Tuple, Optional, List
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from loguru import logger
+
+from georgian_payments.bank_settings import OUTBOX_SETTINGS
+from georgian_payments.choices import PaymentTypeChoices, BankTypeChoices, PTSChoices, PaymentEventTypeChoices
+from georgian_payments.leases import iter_claimed
+from georgian_payments.models import TimeoutPolicy, PaymentEvent
+from georgian_payments.notify import publish
+from georgian_payments.ratelimit import operation, LOW
+
+Policy = namedtuple('Policy', ['payment_type', 'bank_type', 'timeout', 'requires_confirmation'])
+
+# (payment_type, bank_type): (minutes, requires_confirmation)
+DEFAULT_TIMEOUT_POLICIES = {
+    (PaymentTypeChoices.CARD, BankTypeChoices.BOG): (15, False),
+    (PaymentTypeChoices.LOAN, BankTypeChoices.BOG): (50, False),
+    (PaymentTypeChoices.APPLE_PAY, BankTypeChoices.GC): (20, False),
+    (PaymentTypeChoices.CARD, BankTypeChoices.UFC): (40, True),
+    (PaymentTypeChoices.LOAN, BankTypeChoices.CREDO): (60, True),
+}
+POLICY_CACHE_SECONDS = 60
+
+_policies: Dict[Tuple[int, int], Policy] = {}
+_loaded_at = 0.0
+
+
+def get_policies() -> Dict[Tuple[int, int], Policy]:
+    """Defaults merged with the TimeoutPolicy table, reloaded at most once a minute per process."""
+    global _policies, _loaded_at
+    if time.monotonic() - _loaded_at < POLICY_CACHE_SECONDS:
+        return _policies
+    policies = {
+        key: Policy(*key, timedelta(minutes=minutes), confirm)
+        for key, (minutes, confirm) in DEFAULT_TIMEOUT_POLICIES.items()
+    }
+    for row in TimeoutPolicy.objects.all():
+        key = (row.payment_type, row.bank_type)
+        if not row.is_active:
+            policies.pop(key, None)
+            continue
+        policies[key] = Policy(*key, timedelta(minutes=row.timeout_minutes), row.requires_confirmation)
+    _policies, _loaded_at = policies, time.monotonic()
+    return _policies
+
+
+def get_policy(payment_type: int, bank_type: int) -> Optional[Policy]:
+    return get_policies().get((payment_type, bank_type))
+
+
+def is_timed_out(transaction, now: datetime = None) -> bool:
+    policy = get_policy(transaction.payment_method.payment_type, transaction.payment_method.bank_type)
+    return policy is not None and transaction.created + policy.timeout < (now or timezone.now())
+
+
+def stale_pending(queryset, policy: Policy, now: datetime = None):
+    now = now or timezone.now()
+    return queryset.filter(
+        Q(lease_expires__isnull=True) | Q(lease_expires__lt=now),
+        status=PTSChoices.PENDING,
+        payment_method__payment_type=policy.payment_type,
+        payment_method__bank_type=policy.bank_type,
+        created__lt=now - policy.timeout,
+    )
+
+
+def expire(model, pks: List) -> int:
+    """Marks still PENDING rows TIMEOUT with one UPDATE and records their events in the same DB transaction."""
+    now = timezone.now()
+    with db_transaction.atomic():
+        transactions = list(
+            model.objects.filter(pk__in=pks, status=PTSChoices.PENDING)
+            .select_for_update(skip_locked=True, of=('self',))
+            .only('pk', 'trx', 'amount', 'refunded', 'transaction_type', 'payment_method_id', 'status', 'user_id')
+        )
+        if not transactions:
+            return 0
+        model.objects.filter(pk__in=[t.pk for t in transactions]).update(status=PTSChoices.TIMEOUT, updated=now)
+        for transaction in transactions:
+            publish(transaction, PTSChoices.TIMEOUT)
+        if OUTBOX_SETTINGS['enabled']:
+            for transaction in transactions:
+                transaction.status = PTSChoices.TIMEOUT
+            PaymentEvent.objects.bulk_create([
+                PaymentEvent.build(t, PaymentEventTypeChoices.STATUS_CHANGED, PTSChoices.PENDING) for t in transactions
+            ])
+    return len(transactions)
+
+
+def expire_all(stale, chunk_size: int = 500) -> int:
+    total = 0
+    while True:
+        pks = list(stale.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        expired = expire(stale.model, pks) if pks else 0
+        if not expired:
+            return total  # done, or the rest is locked by callbacks or pollers right now
+        total += expired
+
+
+def sweep(queryset, policy: Policy, chunk_size: int = 500, confirm: bool = True) -> Dict[str, int]:
+    """
+    Expires stale PENDING transactions of one payment method. Banks whose policy requires confirmation
+    get exactly one status call per transaction; a final answer from the bank is applied instead.
+    """
+    stats = {'expired': 0, 'confirmed': 0, 'failed': 0}
+    stale = stale_pending(queryset, policy)
+    if not (confirm and policy.requires_confirmation):
+        stats['expired'] = expire_all(stale, chunk_size)
+        return stats
+
+    to_expire = []
+    fetch = queryset.model.objects.for_status_sync()
+    for transaction in iter_claimed(stale.exclude(trx=''), batch_size=chunk_size, fetch=fetch):
+        try:
+            with operation('check_status', LOW):
+                data, is_ok = transaction.engine.check_transaction_status()
+        except Exception as e:
+            logger.error(f'Timeout Sweeper | Transaction ID: {transaction.pk} | {e}')
+            stats['failed'] += 1
+            continue
+        if is_ok in (1, -1):
+            transaction.sync_status(data, is_ok)
+            stats['confirmed'] += 1
+        else:
+            to_expire.append(transaction.pk)
+        if len(to_expire) >= chunk_size:
+            stats['expired'] += expire(queryset.model, to_expire)
+            to_expire = []
+    if to_expire:
+        stats['expired'] += expire(queryset.model, to_expire)
+    stats['expired'] += expire_all(stale.filter(trx=''), chunk_size)  # never reached the bank, nothing to confirm
+    return stats
@@ -0,0 +1,190 @@
+"""
+OpenTelemetry spans of checkout (`PaymentTransaction.run()`), bank HTTP calls, token refreshes, bank callbacks and
+`sync_status()`. Enable `TRACING_SETTINGS` with `pip install georgian-django-payments[tracing]` and an OpenTelemetry
+SDK configured by the project, every span is a no-op otherwise.
+
+Checkout stores its trace context in the transaction's `additional_data`. Callbacks and status syncs of the
+transaction run in traces of their own and link back to the checkout span through it:
+
+    BOG callback > PaymentTransaction.sync_status > GET BOG  --link-->  PaymentTransaction.run > POST BOG
+"""
+from functools import wraps
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from georgian_payments import __version__
+from georgian_payments.bank_settings import TRACING_SETTINGS
+from georgian_payments.choices import BankTypeChoices, PTSChoices
+
+if TYPE_CHECKING:
+    from georgian_payments.models import PaymentTransaction
+
+TRACING = TRACING_SETTINGS
+CONTEXT_KEY = 'trace_context'  # of `additional_data`
+
+_tracer = None
+
+
+class NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def get_tracer():
+    """The OpenTelemetry tracer, None while tracing is disabled."""
+    global _tracer
+    if _tracer is None:
+        if not TRACING.get('enabled', False):
+            _tracer = False
+        else:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise ImportError('Tracing requires opentelemetry-api: pip install georgian-django-payments[tracing]')
+            _tracer = trace.get_tracer(TRACING.get('tracer_name', 'georgian_payments'), str(__version__))
+    return _tracer or None
+
+
+def span(name: str, kind: str = 'internal', links=(), **attributes):
+    """
+    Context manager of a span made current while it is open. Attribute names without a namespace get `payment.`,
+    None values are left out.
+    """
+    tracer = get_tracer()
+    if tracer is None:
+        return NOOP_SPAN
+    from opentelemetry.trace import SpanKind
+
+    attributes = {key if '.' in key else f'payment.{key}': value
+                  for key, value in attributes.items() if value is not None}
+    return tracer.start_as_current_span(name, kind=SpanKind[kind.upper()], links=links, attributes=attributes)
+
+
+def bank_name(transaction: 'PaymentTransaction') -> str:
+    return BankTypeChoices(transaction.payment_method.bank_type).name
+
+
+def outcome(transaction: 'PaymentTransaction') -> str:
+    return PTSChoices(transaction.status).name
+
+
+def record_checkout(transaction: 'PaymentTransaction') -> bool:
+    """Stores the current trace context in `additional_data`, True if it changed and needs to be saved."""
+    if get_tracer() is None or 'additional_data' in transaction.get_deferred_fields():
+        return False
+    from opentelemetry.propagate import inject
+
+    context = {}
+    inject(context)
+    if not context or transaction.additional_data.get(CONTEXT_KEY) == context:
+        return False
+    transaction.additional_data[CONTEXT_KEY] = context
+    return True
+
+
+def checkout_context(transaction: 'PaymentTransaction'):
+    """Span context of the transaction's checkout, if it was traced. `additional_data` is not loaded for it."""
+    if 'additional_data' in transaction.get_deferred_fields():
+        return None
+    context = (transaction.additional_data or {}).get(CONTEXT_KEY)
+    if not context:
+        return None
+    from opentelemetry import trace
+    from opentelemetry.propagate import extract
+
+    span_context = trace.get_current_span(extract(context)).get_span_context()
+    return span_context if span_context.is_valid else None
+
+
+def link_checkout(transaction: 'PaymentTransaction'):
+    """Names the transaction on the current span (a callback's) and links the span to the checkout's."""
+    if get_tracer() is None:
+        return
+    from opentelemetry import trace
+
+    current = trace.get_current_span()
+    current.set_attributes({'payment.transaction_id': str(transaction.pk), 'payment.trx': transaction.trx})
+    span_context = checkout_context(transaction)
+    if span_context is None:
+        return
+    if hasattr(current, 'add_link'):  # opentelemetry-api 1.23+
+        current.add_link(span_context)
+    else:
+        current.set_attributes({'payment.checkout_trace_id': format(span_context.trace_id, '032x'),
+                                'payment.checkout_span_id': format(span_context.span_id, '016x')})
+
+
+def traced(name: str, operation: str, kind: str = 'internal'):
+    """
+    Traces a `PaymentTransaction` method; the outcome is the transaction's status after it. Spans of any
+    operation but the checkout link to the checkout's.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(transaction: 'PaymentTransaction', *args, **kwargs):
+            if get_tracer() is None:
+                return func(transaction, *args, **kwargs)
+            span_context = checkout_context(transaction) if operation != 'checkout' else None
+            links = [_link(span_context)] if span_context is not None else []
+            with span(name, kind, links, bank=bank_name(transaction), merchant=transaction.merchant or None,
+                      operation=operation, trx=transaction.trx, transaction_id=str(transaction.pk)) as current:
+                result = func(transaction, *args, **kwargs)
+                current.set_attributes({'payment.trx': transaction.trx, 'payment.outcome': outcome(transaction)})
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def traced_callback(bank: str):
+    """Traces a bank callback view; it calls `link_checkout()` once it found the transaction."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if get_tracer() is None:
+                return func(*args, **kwargs)
+            operation = 'callback' if func.__name__ == 'callback' else f'callback.{func.__name__}'
+            with span(f'{bank} callback', 'server', bank=bank, operation=operation) as current:
+                response = func(*args, **kwargs)
+                current.set_attributes({'http.response.status_code': response.status_code,
+                                        'payment.outcome': 'ok' if response.status_code < 400 else 'rejected'})
+                return response
+
+        return wrapper
+
+    return decorator
+
+
+def bank_call(session_name: str, operation: str, method: str, url: str):
+    """Span of a call through the bank's session, named like `AbstractBankSDK.session_name` (bank:merchant)."""
+    if get_tracer() is None:
+        return NOOP_SPAN
+    bank, _, merchant = session_name.partition(':')
+    return span(f'{method} {bank}', 'client', bank=bank, merchant=merchant or None, operation=operation,
+                **{'http.request.method': method, 'server.address': urlsplit(url).hostname})
+
+
+def token_refresh(session_name: str):
+    if get_tracer() is None:
+        return NOOP_SPAN
+    bank, _, merchant = session_name.partition(':')
+    return span(f'{bank} token refresh', bank=bank, merchant=merchant or None, operation='token_refresh')
+
+
+def _link(span_context):
+    from opentelemetry.trace import Link
+
+    return Link(span_context)
@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from georgian_payments.views import BogCallBackViewSet, GeorgianCardCallBackViewSet, SpaceCallBackViewSet, TBCCallBackViewSet
+from georgian_payments.views import BogCallBackViewSet, GeorgianCardCallBackViewSet, SpaceCallBackViewSet, TBCCallBackViewSet, \
+    LoopbackCallBackViewSet, TransactionStatusViewSet
 
 
 callback = routers.SimpleRouter()
@@ -9,8 +10,13 @@ callback.register(r'bog', BogCallBackViewSet, basename='bog_callback')
 callback.register(r'gc', GeorgianCardCallBackViewSet, basename='gc_callback')
 callback.register(r'space', SpaceCallBackViewSet, basename='space_callback')
 callback.register(r'tbc', TBCCallBackViewSet, basename='tbc_callback')
+callback.register(r'loopback', LoopbackCallBackViewSet, basename='loopback_callback')
+
+transaction = routers.SimpleRouter()
+transaction.register(r'status', TransactionStatusViewSet, basename='transaction_status')
 
 urlpatterns = [
     path('callback/', include(callback.urls)),
+    path('', include(transaction.urls)),
 
 ]
@@ -2,3 +2,5 @@ from .space import *
 from .tbc import *
 from .bog import *
 from .georgian_card import *
+from .loopback import *
+from .status import *
@@ -1,7 +1,5 @@
-from datetime import timedelta
-
+from django.db import transaction as db_transaction
 from django.http import QueryDict
-from django.utils import timezone
 from loguru import logger
 from rest_framework import status
 from rest_framework.decorators import action
@@ -9,9 +7,12 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
-from georgian_payments.choices import CardTypeChoices, BankTypeChoices, PTTChoices
-from georgian_payments.models import PaymentTransaction
-from georgian_payments.utils import remove_lists_from_dict_values
+from georgian_payments.bin_ranges import card_fields
+from georgian_payments.choices import BankTypeChoices, PTTChoices, PaymentEventTypeChoices
+from georgian_payments.models import PaymentTransaction, PaymentEvent
+from georgian_payments.schemas import BogCallbackSchema
+from georgian_payments.timeouts import is_timed_out
+from georgian_payments.tracing import traced_callback, link_checkout
 
 
 class BogCallBackViewSet(ViewSet):
@@ -19,32 +20,35 @@ class BogCallBackViewSet(ViewSet):
     authentication_classes = []
 
     @action(detail=False, methods=["POST"])
+    @traced_callback('BOG')
     def change_transaction_status(self, request: Request, *_, **__):
         logger.info(f"Request Data: {request.data}")
-        data: dict = remove_lists_from_dict_values(request.data)
-        trx = data.get('order_id', '')
-        transaction: PaymentTransaction = PaymentTransaction.objects.filter(trx=trx).first()
+        values, data = BogCallbackSchema.parse(request.data)
+        transaction: PaymentTransaction = PaymentTransaction.objects.for_status_sync().filter(
+            trx=values.order_id
+        ).first()
         if transaction is None:
-            logger.error(f'BOG Transaction | Transaction Not Found id: |{data.get("shop_order_id")}| - trx: |{trx}|')
+            logger.error(
+                f'BOG Transaction | Transaction Not Found id: |{values.shop_order_id}| - trx: |{values.order_id}|'
+            )
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        is_success = data.get('status')
-        is_ok = 1 if is_success == 'success' else -1 if is_success == 'error' else 0
-        if is_ok == -1:
-            time_out_minutes = 50 if data.get('payment_method') == 'BOG_LOAN' else 15
-            if transaction.created + timedelta(minutes=time_out_minutes) < timezone.now():
-                is_ok = -2
-        if data.get('payment_method') == 'BOG_CARD':
-            card_type = data.get('card_type')
-            data['pan'] = '5***' if card_type == 'Mastercard' else '4***' if card_type == 'Visa' else '3***'
-        transaction.card_hash = data.get('pan', '****') or "****"
+        link_checkout(transaction)
+        is_ok = 1 if values.status == 'success' else -1 if values.status == 'error' else 0
+        if is_ok == -1 and is_timed_out(transaction):
+            is_ok = -2
+        pan = values.pan
+        if values.payment_method == 'BOG_CARD':
+            pan = data['pan'] = '5***' if values.card_type == 'Mastercard' else '4***' if values.card_type == 'Visa' \
+                else '3***'
+        transaction.card_hash = pan or "****"
         transaction.sync_status(data, is_ok)
         if is_ok == 1:
-            if data.get('payment_method') == 'GC_CARD' and transaction.check_save_card(data.get('pan')):
+            if values.payment_method == 'GC_CARD' and transaction.check_save_card(pan):
                 try:
                     transaction.user.cards.create(
-                        number=data.get('pan'),
-                        rec_id=data.get('order_id'),
-                        card_type=CardTypeChoices.get_card_type(data['pan']),
+                        number=pan,
+                        rec_id=values.order_id,
+                        **card_fields(pan),
                         bank_type=BankTypeChoices.BOG,
                         is_primary=not (transaction.user.cards.filter(is_primary=True).exists())
                     )
@@ -53,10 +57,11 @@ class BogCallBackViewSet(ViewSet):
         return Response()
 
     @action(detail=False, methods=["POST"])
+    @traced_callback('BOG')
     def refund_status(self, request: Request, *_, **__):
         logger.info(f"BOG REFUND | {request.data}")
         data: QueryDict = request.data
-        transaction: PaymentTransaction = PaymentTransaction.objects.filter(
+        transaction: PaymentTransaction = PaymentTransaction.objects.select_related('payment_method').filter(
             trx=data.get('order_id', ''),
             pay_id=data.get('payment_hash', ''),
             order_id=data.get('shop_order_id', ''),
@@ -65,8 +70,16 @@ class BogCallBackViewSet(ViewSet):
         if transaction is None:
             logger.error(f'BOG | REFUNDED | Transaction Not Found {data}')
             return Response()
+        link_checkout(transaction)
         transaction.data_log.append(data)
-        transaction.save(update_fields=['data_log'])
+        refund = {'refund_status': data.get('status')}
+        try:
+            refund['refund_amount'] = float(data['amount'])
+        except (KeyError, TypeError, ValueError):
+            pass  # left out when the bank does not name it
+        with db_transaction.atomic():
+            transaction.save(update_fields=['data_log'])
+            PaymentEvent.record(transaction, PaymentEventTypeChoices.REFUNDED, **refund)
         if transaction.payment_method.is_installment:
             # @TODO REFUND STATUS
             # transaction.order.refunds.update(payment_status=RefundPaymentStatusChoices.RETURNED)
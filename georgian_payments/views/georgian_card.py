@@ -1,10 +1,8 @@
-from datetime import timedelta
 from io import StringIO
 
 from django.conf import settings
 from django.http import HttpResponse
 from django.template.loader import render_to_string
-from django.utils import timezone
 from loguru import logger
 from rest_framework.authentication import BasicAuthentication
 from rest_framework.decorators import action
@@ -14,12 +12,15 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
-from georgian_payments.bank_settings import GEORGIAN_CARD_SETTINGS
-from georgian_payments.choices import CardTypeChoices, BankTypeChoices, PTSChoices
+from georgian_payments.bank_settings import get_bank_settings
+from georgian_payments.bin_ranges import card_fields
+from georgian_payments.choices import BankTypeChoices, PTSChoices
 from georgian_payments.models import PaymentTransaction
+from georgian_payments.profiling import span
+from georgian_payments.schemas import GCCheckSchema, GCRegisterSchema, SchemaError
 from georgian_payments.sdk.georgian_card import GCBank
-
-GEORGIAN_CARD = GEORGIAN_CARD_SETTINGS
+from georgian_payments.timeouts import is_timed_out
+from georgian_payments.tracing import traced_callback, link_checkout
 
 
 class GeorgianCardCallBackViewSet(ViewSet):
@@ -39,15 +40,12 @@ class GeorgianCardCallBackViewSet(ViewSet):
         return HttpResponse(r.getvalue(), content_type="application/xml")
 
     @staticmethod
-    def save_user_card(transaction, data):
-        fully_authenticated_status = data.get('p.isFullyAuthenticated', 'N')
-        card_register_status = data.get('card.registered', 'N')
-        card_recurrent = data.get('card.recurrent', 'N')
-        if fully_authenticated_status == 'Y' and card_register_status == 'Y' and card_recurrent == 'Y':
+    def save_user_card(transaction, values):
+        if values.fully_authenticated == 'Y' and values.card_registered == 'Y' and values.card_recurrent == 'Y':
             transaction.user.cards.create(
-                number=data.get('p.maskedPan'),
-                rec_id=data.get('card.id'),
-                card_type=CardTypeChoices.get_card_type(data.get('p.maskedPan')),
+                number=values.masked_pan,
+                rec_id=values.card_id,
+                **card_fields(values.masked_pan),
                 bank_type=BankTypeChoices.GC,
                 is_primary=not (transaction.user.cards.filter(is_primary=True).exists())
             )
@@ -57,23 +55,30 @@ class GeorgianCardCallBackViewSet(ViewSet):
         authentication_classes=[BasicAuthentication],
         permission_classes=[IsAuthenticated]
     )
+    @traced_callback('GC')
     def check(self, request: Request, *_, **__):
         logger.info(request.query_params)
-        transaction: PaymentTransaction = PaymentTransaction.objects.filter(
-            pk=request.query_params.get('o.transaction_id', 0)
+        try:
+            values, data = GCCheckSchema.parse(request.query_params)
+        except SchemaError:
+            return self.fail_check('Transaction Not Found')
+        transaction: PaymentTransaction = PaymentTransaction.objects.for_status_sync().filter(
+            pk=values.transaction_id
         ).first()
         if transaction is None:
             return self.fail_check('Transaction Not Found')
-        transaction.data_log.append({
-            'Check Data': request.query_params.dict()
-        })
-        transaction.trx = request.query_params.get('trx_id', '')
-        transaction.save(update_fields=['data_log', 'trx', 'updated'])
+        link_checkout(transaction)
+        transaction.trx = values.trx_id
+        with transaction.unit_of_work():
+            transaction.save(update_fields=['trx'])
+            transaction.append_data_log({
+                'Check Data': data
+            })
         if not transaction.user.is_active:
             return self.fail_check('User Is Not Active')
         if transaction.status != PTSChoices.PENDING:
             return self.fail_check('Bad Transaction Status In Veli')
-        if GEORGIAN_CARD['merchant_id'] != request.query_params.get('merch_id'):
+        if get_bank_settings('GEORGIAN_CARD_SETTINGS', transaction.merchant)['merchant_id'] != values.merch_id:
             return self.fail_check('Merchant Not Found')
         return self.accept_check(transaction)
 
@@ -82,36 +87,38 @@ class GeorgianCardCallBackViewSet(ViewSet):
         authentication_classes=[BasicAuthentication],
         permission_classes=[IsAuthenticated]
     )
+    @traced_callback('GC')
     def register(self, request: Request, *_, **__):
         logger.info(request.query_params)
-        pk = request.query_params.get('o.transaction_id', 0)
-        if not str(pk).isdigit():
+        try:
+            values, data = GCRegisterSchema.parse(request.query_params)
+        except SchemaError:
             raise NotFound()
-        transaction: PaymentTransaction = PaymentTransaction.objects.filter(
-            pk=request.query_params.get('o.transaction_id', 0),
-            trx=request.query_params.get('trx_id')
+        transaction: PaymentTransaction = PaymentTransaction.objects.for_status_sync().filter(
+            pk=values.transaction_id,
+            trx=values.trx_id
         ).first()
         if transaction is None:
             raise NotFound()
+        link_checkout(transaction)
 
-        data = request.query_params.dict()
-        is_ok = int(data.get('result_code', 2))
-        transaction.data_log.append({
-            'Register Data': data
-        })
+        is_ok = values.result_code
         if is_ok != 1:
-            is_ok = -1
-            if transaction.created + timedelta(minutes=20) < timezone.now():
-                is_ok = -2
-        transaction.card_hash = data.get('p.maskedPan', '****') or "****"
-        transaction.sync_status(data, is_ok, save_data=False)
+            is_ok = -2 if is_timed_out(transaction) else -1
+        with transaction.unit_of_work():  # one UPDATE of the log entry, status and card
+            transaction.append_data_log({
+                'Register Data': data
+            })
+            transaction.card_hash = values.masked_pan or "****"
+            transaction.sync_status(data, is_ok, save_data=False)
         if transaction.save_card:
-            self.save_user_card(transaction, data)
+            self.save_user_card(transaction, values)
         return self.register_success_response()
 
     @staticmethod
     def register_success_response():
-        content = render_to_string('payment/register_response.xml')
+        with span('render'):
+            content = render_to_string('payment/register_response.xml')
         r = StringIO()
         r.write(content)
         return HttpResponse(r.getvalue(), content_type="application/xml")
@@ -121,18 +128,20 @@ class GeorgianCardCallBackViewSet(ViewSet):
         authentication_classes=[],
         permission_classes=[]
     )
+    @traced_callback('GC')
     def apple_pay_accept(self, request: Request, *_, **__):
         data = request.data.get('apple_data')
         pk = request.data.get('trans_id', 0)
         t: PaymentTransaction = PaymentTransaction.objects.filter(pk=pk).first()
         if t is None:
             raise NotFound
+        link_checkout(t)
         t.additional_data['apple_data'] = data
-        t.save(update_fields=['additional_data'])
+        t.save_dirty(['additional_data'])  # kept even if the bank call fails
         g = GCBank(t)
         status_code, result = g.apple_pay_accept()
         t.data_log.append({
             "accept_result": result
         })
-        t.save(update_fields=['data_log'])
+        t.save_dirty(['data_log'])
         return Response(result, status=status_code)
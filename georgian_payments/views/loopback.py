@@ -0,0 +1,38 @@
+from loguru import logger
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from georgian_payments.models import PaymentTransaction
+from georgian_payments.schemas import LoopbackCallbackSchema, SchemaError
+from georgian_payments.sdk.loopback import LoopbackBankSDK
+from georgian_payments.tracing import traced_callback, link_checkout
+
+
+class LoopbackCallBackViewSet(GenericViewSet):
+    """Callbacks of the loopback sandbox bank, refused for transactions served by a real engine."""
+    permission_classes = []
+    authentication_classes = []
+
+    @action(detail=False, methods=["POST"])
+    @traced_callback('LOOPBACK')
+    def callback(self, request: Request, *_, **__):
+        try:
+            values, _ = LoopbackCallbackSchema.parse(request.data)
+        except SchemaError as e:
+            raise ValidationError(e.errors)
+        transaction: PaymentTransaction = PaymentTransaction.objects.for_status_sync().filter(
+            pk=values.transaction_id
+        ).first()
+        if transaction is None or not issubclass(transaction.payment_method.engine_class, LoopbackBankSDK):
+            raise NotFound('Transaction Not Found')
+        link_checkout(transaction)
+        if transaction.trx != values.trx:
+            # run() has not saved the trx yet, the scheduler retries like a bank would
+            return Response({'detail': 'Transaction Not Started'}, status=409)
+        data, is_ok = transaction.engine.result(transaction.trx)
+        logger.info(f'Loopback | Transaction ID: {transaction.pk} | {data["status"]}')
+        transaction.sync_status(data, is_ok)
+        return Response({'status': data['status']})
@@ -4,30 +4,40 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from georgian_payments.bank_settings import get_bank_settings
 from georgian_payments.models import PaymentTransaction
-from georgian_payments.serialaizers import SpaceCallbackSerializer
+from georgian_payments.schemas import SpaceCallbackSchema, SchemaError, secret_matches
+from georgian_payments.tracing import traced_callback, link_checkout
 
 
 class SpaceCallBackViewSet(GenericViewSet):
     permission_classes = []
 
-    @action(detail=False, methods=["POST"], serializer_class=SpaceCallbackSerializer)
+    @action(detail=False, methods=["POST"])
+    @traced_callback('SPACE')
     def callback(self, request: Request, *_, **__):
         logger.info(f'SPACE Request Data {request.data}')
-        serializer = self.get_serializer(data=request.data)
-        if not serializer.is_valid(raise_exception=False):
-            logger.info(f'Serializer NOT VALID {serializer.errors}')
-            return Response({'Status': '-1', 'Description': serializer.errors})
+        try:
+            values, _ = SpaceCallbackSchema.parse(request.data)
+        except SchemaError as e:
+            logger.info(f'Serializer NOT VALID {e.errors}')
+            return Response({'Status': '-1', 'Description': e.errors})
 
-        transaction = PaymentTransaction.objects.filter(trx=serializer.data['OrderId']).first()
+        transaction = PaymentTransaction.objects.for_status_sync().filter(trx=values.OrderId).first()
 
         if not transaction:
-            logger.info(f'Order Not Found {serializer.data["OrderId"]}')
+            logger.info(f'Order Not Found {values.OrderId}')
             return Response({'Status': '-1', 'Description': 'Order not found'})
 
-        status = serializer.data.get('Status')
-        is_ok = 1 if status == '2' else 0 if status == '1' else -1
+        if not secret_matches(values.Secret, get_bank_settings('SPACE_SETTINGS', transaction.merchant)['secret_key']):
+            logger.info(f'Secret Key Of Another Merchant {values.OrderId}')
+            return Response({'Status': '-1', 'Description': 'Order not found'})
+
+        link_checkout(transaction)
+        is_ok = 1 if values.Status == '2' else 0 if values.Status == '1' else -1
 
-        transaction.sync_status(serializer.data, is_ok)
+        data = values._asdict()
+        data.pop('Secret')  # kept out of data_log
+        transaction.sync_status(data, is_ok)
 
         return Response({'Status': '0', 'Description': 'Success'})
@@ -0,0 +1,100 @@
+import json
+import time
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from georgian_payments.bank_settings import STATUS_NOTIFY_SETTINGS
+from georgian_payments.choices import PTSChoices
+from georgian_payments.models import PaymentTransaction
+from georgian_payments.notify import cached_status, subscribe, is_terminal
+
+STATUS_NOTIFY = STATUS_NOTIFY_SETTINGS
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()  # errors raised before the stream starts
+
+
+def status_data(pk, status: int) -> dict:
+    return {'id': str(pk), 'status': status, 'status_display': PTSChoices(status).label,
+            'is_terminal': is_terminal(status)}
+
+
+class TransactionStatusViewSet(GenericViewSet):
+    """
+    Lets the frontend wait for a payment's outcome after the bank's redirect instead of polling it:
+    `status/<pk>/?wait=25` answers once the transaction is no longer PENDING or after `wait` seconds,
+    `status/<pk>/events/` streams its changes as server-sent events until a terminal status.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def current_status(self, pk) -> int:
+        queryset = PaymentTransaction.objects.filter(pk=pk)
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        status = queryset.values_list('status', flat=True).first()
+        if status is None:
+            raise NotFound('Transaction Not Found')
+        return status
+
+    def wait_seconds(self) -> float:
+        max_wait = STATUS_NOTIFY.get('max_wait', 25) if STATUS_NOTIFY.get('enabled', False) else 0
+        try:
+            wait = float(self.request.query_params.get('wait', max_wait))
+        except ValueError:
+            raise ValidationError({'wait': ['A valid number is required.']})
+        return min(max(wait, 0), max_wait)
+
+    def retrieve(self, request: Request, pk=None, *_, **__):
+        status = cached_status(pk, request.user.pk)
+        if status is None:
+            wait = self.wait_seconds()
+            with subscribe(pk) as subscription:  # before reading, so a change in between is not missed
+                status = self.current_status(pk)
+                if not is_terminal(status) and wait:
+                    published = subscription.wait(wait)
+                    status = status if published is None else published
+        return Response(status_data(pk, status))
+
+    @action(detail=True, methods=["GET"], renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def events(self, request: Request, pk=None, *_, **__):
+        status = cached_status(pk, request.user.pk)
+        if status is None:
+            self.current_status(pk)  # not found before the stream starts
+        response = StreamingHttpResponse(self.stream(pk, status), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx would hold the events back
+        return response
+
+    def stream(self, pk, status: int = None):
+        def event(value):
+            return f'event: status\ndata: {json.dumps(status_data(pk, value))}\n\n'
+
+        if status is not None:
+            yield event(status)
+            return
+        heartbeat, ends = STATUS_NOTIFY.get('heartbeat', 15), time.monotonic() + STATUS_NOTIFY.get('stream_for', 300)
+        with subscribe(pk) as subscription:
+            status = self.current_status(pk)
+            yield event(status)
+            while not is_terminal(status) and STATUS_NOTIFY.get('enabled', False):
+                remaining = ends - time.monotonic()
+                if remaining <= 0:
+                    return  # the client's EventSource reconnects
+                published = subscription.wait(min(heartbeat, remaining))
+                if published is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                status = published
+                yield event(status)
@@ -1,26 +1,30 @@
 from loguru import logger
 from rest_framework.decorators import action
-from rest_framework.fields import CharField
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework.serializers import Serializer
 from rest_framework.viewsets import GenericViewSet
 
 from georgian_payments.models import PaymentTransaction
-
-
-class TbcSerializer(Serializer):
-    PaymentId = CharField(required=True)
+from georgian_payments.schemas import TbcCallbackSchema, SchemaError
+from georgian_payments.tracing import traced_callback, link_checkout
 
 
 class TBCCallBackViewSet(GenericViewSet):
     permission_classes = []
 
-    @action(detail=False, methods=["POST"], serializer_class=TbcSerializer)
+    @action(detail=False, methods=["POST"])
+    @traced_callback('TBC')
     def callback(self, request: Request, *_, **__):
         logger.info(f'TBC Ecommerce Request Data {request.data}')
-        payment_id = request.data.get('PaymentId')
-        transaction: PaymentTransaction = PaymentTransaction.objects.filter(trx=payment_id).first()
+        try:
+            values, _ = TbcCallbackSchema.parse(request.data)
+        except SchemaError as e:
+            logger.info(f'TBC Ecommerce | {e.errors}')
+            return Response()
+        transaction: PaymentTransaction = PaymentTransaction.objects.for_status_sync().filter(
+            trx=values.PaymentId
+        ).first()
         if transaction:
-            transaction.sync_status()
+            link_checkout(transaction)
+            transaction.sync_status(fresh=True)
         return Response()
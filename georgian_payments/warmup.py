@@ -0,0 +1,114 @@
+import os
+import threading
+from functools import partial
+from typing import Callable, List, Tuple
+
+import requests
+from loguru import logger
+
+from georgian_payments.bank_settings import WARM_UP, get_bank_settings, get_merchants
+from georgian_payments.choices import BankTypeChoices
+from georgian_payments.sdk.http import get_session
+
+WARM_UP_TIMEOUT = (3, 5)
+
+
+def _open_connection(session_name: str, url: str):
+    def task():
+        try:
+            get_session(session_name).head(url, timeout=WARM_UP_TIMEOUT)
+        except requests.RequestException:
+            pass  # DNS, TCP and TLS are done even when the bank rejects HEAD
+
+    return task
+
+
+def _bog_token(merchant: str):
+    from georgian_payments.sdk.bog import BogPaySDK
+
+    BogPaySDK(None, merchant=merchant)._generate_jwt_auth()
+
+
+def _tbc_token(merchant: str):
+    from georgian_payments.sdk.tbc import TbcInstallmentSDK
+
+    TbcInstallmentSDK(merchant=merchant)._generate_jwt_auth()
+
+
+def _gc_session(merchant: str):
+    from georgian_payments.sdk.georgian_card import GCBank
+
+    GCBank(None, merchant=merchant).start_session()
+
+
+def _ufc_connection(merchant: str):
+    from georgian_payments.sdk.ufc import UfcSdk
+
+    sdk = UfcSdk(None, merchant=merchant)
+    if not all(os.path.exists(path) for path in sdk.cert):
+        return
+    try:
+        sdk.http_session.head(sdk.service_url, timeout=WARM_UP_TIMEOUT, verify=False)
+    except requests.RequestException:
+        pass
+
+
+def _session_name(bank: BankTypeChoices, merchant: str) -> str:
+    return f'{bank.name}:{merchant}' if merchant else bank.name
+
+
+def warm_up_tasks() -> List[Tuple[str, Callable]]:
+    """Only banks with configured credentials are warmed up, for every merchant."""
+    tasks = []
+    for merchant in get_merchants():
+        label = f'{merchant} ' if merchant else ''
+        bog, tbc = get_bank_settings('BOG_SETTINGS', merchant), get_bank_settings('TBC_SETTINGS', merchant)
+        gc, credo = get_bank_settings('GEORGIAN_CARD_SETTINGS', merchant), get_bank_settings('CREDO_SETTINGS', merchant)
+        space = get_bank_settings('SPACE_SETTINGS', merchant)
+        tasks.append((f'{label}UFC Connection', partial(_ufc_connection, merchant)))
+        if bog.get('client_id'):
+            tasks += [
+                (f'{label}BOG Token', partial(_bog_token, merchant)),
+                (f'{label}BOG Installment Connection', _open_connection(
+                    _session_name(BankTypeChoices.BOG, merchant), 'https://installment.bog.ge/v1'
+                )),
+            ]
+        if tbc.get('client_id'):
+            tasks.append((f'{label}TBC Token', partial(_tbc_token, merchant)))
+        if gc.get('merchant_id'):
+            tasks.append((f'{label}GC Session', partial(_gc_session, merchant)))
+        if credo.get('merchant_id'):
+            tasks.append((f'{label}Credo Connection', _open_connection(
+                _session_name(BankTypeChoices.CREDO, merchant), 'https://ganvadeba.credo.ge'
+            )))
+        if space.get('base_url'):
+            tasks.append((f'{label}Space Connection', _open_connection(
+                _session_name(BankTypeChoices.SPACE, merchant), space['base_url']
+            )))
+    return tasks
+
+
+def _warm_up():
+    for name, task in warm_up_tasks():
+        try:
+            task()
+        except Exception as e:
+            logger.warning(f'Georgian Payments Warm Up | {name} Failed | {e}')
+    logger.info('Georgian Payments Warm Up | Done')
+
+
+def warm_up(background: bool = True):
+    """Opens pooled bank connections and prefetches tokens without blocking the caller."""
+    if not background:
+        return _warm_up()
+    threading.Thread(target=_warm_up, name='georgian-payments-warm-up', daemon=True).start()
+
+
+def post_fork(server=None, worker=None):
+    """
+    gunicorn hook, add `from georgian_payments.warmup import post_fork` to gunicorn.conf.py. Every worker warms up
+    its own pools once forked, while `GEORGIAN_PAYMENTS_WARM_UP` is set. Nothing warms up before the fork: a
+    thread holding the session lock at fork time would leave it locked in the workers.
+    """
+    if WARM_UP:
+        warm_up()
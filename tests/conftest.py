@@ -0,0 +1,60 @@
+"""
+Django setup of the tests: a concrete transaction model in `tests.testapp` and a test database, SQLite in memory
+unless `TEST_DB_ENGINE` / `TEST_DB_NAME` / `TEST_DB_USER` / `TEST_DB_PASSWORD` / `TEST_DB_HOST` name another one.
+Tests of SKIP LOCKED behaviour only run on PostgreSQL.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings  # noqa: E402
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=[
+            'django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework', 'georgian_payments', 'tests.testapp'
+        ],
+        DATABASES={'default': {
+            'ENGINE': os.environ.get('TEST_DB_ENGINE', 'django.db.backends.sqlite3'),
+            'NAME': os.environ.get('TEST_DB_NAME', ':memory:'),
+            'USER': os.environ.get('TEST_DB_USER', ''),
+            'PASSWORD': os.environ.get('TEST_DB_PASSWORD', ''),
+            'HOST': os.environ.get('TEST_DB_HOST', ''),
+        }},
+        TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates', 'APP_DIRS': True}],
+        ROOT_URLCONF='tests.urls',
+        SECRET_KEY='tests',
+        USE_TZ=True,
+        STAGE=False,
+        BASE_DIR='/tmp',
+        HOST_URL='https://example.com',
+        GEORGIAN_CARD_SETTINGS={
+            'account_id': 'A1', 'merchant_id': 'M1', 'portal_id': 'P1', 'bank_user_username': 'gc',
+            'bank_user_password': 'gc', 'back_url_s': 'https://shop.test/%s/success/%s',
+            'back_url_f': 'https://shop.test/%s/fail/%s', 'session_ttl': 300,
+        },
+        SPACE_SETTINGS={'base_url': '', 'merchant_name': '', 'secret_key': 'space-secret', 'redirect_url': ''},
+        GEORGIAN_PAYMENTS_MERCHANTS={'second': {
+            'GEORGIAN_CARD_SETTINGS': {'merchant_id': 'M2'}, 'SPACE_SETTINGS': {'secret_key': 'second-secret'},
+        }},
+    )
+    import django
+
+    django.setup()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def django_test_database():
+    from django.test.utils import setup_test_environment, teardown_test_environment, setup_databases, \
+        teardown_databases
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    yield
+    teardown_databases(old_config, verbosity=0)
+    teardown_test_environment()
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+
+from georgian_payments.choices import BankTypeChoices, PaymentTypeChoices
+from georgian_payments.models import PaymentMethod
+from tests.testapp.models import Transaction
+
+
+def make_user(username: str = 'customer', password: str = None) -> User:
+    user = User(username=username)
+    user.set_password(password) if password else user.set_unusable_password()
+    user.save()
+    return user
+
+
+def make_payment_method(bank_type=BankTypeChoices.UFC, payment_type=PaymentTypeChoices.CARD) -> PaymentMethod:
+    return PaymentMethod.objects.create(bank_type=bank_type, payment_type=payment_type)
+
+
+def make_transactions(count: int, user: User, payment_method: PaymentMethod, **kwargs) -> list:
+    return [
+        Transaction.objects.create(**{'user': user, 'payment_method': payment_method, 'amount': 10, 'trx': f'trx-{i}',
+                                      **kwargs})
+        for i in range(count)
+    ]
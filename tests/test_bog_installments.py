@@ -0,0 +1,44 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from requests.auth import HTTPBasicAuth
+
+from georgian_payments.sdk.bog import BogInstallmentSDK
+from georgian_payments.sdk.http import tokens
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, data=None, headers=None, auth=None):
+        with self.lock:
+            self.calls.append((url, auth))
+        response = mock.Mock(status_code=200, content=b'{}')
+        response.request = mock.Mock(method=method, url=url, body=data, headers={})
+        if url.endswith('/oauth2/token'):
+            time.sleep(0.05)  # a slow token endpoint, workers started meanwhile would go out with basic auth
+            response.json.return_value = {'access_token': 'token', 'app_id': 'app', 'expires_in': 3600}
+        else:
+            response.json.return_value = {'discount_code': '', 'amount': 1}
+        return response
+
+
+class InstallmentFetchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.sdk = BogInstallmentSDK()
+        tokens.delete(self.sdk.token_cache_key)
+        self.sdk.session = FakeSession()
+
+    def test_workers_share_one_token(self):
+        self.sdk.calculate_installments([10, 20, 30, 40, 50])
+        token_calls = [auth for url, auth in self.sdk.session.calls if url.endswith('/oauth2/token')]
+        calculations = [auth for url, auth in self.sdk.session.calls if not url.endswith('/oauth2/token')]
+        self.assertEqual(len(token_calls), 1)
+        self.assertEqual(len(calculations), 5)
+        self.assertFalse([auth for auth in calculations if isinstance(auth, HTTPBasicAuth)])
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from georgian_payments.bulk import BulkOperationRunner, enqueue
+from georgian_payments.choices import BulkActionChoices, BulkItemStatusChoices, PaymentEventTypeChoices
+from georgian_payments.models import BulkOperationItem, PaymentEvent
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+
+class BulkOperationRunnerTests(TransactionTestCase):
+    def setUp(self):
+        self.transactions = make_transactions(3, make_user(), make_payment_method())
+        self.ids = [t.pk for t in self.transactions]
+        self.calls = []
+        patcher = mock.patch('georgian_payments.bulk.execute', side_effect=self.execute)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def execute(self, transaction, action, amount):
+        item = BulkOperationItem.objects.get(transaction_id=str(transaction.pk), action=action)
+        self.calls.append((transaction.pk, item.status))
+        # a callback of the same transaction lands meanwhile
+        callback = Transaction.objects.get(pk=transaction.pk)
+        callback.refunded += 1
+        callback.data_log.append({'callback': transaction.pk})
+        callback.save(update_fields=['refunded', 'data_log'])
+        return True, {'refund': transaction.pk}, amount
+
+    def run_batch(self, action=BulkActionChoices.REFUND, **kwargs):
+        enqueue('batch', self.ids, action, amount=4)
+        return BulkOperationRunner(Transaction, 'batch', workers=1, chunk_size=2, **kwargs).run()
+
+    def test_items_are_checkpointed_before_the_bank_is_called(self):
+        self.assertEqual(self.run_batch(), {BulkItemStatusChoices.SUCCESS: 3})
+        self.assertEqual(sorted(self.calls), [(pk, BulkItemStatusChoices.PROCESSING) for pk in self.ids])
+        self.assertEqual(set(BulkOperationItem.objects.values_list('status', flat=True)),
+                         {BulkItemStatusChoices.SUCCESS})
+
+    def test_processing_items_are_retried_only_when_asked(self):
+        enqueue('batch', self.ids, BulkActionChoices.REFUND, amount=4)
+        BulkOperationItem.objects.filter(transaction_id=str(self.ids[0])).update(
+            status=BulkItemStatusChoices.PROCESSING
+        )  # left by a crash, the refund may have reached the bank
+        BulkOperationRunner(Transaction, 'batch').run()
+        self.assertEqual(sorted(pk for pk, _ in self.calls), self.ids[1:])
+
+        BulkOperationRunner(Transaction, 'batch', retry_processing=True).run()
+        self.assertEqual(sorted(pk for pk, _ in self.calls), self.ids)
+
+    def test_refunds_are_added_to_what_callbacks_wrote(self):
+        self.run_batch()
+        for transaction in Transaction.objects.filter(pk__in=self.ids):
+            self.assertEqual(transaction.refunded, 1 + 4)
+            self.assertEqual(transaction.data_log, [{'callback': transaction.pk}, {'refund': transaction.pk}])
+
+    def test_finishing_pre_auth_refunds_nothing(self):
+        self.run_batch(BulkActionChoices.FINISH_PRE_AUTH)
+        self.assertEqual(set(Transaction.objects.values_list('refunded', flat=True)), {1})
+
+    @mock.patch.dict('georgian_payments.bulk.OUTBOX_SETTINGS', {'enabled': True})
+    def test_refunded_events_carry_the_refunded_sum(self):
+        self.run_batch(BulkActionChoices.CANCEL)
+        events = PaymentEvent.objects.filter(event_type=PaymentEventTypeChoices.REFUNDED).order_by('transaction_id')
+        self.assertEqual([e.transaction_id for e in events], [str(pk) for pk in self.ids])
+        for event in events:
+            self.assertEqual((event.payload['refund_amount'], event.payload['refunded']), (4, 5))
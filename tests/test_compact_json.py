@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from georgian_payments.choices import PTSChoices
+from georgian_payments.timeouts import expire
+from tests.factories import make_user, make_payment_method
+from tests.testapp.models import CompactTransaction
+
+
+class SummaryFieldTests(TestCase):
+    def setUp(self):
+        self.transaction = CompactTransaction.objects.create(
+            user=make_user(), payment_method=make_payment_method(), amount=10, trx='trx-0',
+            data_log=[{'RESULT_CODE': '000'}]
+        )
+
+    def summary(self) -> dict:
+        return CompactTransaction.objects.values_list('data_log_summary', flat=True).get()
+
+    def test_summary_is_saved_with_the_log(self):
+        self.assertEqual(self.summary(), {'RESULT_CODE': '000'})
+        self.transaction.append_data_log({'RESULT_CODE': '116'})
+        self.assertEqual(self.summary(), {'RESULT_CODE': '116'})
+        self.transaction.data_log.append({'RESULT_CODE': '200'})
+        self.transaction.save_dirty(['data_log'])
+        self.assertEqual(self.summary(), {'RESULT_CODE': '200'})
+        self.assertEqual(CompactTransaction.objects.filter(data_log_summary__RESULT_CODE='200').count(), 1)
+
+    def test_expire_keeps_the_summary(self):
+        self.assertEqual(expire(CompactTransaction, [self.transaction.pk]), 1)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.status, PTSChoices.TIMEOUT)
+        self.assertEqual(self.summary(), {'RESULT_CODE': '000'})
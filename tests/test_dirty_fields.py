@@ -0,0 +1,90 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from georgian_payments.choices import BankTypeChoices, PTSChoices
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+
+def updates(queries) -> list:
+    return [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+
+
+class DirtyFieldTests(TestCase):
+    def setUp(self):
+        make_transactions(1, make_user(), make_payment_method())
+        self.transaction = Transaction.objects.get()
+
+    def test_sync_status_without_news_does_not_write(self):
+        answer = {'RESULT': 'OK', 'RESULT_CODE': '000'}
+        self.transaction.sync_status(answer, 1)
+        transaction = Transaction.objects.select_related('payment_method').get()
+        with self.assertNumQueries(0):
+            transaction.sync_status(dict(answer), 1)
+        self.assertEqual(transaction.status, PTSChoices.SUCCESS)
+        self.assertEqual(len(transaction.data_log), 1)
+
+    def test_saves_in_a_unit_of_work_are_flushed_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.transaction.unit_of_work():
+                self.transaction.trx = 'trx-new'
+                self.transaction.save(update_fields=['trx'])
+                self.transaction.data_log.append({'entry': 1})
+                self.transaction.save(update_fields=['data_log'])
+                self.transaction.card_hash = '4111****1111'
+                self.transaction.save()
+        self.assertEqual(len(updates(queries)), 1)
+        self.transaction.refresh_from_db()
+        self.assertEqual((self.transaction.trx, self.transaction.card_hash, self.transaction.data_log),
+                         ('trx-new', '4111****1111', [{'entry': 1}]))
+
+    def test_update_fields_by_name_or_attname(self):
+        other_methods = {'payment_method': make_payment_method(BankTypeChoices.BOG),
+                         'payment_method_id': make_payment_method(BankTypeChoices.TBC)}
+        for name, payment_method in other_methods.items():
+            with self.subTest(name=name):
+                self.transaction.payment_method = payment_method
+                self.assertEqual(self.transaction.get_dirty_fields([name]), ['payment_method_id'])
+                self.transaction.save(update_fields=[name])
+                self.assertEqual(self.transaction.get_dirty_fields(), [])
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.transaction.save_dirty([name]), [])
+
+    def test_update_fields_by_attname_in_a_unit_of_work(self):
+        payment_method = make_payment_method(BankTypeChoices.BOG)
+        with CaptureQueriesContext(connection) as queries:
+            with self.transaction.unit_of_work():
+                self.transaction.payment_method_id = payment_method.pk
+                self.transaction.save(update_fields=['payment_method_id'])
+        self.assertEqual(len(updates(queries)), 1)
+        self.assertEqual(Transaction.objects.get().payment_method_id, payment_method.pk)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'jsonb appends need PostgreSQL')
+class AppendInDatabaseTests(TestCase):
+    def setUp(self):
+        make_transactions(1, make_user(), make_payment_method())
+        Transaction.objects.update(status=PTSChoices.SUCCESS, data_log=[{'RESULT': 'OK', 'RESULT_CODE': '000'}])
+
+    def row_version(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT ctid FROM {Transaction._meta.db_table}')
+            return cursor.fetchone()[0]
+
+    def test_logged_entry_does_not_rewrite_the_row(self):
+        transaction = Transaction.objects.for_status_sync().get()
+        version = self.row_version()
+        with CaptureQueriesContext(connection) as queries:
+            transaction.sync_status({'RESULT': 'OK', 'RESULT_CODE': '000'}, 1)
+        self.assertEqual(len(queries), 1)  # the append, matching no row, and no SAVEPOINT around it
+        self.assertEqual(self.row_version(), version)
+        self.assertEqual(len(Transaction.objects.get().data_log), 1)
+
+    def test_new_entry_is_appended(self):
+        transaction = Transaction.objects.for_status_sync().get()
+        with self.assertNumQueries(1):
+            transaction.sync_status({'RESULT': 'REVERSED', 'RESULT_CODE': '400'}, 1)
+        self.assertEqual([entry['RESULT'] for entry in Transaction.objects.get().data_log], ['OK', 'REVERSED'])
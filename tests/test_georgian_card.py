@@ -0,0 +1,72 @@
+import base64
+from unittest import mock
+
+from django.test import Client, SimpleTestCase, TestCase
+
+from georgian_payments.choices import BankTypeChoices, PaymentTypeChoices, PTSChoices
+from georgian_payments.models import appends_in_db
+from georgian_payments.sdk.georgian_card import GCBank
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+APPEND = int(appends_in_db(Transaction, 'default'))  # the log entry is an UPDATE of its own on PostgreSQL
+
+
+class PayUrlTests(SimpleTestCase):
+    def test_pay_url_is_the_merchants(self):
+        self.assertIn('merch_id=M1&', GCBank(None).pay_url(7))
+        url = GCBank(None, merchant='second').pay_url(7, lang='en')
+        self.assertIn('merch_id=M2&', url)
+        self.assertTrue(url.endswith('o.transaction_id=7&lang_code=en'))
+
+
+class CallbackQueryTests(TestCase):
+    """Basic auth loads the bank user, the callback loads the transaction with what it needs and writes it once."""
+
+    def setUp(self):
+        make_user('gc', password='gc')
+        payment_method = make_payment_method(BankTypeChoices.GC, PaymentTypeChoices.APPLE_PAY)
+        self.transaction, = make_transactions(1, make_user(), payment_method)
+        self.client = Client(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'gc:gc').decode())
+        patcher = mock.patch('georgian_payments.views.georgian_card.PaymentTransaction', Transaction)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_check(self):
+        with self.assertNumQueries(5 + APPEND):
+            response = self.client.get('/payments/callback/gc/check/', {
+                'o.transaction_id': self.transaction.pk, 'trx_id': 'GC1', 'merch_id': 'M1'
+            })
+        self.assertEqual(response.status_code, 200)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.trx, 'GC1')
+        self.assertEqual(self.transaction.data_log[-1]['Check Data']['trx_id'], 'GC1')
+
+    def test_register(self):
+        with self.assertNumQueries(7 + APPEND):  # sync_status() nests a savepoint in the unit of work
+            response = self.client.get('/payments/callback/gc/register/', {
+                'o.transaction_id': self.transaction.pk, 'trx_id': self.transaction.trx, 'result_code': '1',
+                'p.maskedPan': '4111****1111'
+            })
+        self.assertEqual(response.status_code, 200)
+        self.transaction.refresh_from_db()
+        self.assertEqual((self.transaction.status, self.transaction.card_hash), (PTSChoices.SUCCESS, '4111****1111'))
+        self.assertIn('Register Data', self.transaction.data_log[-1])
+
+
+class ApplePayAcceptTests(TestCase):
+    def setUp(self):
+        payment_method = make_payment_method(BankTypeChoices.GC, PaymentTypeChoices.APPLE_PAY)
+        self.transaction, = make_transactions(1, make_user(), payment_method)
+        patcher = mock.patch('georgian_payments.views.georgian_card.PaymentTransaction', Transaction)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_apple_data_is_saved_before_the_bank_call(self):
+        with mock.patch.object(GCBank, 'apple_pay_accept', side_effect=ConnectionError('GC Unavailable')), \
+                self.assertRaises(ConnectionError):
+            Client().post('/payments/callback/gc/apple_pay_accept/', {
+                'trans_id': self.transaction.pk, 'apple_data': 'token'
+            }, content_type='application/json')
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.additional_data['apple_data'], 'token')
@@ -0,0 +1,96 @@
+import threading
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection, connections, transaction as db_transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from georgian_payments.leases import claim, iter_claimed
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        self.transactions = make_transactions(6, make_user(), make_payment_method())
+        self.queryset = Transaction.objects.all()
+
+    def test_owners_claim_disjoint_rows(self):
+        since = timezone.now()
+        first = claim(self.queryset, 'worker-a', since, limit=4)
+        second = claim(self.queryset, 'worker-b', since, limit=4)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(claim(self.queryset, 'worker-c', since), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        pks = claim(self.queryset, 'crashed', timezone.now(), limit=3)
+        Transaction.objects.filter(pk__in=pks).update(lease_expires=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim(self.queryset, 'worker-b', timezone.now(), limit=3), pks)
+        self.assertEqual(set(Transaction.objects.filter(pk__in=pks).values_list('lease_owner', flat=True)),
+                         {'worker-b'})
+
+    def test_unexpired_lease_is_not_reclaimed(self):
+        pks = claim(self.queryset, 'worker-a', timezone.now(), limit=3)
+        self.assertFalse(set(pks) & set(claim(self.queryset, 'worker-b', timezone.now())))
+
+    def test_iter_claimed_yields_every_row_once_and_releases_them(self):
+        seen = [transaction.pk for transaction in iter_claimed(self.queryset, 'worker-a', batch_size=4)]
+        self.assertEqual(sorted(seen), sorted(t.pk for t in self.transactions))
+        self.assertEqual(set(Transaction.objects.values_list('lease_owner', flat=True)), {''})
+        # released rows count as handled for the rest of the run, a later run claims them again
+        self.assertEqual(len(claim(self.queryset, 'worker-b', timezone.now())), 6)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED needs PostgreSQL')
+class ConcurrentClaimTests(TransactionTestCase):
+    def setUp(self):
+        self.transactions = make_transactions(40, make_user(), make_payment_method())
+        self.queryset = Transaction.objects.all()
+
+    def test_rows_locked_by_another_claim_are_skipped(self):
+        locked, release = threading.Event(), threading.Event()
+        held = [t.pk for t in self.transactions[:3]]
+
+        def hold():
+            with db_transaction.atomic():
+                list(Transaction.objects.filter(pk__in=held).select_for_update())
+                locked.set()
+                release.wait(10)
+            connections.close_all()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        try:
+            locked.wait(10)
+            pks = claim(self.queryset, 'worker-b', timezone.now(), limit=10)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(len(pks), 10)
+        self.assertFalse(set(pks) & set(held))
+
+    def test_concurrent_owners_never_claim_the_same_row(self):
+        barrier, claimed = threading.Barrier(4), {}
+
+        def work(owner):
+            since, pks = timezone.now(), []
+            barrier.wait()
+            while True:
+                batch = claim(self.queryset, owner, since, limit=3)
+                if not batch:
+                    break
+                pks += batch
+            claimed[owner] = pks
+            connections.close_all()
+
+        threads = [threading.Thread(target=work, args=(f'worker-{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pks = [pk for owner_pks in claimed.values() for pk in owner_pks]
+        self.assertEqual(len(pks), len(set(pks)))
+        self.assertEqual(set(pks), {t.pk for t in self.transactions})
@@ -0,0 +1,128 @@
+import threading
+from unittest import mock, skipUnless
+
+from django.db import connection, connections, transaction as db_transaction
+from django.test import Client, TestCase, TransactionTestCase
+
+from georgian_payments.choices import BankTypeChoices, PaymentEventTypeChoices, PTSChoices, PTTChoices
+from georgian_payments.models import PaymentEvent
+from georgian_payments.outbox import BaseSink, dispatch
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+
+class RecordingSink(BaseSink):
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.batches = []
+
+    def send(self, events):
+        if events[0].transaction_id in self.failing:
+            raise ConnectionError('Sink Unavailable')
+        self.batches.append([event.pk for event in events])
+
+
+def make_event(transaction_id: str) -> PaymentEvent:
+    return PaymentEvent.objects.create(
+        transaction_id=transaction_id, event_type=PaymentEventTypeChoices.STATUS_CHANGED, status=PTSChoices.SUCCESS
+    )
+
+
+class PayloadTests(TestCase):
+    def test_refunded_event_names_the_refunded_sum_refund_amount(self):
+        transaction, = make_transactions(1, make_user(), make_payment_method(), refunded=4)
+        event = PaymentEvent.build(transaction, PaymentEventTypeChoices.REFUNDED, refund_amount=4)
+        self.assertEqual((event.payload['amount'], event.payload['refunded'], event.payload['refund_amount']),
+                         (10, 4, 4))
+
+    def test_payload_cannot_override_the_transactions_keys(self):
+        transaction, = make_transactions(1, make_user(), make_payment_method())
+        event = PaymentEvent.build(transaction, PaymentEventTypeChoices.REFUNDED, amount=1, trx='other', note='x')
+        self.assertEqual((event.payload['amount'], event.payload['trx'], event.payload['note']), (10, 'trx-0', 'x'))
+
+
+@mock.patch.dict('georgian_payments.models.OUTBOX_SETTINGS', {'enabled': True})
+@mock.patch('georgian_payments.views.bog.PaymentTransaction', Transaction)
+class BogRefundCallbackTests(TestCase):
+    def setUp(self):
+        self.transaction, = make_transactions(1, make_user(), make_payment_method(BankTypeChoices.BOG), amount=30,
+                                              pay_id='hash', order_id='7', transaction_type=PTTChoices.REFUND)
+
+    def callback(self, **data):
+        response = Client().post('/payments/callback/bog/refund_status/', {
+            'order_id': self.transaction.trx, 'payment_hash': 'hash', 'shop_order_id': '7', 'status': 'success', **data
+        })
+        self.assertEqual(response.status_code, 200)
+        return PaymentEvent.objects.get(event_type=PaymentEventTypeChoices.REFUNDED).payload
+
+    def test_refund_amount_is_the_banks(self):
+        payload = self.callback(amount='12.5')
+        self.assertEqual((payload['amount'], payload['refund_amount'], payload['refund_status']), (30, 12.5, 'success'))
+
+    def test_refund_amount_is_left_out_when_unknown(self):
+        self.assertNotIn('refund_amount', self.callback())
+
+
+class DispatchTests(TestCase):
+    def test_events_are_delivered_in_order_per_transaction(self):
+        events = [make_event(transaction_id) for transaction_id in ('1', '2', '1', '2', '1')]
+        sink = RecordingSink()
+        self.assertEqual(dispatch(sinks=[sink]), 5)
+        self.assertEqual(sorted(sink.batches), sorted([
+            [events[0].pk, events[2].pk, events[4].pk], [events[1].pk, events[3].pk]
+        ]))
+        self.assertFalse(PaymentEvent.objects.filter(delivered__isnull=True).exists())
+        self.assertEqual(dispatch(sinks=[sink]), 0)
+
+    def test_failed_event_blocks_later_events_of_its_transaction_only(self):
+        failed = make_event('1')
+        self.assertEqual(dispatch(sinks=[RecordingSink(failing={'1'})]), 0)
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 1)
+        self.assertIsNone(failed.delivered)
+
+        later, other = make_event('1'), make_event('2')
+        sink = RecordingSink()
+        # fresh events come first, the failed one is left out of the batch and holds `later` back
+        self.assertEqual(dispatch(batch_size=2, sinks=[sink]), 1)
+        self.assertEqual(sink.batches, [[other.pk]])
+        later.refresh_from_db()
+        self.assertIsNone(later.delivered)
+
+        self.assertEqual(dispatch(batch_size=2, sinks=[sink]), 2)
+        self.assertEqual(sink.batches[-1], [failed.pk, later.pk])
+
+    def test_failing_transaction_is_retried_with_its_later_events(self):
+        failed, later, other = make_event('1'), make_event('1'), make_event('2')
+        sink = RecordingSink(failing={'1'})
+        self.assertEqual(dispatch(sinks=[sink]), 1)
+        self.assertEqual(sink.batches, [[other.pk]])
+        self.assertEqual(list(PaymentEvent.objects.filter(delivered__isnull=True).order_by('pk')
+                              .values_list('pk', 'attempts')), [(failed.pk, 1), (later.pk, 1)])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED needs PostgreSQL')
+class ConcurrentDispatchTests(TransactionTestCase):
+    def test_event_locked_by_another_dispatcher_holds_back_its_transaction(self):
+        locked, later, other = make_event('1'), make_event('1'), make_event('2')
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with db_transaction.atomic():
+                list(PaymentEvent.objects.filter(pk=locked.pk).select_for_update())
+                held.set()
+                release.wait(10)
+            connections.close_all()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        try:
+            held.wait(10)
+            sink = RecordingSink()
+            self.assertEqual(dispatch(sinks=[sink]), 1)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(sink.batches, [[other.pk]])
+        self.assertEqual(dispatch(sinks=[sink]), 2)
+        self.assertEqual(sink.batches[-1], [locked.pk, later.pk])
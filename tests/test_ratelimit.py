@@ -0,0 +1,130 @@
+from email.utils import formatdate
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from georgian_payments.ratelimit import CacheBucketStore, LocalBucketStore, LOW, RateLimited, RateLimiter, \
+    operation, retry_after
+
+
+class Clock:
+    """Stands in for the `time` module of `georgian_payments.ratelimit`, sleeping moves it on."""
+
+    def __init__(self, now: float = 1001.0):
+        self.now, self.sleeps = now, []
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ClockTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = Clock()
+        for patcher in (mock.patch('georgian_payments.ratelimit.time', self.clock),
+                        mock.patch('georgian_payments.ratelimit.random.uniform', return_value=0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class LocalBucketStoreTests(ClockTestCase):
+    def test_burst_then_refill(self):
+        store = LocalBucketStore()
+        self.assertEqual([store.take('TBC', 2, 4, 0) for _ in range(4)], [0] * 4)
+        self.assertEqual(store.take('TBC', 2, 4, 0), 0.5)
+        self.clock.now += 0.5
+        self.assertEqual(store.take('TBC', 2, 4, 0), 0)
+        self.assertEqual(store.take('BOG', 2, 4, 0), 0)  # buckets are per key
+
+    def test_floor_is_kept(self):
+        store = LocalBucketStore()
+        self.assertEqual([store.take('TBC', 2, 4, 1) for _ in range(3)], [0] * 3)
+        self.assertEqual(store.take('TBC', 2, 4, 1), 0.5)
+        self.assertEqual(store.take('TBC', 2, 4, 0), 0)  # the reserve is left to calls without a floor
+
+
+class CacheBucketStoreTests(ClockTestCase):
+    def test_window_and_wait(self):
+        store = CacheBucketStore()  # window of 4 / 2 = 2 seconds, 1001.0 is in [1000, 1002)
+        self.assertEqual([store.take('TBC', 2, 4, 0) for _ in range(4)], [0] * 4)
+        self.assertEqual(store.take('TBC', 2, 4, 0), 1.0)
+        self.assertEqual(store.take('TBC', 2, 4, 0), 1.0)
+        self.assertEqual(cache.get(f'{CacheBucketStore.PREFIX}:TBC:500'), 4)  # rejected calls are taken back
+        self.clock.now = 1002.0
+        self.assertEqual(store.take('TBC', 2, 4, 0), 0)
+
+    def test_floor_is_kept(self):
+        store = CacheBucketStore()
+        self.assertEqual([store.take('TBC', 2, 4, 1) for _ in range(3)], [0] * 3)
+        self.assertEqual(store.take('TBC', 2, 4, 1), 1.0)
+        self.assertEqual(store.take('TBC', 2, 4, 0), 0)
+
+    def test_block(self):
+        store = CacheBucketStore()
+        store.block('TBC', 3)
+        self.assertEqual(store.blocked_for('TBC'), 3)
+        self.clock.now += 4
+        self.assertEqual(store.blocked_for('TBC'), 0)
+
+
+class RateLimiterTests(ClockTestCase):
+    config = {'enabled': True, 'backend': 'local', 'low_priority_reserve': 0.25, 'max_wait': {'high': 5, 'low': 0},
+              'limits': {'TBC': {'rate': 1, 'burst': 4}, 'TBC:check_status': {'rate': 10, 'burst': 10}}}
+
+    def test_bucket_of_the_operation_wins_and_merchants_get_their_own(self):
+        limiter = RateLimiter(self.config)
+        self.assertEqual(limiter.bucket('TBC'), ('TBC', {'rate': 1, 'burst': 4}))
+        self.assertEqual(limiter.bucket('TBC:second'), ('TBC:second', {'rate': 1, 'burst': 4}))
+        with operation('check_status'):
+            self.assertEqual(limiter.bucket('TBC:second')[0], 'TBC:check_status:second')
+        self.assertIsNone(limiter.bucket('BOG'))
+
+    def test_low_priority_leaves_the_reserve(self):
+        limiter = RateLimiter(self.config)
+        with operation('poll', LOW):
+            for _ in range(3):
+                limiter.acquire('TBC')
+            with self.assertRaises(RateLimited):
+                limiter.acquire('TBC')  # max_wait 0
+        limiter.acquire('TBC')  # the reserved token
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_waits_within_max_wait_then_raises(self):
+        limiter = RateLimiter(self.config)
+        for _ in range(4):
+            limiter.acquire('TBC')
+        limiter.acquire('TBC')
+        self.assertEqual(self.clock.sleeps, [1.0])
+        limiter.config = {**self.config, 'max_wait': {'high': 0.5}}
+        with self.assertRaises(RateLimited):
+            limiter.acquire('TBC')
+
+    def test_429_blocks_the_bucket_for_its_retry_after(self):
+        limiter = RateLimiter(self.config)
+        self.assertTrue(limiter.throttled('TBC', mock.Mock(headers={'Retry-After': '3'})))
+        limiter.acquire('TBC')
+        self.assertEqual(self.clock.sleeps, [3])
+        self.assertFalse(limiter.throttled('BOG', mock.Mock(headers={})))  # no limit, not retried
+
+    def test_disabled(self):
+        limiter = RateLimiter({**self.config, 'enabled': False})
+        for _ in range(10):
+            limiter.acquire('TBC')
+        self.assertFalse(limiter.throttled('TBC', mock.Mock(headers={})))
+
+
+class RetryAfterTests(ClockTestCase):
+    def test_parsing(self):
+        cases = {'3': 3, ' 7 ': 7, formatdate(1011, usegmt=True): 10, formatdate(900, usegmt=True): 0,
+                 '': 1.5, 'soon': 1.5}
+        for value, seconds in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(retry_after(mock.Mock(headers={'Retry-After': value}), 1.5), seconds)
+        self.assertEqual(retry_after(mock.Mock(headers={}), 1.5), 1.5)
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+
+from georgian_payments import schemas
+from georgian_payments.schemas import BLANK_MESSAGE, INVALID_MESSAGE, REQUIRED_MESSAGE, BogCallbackSchema, \
+    GCRegisterSchema, SchemaError, SpaceCallbackSchema, TbcCallbackSchema
+from georgian_payments.serialaizers import SpaceCallbackSerializer
+
+SPACE_PAYLOAD = {'OrderId': '1', 'Status': 'Approved', 'Secret': 'space-secret', 'Description': '',
+                 'ClientContributionAmount': ''}
+
+
+class ParseTests(SimpleTestCase):
+    def errors(self, schema, payload) -> dict:
+        with self.assertRaises(SchemaError) as raised:
+            schema.parse(payload)
+        return raised.exception.errors
+
+    def test_query_dict_takes_the_last_value(self):
+        values, data = BogCallbackSchema.parse(QueryDict('status=pending&status=success&extra=1'))
+        self.assertEqual(values.status, 'success')
+        self.assertEqual(data, {'status': 'success', 'extra': '1'})
+
+    def test_json_list_takes_the_first_item(self):
+        values, data = BogCallbackSchema.parse({'status': ['pending', 'success'], 'pan': [], 'extra': {'a': 1}})
+        self.assertEqual((values.status, values.pan), ('pending', ''))
+        self.assertEqual(data, {'status': 'pending', 'pan': '', 'extra': {'a': 1}})
+
+    def test_missing_blank_and_null_values_keep_their_defaults(self):
+        values, _ = GCRegisterSchema.parse({'o.transaction_id': '5', 'result_code': '', 'trx_id': None,
+                                            'p.maskedPan': None})
+        self.assertEqual((values.transaction_id, values.result_code, values.trx_id, values.masked_pan),
+                         (5, 2, None, ''))
+        self.assertEqual((values.card_registered, values.card_id), ('N', None))
+
+    def test_blank_string_is_kept(self):
+        values, _ = BogCallbackSchema.parse({'status': ''})
+        self.assertEqual(values.status, '')
+
+    def test_required(self):
+        self.assertEqual(self.errors(GCRegisterSchema, {}), {'o.transaction_id': [REQUIRED_MESSAGE]})
+        self.assertEqual(self.errors(TbcCallbackSchema, QueryDict('')), {'PaymentId': [REQUIRED_MESSAGE]})
+
+    def test_blank_not_allowed(self):
+        for value in ('', None, []):
+            with self.subTest(value=value):
+                self.assertEqual(self.errors(TbcCallbackSchema, {'PaymentId': value}), {'PaymentId': [BLANK_MESSAGE]})
+
+    def test_coerce_failure(self):
+        self.assertEqual(self.errors(GCRegisterSchema, {'o.transaction_id': 'abc', 'result_code': '1.5'}),
+                         {'o.transaction_id': [INVALID_MESSAGE], 'result_code': [INVALID_MESSAGE]})
+
+
+class SpaceSecretTests(SimpleTestCase):
+    def test_secret_of_any_merchant_passes(self):
+        for secret in ('space-secret', 'second-secret'):
+            with self.subTest(secret=secret):
+                values, _ = SpaceCallbackSchema.parse({**SPACE_PAYLOAD, 'Secret': secret})
+                self.assertEqual(values.Secret, secret)
+
+    def test_wrong_secret_is_rejected(self):
+        with self.assertRaises(SchemaError) as raised:
+            SpaceCallbackSchema.parse({**SPACE_PAYLOAD, 'Secret': 'wrong'})
+        self.assertEqual(raised.exception.errors, {'Secret': ['Secret Key is not Valid.']})
+
+    def test_every_merchant_is_compared(self):
+        with mock.patch.object(schemas, 'secret_matches', wraps=schemas.secret_matches) as secret_matches:
+            SpaceCallbackSchema.parse(SPACE_PAYLOAD)
+        self.assertEqual(secret_matches.call_count, 2)
+
+    def test_serializer_uses_the_same_check(self):
+        self.assertTrue(SpaceCallbackSerializer(data=SPACE_PAYLOAD).is_valid())
+        serializer = SpaceCallbackSerializer(data={**SPACE_PAYLOAD, 'Secret': 'wrong'})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['Secret'], ['Secret Key is not Valid.'])
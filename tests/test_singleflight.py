@@ -0,0 +1,133 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from georgian_payments.singleflight import SingleFlight
+
+
+class SlowCall:
+    """Counts calls and blocks them until released, so followers can pile up behind the leader."""
+
+    def __init__(self, result='answer', error=None):
+        self.result, self.error = result, error
+        self.calls = 0
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return f'{self.result} {self.calls}'
+
+
+def follow(flight, key, fn, results, fresh=False):
+    try:
+        results.append(flight.do(key, fn, fresh))
+    except Exception as e:
+        results.append(e)
+
+
+class LocalSingleFlightTests(SimpleTestCase):
+    config = {'enabled': True, 'backend': 'local', 'ttl': 0.2, 'wait': 5}
+
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight(self.config)
+
+    def run_concurrently(self, fn, followers=3, fresh=False):
+        leader, results = [], []
+        threads = [threading.Thread(target=follow, args=(self.flight, 'key', fn, leader))]
+        threads[0].start()
+        fn.started.wait(5)
+        threads += [threading.Thread(target=follow, args=(self.flight, 'key', fn, results, fresh))
+                    for _ in range(followers)]
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)  # the followers are waiting for the leader now
+        fn.release.set()
+        for thread in threads:
+            thread.join()
+        return leader[0], results
+
+    def test_followers_share_the_leaders_call(self):
+        fn = SlowCall()
+        leader, followers = self.run_concurrently(fn)
+        self.assertEqual(fn.calls, 1)
+        self.assertEqual(leader, ('answer 1', False))
+        self.assertEqual(followers, [('answer 1', True)] * 3)
+
+    def test_followers_get_the_leaders_error(self):
+        fn = SlowCall(error=ConnectionError('Bank Unavailable'))
+        leader, followers = self.run_concurrently(fn)
+        self.assertEqual(fn.calls, 1)
+        self.assertIsInstance(leader, ConnectionError)
+        self.assertEqual([type(e) for e in followers], [ConnectionError] * 3)
+        fn.error = None
+        self.assertEqual(self.flight.do('key', fn), ('answer 2', False))  # a failure is not remembered
+
+    def test_answer_is_reused_until_the_ttl_expires(self):
+        fn = SlowCall()
+        fn.release.set()
+        self.assertEqual(self.flight.do('key', fn), ('answer 1', False))
+        self.assertEqual(self.flight.do('key', fn), ('answer 1', True))
+        self.assertEqual(self.flight.do('other', fn), ('answer 2', False))
+        time.sleep(0.25)
+        self.assertEqual(self.flight.do('key', fn), ('answer 3', False))
+
+    def test_fresh_caller_joins_a_call_in_flight(self):
+        fn = SlowCall()
+        _, followers = self.run_concurrently(fn, followers=1, fresh=True)
+        self.assertEqual((fn.calls, followers), (1, [('answer 1', True)]))
+
+    def test_fresh_caller_does_not_take_a_finished_answer(self):
+        fn = SlowCall()
+        fn.release.set()
+        self.flight.do('key', fn)
+        self.assertEqual(self.flight.do('key', fn, fresh=True), ('answer 2', False))
+        self.assertEqual(self.flight.do('key', fn), ('answer 2', True))
+
+    def test_disabled_calls_every_time(self):
+        flight, fn = SingleFlight({'enabled': False}), SlowCall()
+        fn.release.set()
+        self.assertEqual([flight.do('key', fn) for _ in range(2)], [('answer 1', False), ('answer 2', False)])
+
+
+class CacheSingleFlightTests(SimpleTestCase):
+    """Two `SingleFlight`s over the locmem cache stand for two processes."""
+    config = {'enabled': True, 'backend': 'cache', 'cache_alias': 'default', 'ttl': 1, 'wait': 5,
+              'poll_interval': 0.01}
+
+    def setUp(self):
+        cache.clear()
+        self.first, self.second = SingleFlight(self.config), SingleFlight(self.config)
+
+    def test_answer_is_handed_to_another_process(self):
+        fn = SlowCall()
+        fn.release.set()
+        self.assertEqual(self.first.do('key', fn), ('answer 1', False))
+        self.assertEqual(self.second.do('key', fn), ('answer 1', True))
+        time.sleep(1.1)
+        self.assertEqual(self.second.do('key', fn), ('answer 2', False))
+
+    def test_process_waits_for_the_call_in_flight(self):
+        fn, leader, follower = SlowCall(), [], []
+        threads = [threading.Thread(target=follow, args=(self.first, 'key', fn, leader))]
+        threads[0].start()
+        fn.started.wait(5)
+        threads.append(threading.Thread(target=follow, args=(self.second, 'key', fn, follower, True)))
+        threads[1].start()
+        time.sleep(0.05)
+        fn.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((fn.calls, leader, follower), (1, [('answer 1', False)], [('answer 1', True)]))
+
+    def test_fresh_caller_does_not_take_a_finished_answer(self):
+        fn = SlowCall()
+        fn.release.set()
+        self.first.do('key', fn)
+        self.assertEqual(self.second.do('key', fn, fresh=True), ('answer 2', False))
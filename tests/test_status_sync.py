@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from georgian_payments.choices import BankTypeChoices, PaymentTypeChoices, PTSChoices
+from georgian_payments.management.commands.tbc_loan_automatization import Command as TbcLoanCommand
+from georgian_payments.models import appends_in_db
+from georgian_payments.timeouts import get_policies
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+UFC_COMMAND = 'georgian_payments.management.commands.ufc_status_automatizing'
+TBC_COMMAND = 'georgian_payments.management.commands.tbc_loan_automatization'
+# on PostgreSQL the log entry is appended by an UPDATE of its own
+APPEND = int(appends_in_db(Transaction, 'default'))
+
+
+def bank_answer(transaction):
+    return {'RESULT': 'OK', 'RESULT_CODE': '000', 'TRANSACTION_ID': transaction.trx}, 1, '4111****1111', None
+
+
+class UfcPollerQueryTests(TestCase):
+    """Claiming, loading and releasing a batch costs the same whatever its size, each transaction one UPDATE."""
+
+    def poll(self, count, queries):
+        transactions = make_transactions(count, make_user(), make_payment_method())
+        get_policies()  # cached for the process, not part of the polling
+        with mock.patch(f'{UFC_COMMAND}.PaymentTransaction', Transaction), \
+                mock.patch.object(Transaction, '_check_bank_status', autospec=True,
+                                  side_effect=lambda transaction, engine: bank_answer(transaction)), \
+                self.assertNumQueries(queries):
+            call_command('ufc_status_automatizing')
+        return transactions
+
+    def test_batch_of_one(self):
+        self.poll(1, 9 + 3 + APPEND)
+
+    def test_batch_of_many(self):
+        transactions = self.poll(5, 9 + 5 * (3 + APPEND))
+        self.assertEqual(
+            set(Transaction.objects.filter(pk__in=[t.pk for t in transactions]).values_list('status', flat=True)),
+            {PTSChoices.SUCCESS}
+        )
+
+
+class FakeTbcFeed:
+    merchant_key = 'key'
+    changes = []
+    synced = []
+
+    def __init__(self, merchant=''):
+        self.merchant = merchant
+
+    def status_changes(self):
+        return {'synchronizationRequestId': 'request', 'statusChanges': self.changes}
+
+    def status_changes_sync(self, request_id):
+        self.synced.append(request_id)
+
+
+class TbcFeedQueryTests(TestCase):
+    """The sessions of a feed are loaded in one query, each changed transaction costs one UPDATE."""
+
+    def test_status_changes(self):
+        payment_method = make_payment_method(BankTypeChoices.TBC, PaymentTypeChoices.LOAN)
+        approved, rejected = make_transactions(2, make_user(), payment_method)
+        FakeTbcFeed.changes = [
+            {'sessionId': approved.trx, 'statusId': 8, 'amount': 10, 'contributionAmount': 0},
+            {'sessionId': rejected.trx, 'statusId': 3, 'amount': 10, 'contributionAmount': 0},
+            {'sessionId': 'unknown', 'statusId': 8, 'amount': 10, 'contributionAmount': 0},
+        ]
+        FakeTbcFeed.synced = []
+        with mock.patch(f'{TBC_COMMAND}.PaymentTransaction', Transaction), \
+                mock.patch(f'{TBC_COMMAND}.TbcInstallmentSDK', FakeTbcFeed), \
+                self.assertNumQueries(1 + 2 * (3 + APPEND)):
+            TbcLoanCommand().sync_merchants([''])
+        self.assertEqual(FakeTbcFeed.synced, ['request'])
+        approved.refresh_from_db()
+        rejected.refresh_from_db()
+        self.assertEqual((approved.status, rejected.status), (PTSChoices.SUCCESS, PTSChoices.FAILED))
@@ -0,0 +1,146 @@
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.db import connection, connections, transaction as db_transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from georgian_payments.choices import PaymentTypeChoices, BankTypeChoices, PTSChoices, PaymentEventTypeChoices
+from georgian_payments.models import PaymentEvent
+from georgian_payments.timeouts import Policy, expire_all, stale_pending, sweep
+from tests.factories import make_user, make_payment_method, make_transactions
+from tests.testapp.models import Transaction
+
+EXPIRE = Policy(PaymentTypeChoices.CARD, BankTypeChoices.UFC, timedelta(minutes=40), False)
+CONFIRM = EXPIRE._replace(requires_confirmation=True)
+
+
+class FakeEngine:
+    """Answers by the `trx` prefix: 'success', 'failed', 'pending' or 'error'."""
+    unique_by_key = 'trans_id'
+    answers = {'success': 1, 'failed': -1, 'pending': 0}
+
+    def __init__(self, transaction, calls):
+        self.transaction, self.calls = transaction, calls
+
+    def check_transaction_status(self):
+        self.calls.append(self.transaction.trx)
+        answer = self.transaction.trx.split('-')[0]
+        if answer == 'error':
+            raise ConnectionError('Bank Is Down')
+        return {'trans_id': self.transaction.trx}, self.answers[answer]
+
+
+def make_stale(count, user, payment_method, **kwargs):
+    transactions = make_transactions(count, user, payment_method, **kwargs)
+    Transaction.objects.filter(pk__in=[t.pk for t in transactions]).update(
+        created=timezone.now() - timedelta(hours=1)
+    )
+    return transactions
+
+
+def statuses():
+    return dict(Transaction.objects.values_list('trx', 'status'))
+
+
+class SweepTests(TestCase):
+    def setUp(self):
+        self.user, self.payment_method = make_user(), make_payment_method()
+        self.queryset = Transaction.objects.all()
+        self.calls = []
+        patcher = mock.patch.object(Transaction, 'engine', property(lambda t: FakeEngine(t, self.calls)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expires_stale_rows_only(self):
+        stale = make_stale(3, self.user, self.payment_method)
+        fresh = make_transactions(1, self.user, self.payment_method, trx='fresh')[0]
+        Transaction.objects.filter(pk=stale[0].pk).update(lease_expires=timezone.now() + timedelta(minutes=5))
+        Transaction.objects.filter(pk=stale[1].pk).update(lease_expires=timezone.now() - timedelta(minutes=5))
+
+        self.assertEqual(sweep(self.queryset, EXPIRE, chunk_size=1), {'expired': 2, 'confirmed': 0, 'failed': 0})
+        self.assertEqual(statuses(), {
+            stale[0].trx: PTSChoices.PENDING,  # leased by a poller or a callback right now
+            stale[1].trx: PTSChoices.TIMEOUT,  # its lease ran out
+            stale[2].trx: PTSChoices.TIMEOUT,
+            fresh.trx: PTSChoices.PENDING,
+        })
+        self.assertEqual(self.calls, [])
+
+    def test_confirmation_asks_the_bank_once_per_transaction(self):
+        for trx in ('success', 'failed', 'pending', 'error', ''):
+            make_stale(1, self.user, self.payment_method, trx=trx)
+
+        self.assertEqual(sweep(self.queryset, CONFIRM), {'expired': 2, 'confirmed': 2, 'failed': 1})
+        self.assertEqual(sorted(self.calls), ['error', 'failed', 'pending', 'success'])  # never for trx=''
+        self.assertEqual(statuses(), {
+            'success': PTSChoices.SUCCESS,
+            'failed': PTSChoices.FAILED,
+            'pending': PTSChoices.TIMEOUT,
+            'error': PTSChoices.PENDING,  # left for the next sweep
+            '': PTSChoices.TIMEOUT,  # never reached the bank, nothing to confirm
+        })
+
+    def test_confirmation_can_be_skipped(self):
+        make_stale(2, self.user, self.payment_method)
+        self.assertEqual(sweep(self.queryset, CONFIRM, confirm=False)['expired'], 2)
+        self.assertEqual(self.calls, [])
+
+    def test_confirmation_expires_in_chunks(self):
+        for i in range(3):
+            make_stale(1, self.user, self.payment_method, trx=f'pending-{i}')
+        self.assertEqual(sweep(self.queryset, CONFIRM, chunk_size=2)['expired'], 3)
+        self.assertEqual(len(self.calls), 3)
+
+
+@mock.patch.dict('georgian_payments.timeouts.OUTBOX_SETTINGS', {'enabled': True})
+class ExpireOutboxTests(TestCase):
+    def setUp(self):
+        self.transactions = make_stale(3, make_user(), make_payment_method())
+        self.stale = stale_pending(Transaction.objects.all(), EXPIRE)
+
+    def test_events_are_recorded(self):
+        self.assertEqual(expire_all(self.stale), 3)
+        events = PaymentEvent.objects.order_by('transaction_id')
+        self.assertEqual([e.transaction_id for e in events], sorted(str(t.pk) for t in self.transactions))
+        for event in events:
+            self.assertEqual(event.event_type, PaymentEventTypeChoices.STATUS_CHANGED)
+            self.assertEqual((event.previous_status, event.status), (PTSChoices.PENDING, PTSChoices.TIMEOUT))
+            self.assertEqual(event.payload['amount'], 10)
+
+    def test_status_change_is_rolled_back_with_the_events(self):
+        with mock.patch.object(PaymentEvent.objects, 'bulk_create', side_effect=RuntimeError('Outbox Is Down')):
+            with self.assertRaises(RuntimeError):
+                expire_all(self.stale)
+        self.assertEqual(set(statuses().values()), {PTSChoices.PENDING})
+        self.assertFalse(PaymentEvent.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED needs PostgreSQL')
+class ConcurrentExpireTests(TransactionTestCase):
+    def setUp(self):
+        self.transactions = make_stale(5, make_user(), make_payment_method())
+
+    def test_rows_locked_by_a_callback_are_skipped(self):
+        locked, release = threading.Event(), threading.Event()
+        held = [t.pk for t in self.transactions[:2]]
+
+        def hold():
+            with db_transaction.atomic():
+                list(Transaction.objects.filter(pk__in=held).select_for_update())
+                locked.set()
+                release.wait(10)
+            connections.close_all()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        try:
+            locked.wait(10)
+            expired = expire_all(stale_pending(Transaction.objects.all(), EXPIRE))
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(expired, 3)
+        self.assertEqual(set(Transaction.objects.filter(pk__in=held).values_list('status', flat=True)),
+                         {PTSChoices.PENDING})
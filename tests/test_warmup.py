@@ -0,0 +1,20 @@
+from unittest import mock
+
+from django.apps import apps
+from django.test import SimpleTestCase
+
+from georgian_payments import warmup
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_app_loading_does_not_warm_up(self):
+        with mock.patch.object(warmup, 'WARM_UP', True), mock.patch.object(warmup, 'warm_up') as warm_up:
+            apps.get_app_config('georgian_payments').ready()
+        warm_up.assert_not_called()
+
+    def test_post_fork_warms_up_when_enabled(self):
+        for enabled in (False, True):
+            with self.subTest(enabled=enabled), mock.patch.object(warmup, 'WARM_UP', enabled), \
+                    mock.patch.object(warmup, 'warm_up') as warm_up:
+                warmup.post_fork(server=None, worker=None)
+                self.assertEqual(warm_up.called, enabled)
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('georgian_payments', '0005_card_issuer_country'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trx', models.CharField(default='', max_length=100)),
+                ('pay_id', models.CharField(default='', max_length=255)),
+                ('amount', models.FloatField()),
+                ('refunded', models.FloatField(default=0)),
+                ('card_hash', models.CharField(default='****', max_length=30)),
+                ('card_bin_hash', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.SmallIntegerField(choices=[(-3, 'Error'), (-2, 'Timeout'), (-1, 'Failed'), (0, 'Pending'), (1, 'Success')], default=0)),
+                ('transaction_type', models.SmallIntegerField(choices=[(-2, 'Refund'), (-1, 'Cashback'), (1, 'Pay'), (2, 'Contribution')], default=1)),
+                ('data_log', models.JSONField(default=list)),
+                ('additional_data', models.JSONField(default=dict)),
+                ('merchant', models.CharField(blank=True, db_index=True, default='', help_text='Key of GEORGIAN_PAYMENTS_MERCHANTS, empty for the default merchant', max_length=50, verbose_name='Merchant')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('save_card', models.BooleanField(default=True)),
+                ('manual_action', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'დამტკიცდა განვადება თბს -ში'), (2, 'გასაუქმებელია განვადება'), (3, 'დასარეკია მომხმარებელთან განვადების გაუქმებაზე'), (4, 'მომხმარებელს გადასახდელი აქვს თანამონაწილეობის თანხა')], null=True, verbose_name='მანუალური მოქმედება')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=100)),
+                ('lease_expires', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('bank_card', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_transactions', to='georgian_payments.card', verbose_name='Card')),
+                ('payment_method', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payment_transactions', to='georgian_payments.paymentmethod', verbose_name='Payment Method')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payment_transactions', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Payment Transaction',
+                'verbose_name_plural': 'Payment Transactions',
+                'abstract': False,
+            },
+        ),
+    ]
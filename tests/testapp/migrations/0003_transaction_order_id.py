@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('testapp', '0002_compacttransaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='order_id',
+            field=models.CharField(default='', max_length=100),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import models
+
+from georgian_payments.fields import CompactJSONField
+from georgian_payments.models import PaymentTransaction
+
+
+class Transaction(PaymentTransaction):
+    order_id = models.CharField(max_length=100, default='')  # BOG callbacks look transactions up by it
+
+    @property
+    def product_data(self):
+        return [{'headline': 'Product', 'amount': self.amount, 'quantity': 1, 'product_id': 1}]
+
+
+class CompactTransaction(PaymentTransaction):
+    # declared before the compact column, so Django saves it first
+    data_log_summary = models.JSONField(default=dict)
+    data_log = CompactJSONField(default=list, summary_field='data_log_summary')
+
+    @property
+    def product_data(self):
+        return []